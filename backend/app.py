@@ -3,21 +3,31 @@ CARDIONET - Aplicación principal.
 Sistema de predicción de riesgo cardíaco con arquitectura en capas.
 """
 import os
+import signal
+import sys
+
+# Primero: mide el tiempo de las importaciones siguientes
+from utils import perfil_arranque
 
 from flask import Flask, request, send_from_directory
 from flask_cors import CORS
 from flask_limiter import Limiter
 from werkzeug.middleware.proxy_fix import ProxyFix
 
-from database.config import engine, SessionLocal
+from database.config import engine
+from database.sesion import cerrar_sesion
+from database.migraciones import aplicar_migraciones
 from database.models import Base
-from ml.model_loader import cargar_modelos
+from ml.model_loader import cargar_modelos, arranque_rapido
 from routes.evaluacion_bp import evaluacion_bp, init_evaluacion_bp
 from routes.medicos_bp import medicos_bp, init_medicos_bp
 from routes.health_bp import health_bp
 from routes.auth_bp import auth_bp, init_auth_bp
+from routes.modelos_bp import modelos_bp, init_modelos_bp
 from utils.security import es_produccion
 
+perfil_arranque.marcar('importaciones (flask, sqlalchemy, rutas)')
+
 # Configurar Flask
 app = Flask(__name__,
             static_folder='../frontend',
@@ -45,21 +55,34 @@ limiter = Limiter(
 app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1)
 
 # Base de datos
-Base.metadata.create_all(bind=engine)
-
-# Inicializar blueprints con rate limiting
-init_evaluacion_bp(limiter)
-init_medicos_bp(limiter)
-init_auth_bp(limiter)
-
-# Registrar blueprints
-app.register_blueprint(auth_bp, url_prefix='/api/auth')
-app.register_blueprint(evaluacion_bp, url_prefix='/api')
-app.register_blueprint(medicos_bp, url_prefix='/api/medicos')
-app.register_blueprint(health_bp, url_prefix='/api')
-
-# Cargar modelos ML al iniciar (garantiza carga con gunicorn/uwsgi)
-cargar_modelos()
+with perfil_arranque.etapa('Base.metadata.create_all'):
+    Base.metadata.create_all(bind=engine)
+    aplicar_migraciones(engine)
+# Una sesión por petición (database/sesion.py): se cierra al terminar y devuelve la conexión al pool
+app.teardown_appcontext(cerrar_sesion)
+
+with perfil_arranque.etapa('registro de blueprints'):
+    # Inicializar blueprints con rate limiting
+    init_evaluacion_bp(limiter)
+    init_medicos_bp(limiter)
+    init_auth_bp(limiter)
+    init_modelos_bp(limiter)
+
+    # Registrar blueprints
+    app.register_blueprint(auth_bp, url_prefix='/api/auth')
+    app.register_blueprint(evaluacion_bp, url_prefix='/api')
+    app.register_blueprint(medicos_bp, url_prefix='/api/medicos')
+    app.register_blueprint(health_bp, url_prefix='/api')
+    app.register_blueprint(modelos_bp, url_prefix='/api/modelos')
+
+# Cargar modelos ML al iniciar (garantiza carga con gunicorn/uwsgi).
+# En arranque rápido solo se espera al Random Forest; DT y SVM se cargan en segundo plano.
+with perfil_arranque.etapa('carga de modelos (síncrona)'):
+    cargar_modelos(rapido=arranque_rapido())
+
+# El desglose siempre está en /api/metricas; impreso solo si se pide (cada worker lo repetiría)
+if os.getenv('PERFIL_ARRANQUE_LOG', 'false').lower() in ('true', '1', 'yes'):
+    print(perfil_arranque.formatear(), flush=True)
 
 # Rutas estáticas (frontend)
 @app.route('/')
@@ -73,6 +96,8 @@ def serve_static(path):
 
 
 if __name__ == '__main__':
+    # docker stop envía SIGTERM: salir con SystemExit para que atexit vacíe la cola de persistencia
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
     port = int(os.getenv('FLASK_PORT', 5000))
     debug = os.getenv('FLASK_DEBUG', 'false').lower() in ('true', '1', 'yes')
     if es_produccion() and debug:
@@ -1,7 +1,10 @@
 import os
-from sqlalchemy import create_engine
+import threading
+import time
+from sqlalchemy import create_engine, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -14,13 +17,216 @@ DB_PASSWORD = os.getenv('DB_PASSWORD')
 
 DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
-engine = create_engine(DATABASE_URL)
+# Pool de conexiones (ver .env.example)
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 10))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 10))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 30))
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 1800))
+DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() in ('true', '1', 'yes')
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', 0))
+
+
+class _MetricasPool:
+    """Tiempo de espera por una conexión del pool (checkout), acumulado por proceso."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.espera_total_ms = 0.0
+        self.espera_max_ms = 0.0
+        self.esperas_lentas = 0
+        self.timeouts = 0
+
+    def registrar(self, milisegundos: float, agotado: bool = False) -> None:
+        with self._lock:
+            if agotado:
+                self.timeouts += 1
+                return
+            self.checkouts += 1
+            self.espera_total_ms += milisegundos
+            self.espera_max_ms = max(self.espera_max_ms, milisegundos)
+            # Más de 10 ms casi siempre significa que no había conexiones libres
+            if milisegundos > 10:
+                self.esperas_lentas += 1
+
+    def resumen(self) -> dict:
+        with self._lock:
+            return {
+                'checkouts': self.checkouts,
+                'espera_promedio_ms': round(self.espera_total_ms / self.checkouts, 3) if self.checkouts else 0.0,
+                'espera_max_ms': round(self.espera_max_ms, 3),
+                'esperas_lentas': self.esperas_lentas,
+                'timeouts': self.timeouts,
+            }
+
+
+metricas_pool = _MetricasPool()
+
+
+class PoolMedido(QueuePool):
+    """QueuePool que mide cuánto espera cada checkout (incluye abrir una conexión nueva)."""
+
+    # _do_get es privado de SQLAlchemy (probado con 2.0.36, ver requirements.txt). Los eventos del
+    # pool no sirven aquí: 'checkout' se dispara cuando ya se obtuvo la conexión y no hay uno previo.
+    # Al actualizar SQLAlchemy, verificar que QueuePool._do_get siga siendo el punto de espera.
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            conexion = super()._do_get()
+        except Exception:
+            metricas_pool.registrar(0, agotado=True)
+            raise
+        metricas_pool.registrar((time.perf_counter() - inicio) * 1000)
+        return conexion
+
+
+def _argumentos_engine() -> dict:
+    argumentos = {
+        'poolclass': PoolMedido,
+        'pool_size': DB_POOL_SIZE,
+        'max_overflow': DB_MAX_OVERFLOW,
+        'pool_timeout': DB_POOL_TIMEOUT,
+        'pool_recycle': DB_POOL_RECYCLE,
+        'pool_pre_ping': DB_POOL_PRE_PING,
+    }
+    if DB_STATEMENT_TIMEOUT_MS > 0:
+        argumentos['connect_args'] = {'options': f'-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}'}
+    return argumentos
+
+
+engine = create_engine(DATABASE_URL, **_argumentos_engine())
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Réplica de lectura opcional: DB_REPLICA_HOST activa el enrutamiento; el resto hereda de la primaria
+DB_REPLICA_HOST = os.getenv('DB_REPLICA_HOST')
+DB_REPLICA_MAX_LAG_SEG = float(os.getenv('DB_REPLICA_MAX_LAG_SEG', 5))
+DB_REPLICA_CHECK_SEG = float(os.getenv('DB_REPLICA_CHECK_SEG', 10))
+# La verificación corre dentro de una petición: un host que no responde no debe bloquearla
+DB_REPLICA_CONNECT_TIMEOUT_SEG = int(os.getenv('DB_REPLICA_CONNECT_TIMEOUT_SEG', 2))
+
+replica_engine = None
+if DB_REPLICA_HOST:
+    REPLICA_URL = (
+        f"postgresql://{os.getenv('DB_REPLICA_USER', DB_USER)}:{os.getenv('DB_REPLICA_PASSWORD', DB_PASSWORD)}"
+        f"@{DB_REPLICA_HOST}:{os.getenv('DB_REPLICA_PORT', DB_PORT)}/{os.getenv('DB_REPLICA_NAME', DB_NAME)}"
+    )
+    _argumentos_replica = {**_argumentos_engine(), 'poolclass': QueuePool}
+    _argumentos_replica['connect_args'] = {
+        **_argumentos_replica.get('connect_args', {}), 'connect_timeout': DB_REPLICA_CONNECT_TIMEOUT_SEG,
+    }
+    replica_engine = create_engine(REPLICA_URL, **_argumentos_replica)
+
+# Estado de la réplica. pg_stat_wal_receiver tiene una fila solo mientras el walreceiver corre;
+# sin pg_read_all_stats la fila existe pero status viene NULL
+_SQL_RETRASO = text("""
+    SELECT
+        pg_is_in_recovery() AS en_recuperacion,
+        (SELECT count(*) FROM pg_stat_wal_receiver) AS receptores,
+        (SELECT status FROM pg_stat_wal_receiver LIMIT 1) AS estado,
+        pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() AS al_dia,
+        EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) AS desde_ultima
+""")
+
+
+def _retraso_replica(fila) -> tuple[float, str | None]:
+    """
+    (retraso en segundos, motivo si no sirve). Recibir y aplicar el mismo LSN solo significa
+    "al día" mientras hay streaming desde la primaria; desconectada, no hay retraso confiable.
+    """
+    if not fila.en_recuperacion:
+        return 0.0, None
+    if not fila.receptores or (fila.estado is not None and fila.estado != 'streaming'):
+        return float('inf'), 'sin_streaming'
+    if fila.estado == 'streaming' and fila.al_dia:
+        return 0.0, None
+    # Sin permiso para ver el estado: solo la antigüedad de la última transacción aplicada
+    return (float('inf') if fila.desde_ultima is None else float(fila.desde_ultima)), None
+
+
+class _EstadoReplica:
+    """Disponibilidad y retraso de la réplica, verificados como máximo cada DB_REPLICA_CHECK_SEG."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.disponible = False
+        self.retraso_seg = None
+        self.verificado_en = 0.0
+        self.ultimo_error = None
+        self.lecturas_replica = 0
+        self.lecturas_primaria = 0
+        self.fallbacks = 0
+
+    def usable(self) -> bool:
+        """True si la réplica responde y su retraso está dentro de DB_REPLICA_MAX_LAG_SEG."""
+        if replica_engine is None:
+            return False
+        if time.monotonic() - self.verificado_en >= DB_REPLICA_CHECK_SEG and self._lock.acquire(blocking=False):
+            # Solo un hilo verifica; el resto usa el último estado conocido
+            try:
+                self._verificar()
+            finally:
+                self._lock.release()
+        return self.disponible
+
+    def _verificar(self) -> None:
+        try:
+            with replica_engine.connect() as conexion:
+                retraso, motivo = _retraso_replica(conexion.execute(_SQL_RETRASO).one())
+            self.retraso_seg = round(retraso, 3) if retraso != float('inf') else None
+            self.disponible = motivo is None and retraso <= DB_REPLICA_MAX_LAG_SEG
+            self.ultimo_error = None if self.disponible else (motivo or 'retraso')
+        except Exception as e:
+            self.disponible = False
+            self.ultimo_error = type(e).__name__
+        self.verificado_en = time.monotonic()
+
+    def marcar_caida(self, error: Exception) -> None:
+        """Una consulta falló en la réplica: se usa la primaria hasta la próxima verificación."""
+        self.disponible = False
+        self.ultimo_error = type(error).__name__
+        self.verificado_en = time.monotonic()
+        self.fallbacks += 1
+
+    def registrar(self, en_replica: bool) -> None:
+        if en_replica:
+            self.lecturas_replica += 1
+        else:
+            self.lecturas_primaria += 1
+
+    def resumen(self) -> dict:
+        return {
+            'configurada': replica_engine is not None,
+            'disponible': self.disponible,
+            'retraso_seg': self.retraso_seg,
+            'retraso_max_seg': DB_REPLICA_MAX_LAG_SEG,
+            'ultimo_error': self.ultimo_error,
+            'lecturas_replica': self.lecturas_replica,
+            'lecturas_primaria': self.lecturas_primaria,
+            'fallbacks': self.fallbacks,
+        }
+
+
+estado_replica = _EstadoReplica()
+
+
+def engine_lectura():
+    """Engine para consultas de solo lectura: la réplica si está sana, si no la primaria."""
+    en_replica = estado_replica.usable()
+    estado_replica.registrar(en_replica)
+    return replica_engine if en_replica else engine
+
+
+def estadisticas_pool() -> dict:
+    """Configuración, conexiones en uso y espera por checkout del pool de este worker."""
+    pool = engine.pool
+    return {
+        'tamano': DB_POOL_SIZE,
+        'overflow_max': DB_MAX_OVERFLOW,
+        'en_uso': pool.checkedout(),
+        'libres': pool.checkedin(),
+        'overflow': pool.overflow(),
+        'statement_timeout_ms': DB_STATEMENT_TIMEOUT_MS,
+        **metricas_pool.resumen(),
+        'replica': estado_replica.resumen(),
+    }
@@ -0,0 +1,49 @@
+"""Migraciones idempotentes que create_all no aplica sobre tablas existentes."""
+from sqlalchemy import bindparam, text, update
+
+from database.models import Medico
+from repositories.medico_repo import incrementar_version_directorio
+from utils.especialidades import etiquetas_especialidad
+
+_MIGRACIONES = (
+    "ALTER TABLE medicos ADD COLUMN IF NOT EXISTS especialidad_tags VARCHAR(100)[]",
+    "CREATE INDEX IF NOT EXISTS idx_medicos_especialidad_tags ON medicos USING GIN (especialidad_tags)",
+    "CREATE INDEX IF NOT EXISTS idx_medicos_calificacion_id ON medicos (calificacion DESC NULLS LAST, id)",
+)
+
+
+def aplicar_migraciones(engine) -> None:
+    """Aplica cada sentencia en su propia transacción; si una falla, sigue con las demás."""
+    for sql in _MIGRACIONES:
+        try:
+            with engine.begin() as conexion:
+                conexion.execute(text(sql))
+        except Exception as e:
+            print(f'[MIGRACION] No se pudo aplicar "{sql}": {e}', flush=True)
+    try:
+        with engine.begin() as conexion:
+            _completar_etiquetas(conexion)
+    except Exception as e:
+        print(f'[MIGRACION] No se pudieron completar las etiquetas de especialidad: {e}', flush=True)
+
+
+def _completar_etiquetas(conexion) -> int:
+    """
+    Calcula especialidad_tags de las filas que no las tienen (las semillas de init-docker.sql se
+    insertan antes de crear la columna). Con la misma función que el ORM, no con SQL aparte.
+    """
+    filas = conexion.execute(text(
+        'SELECT id, especialidad, subespecialidad FROM medicos WHERE especialidad_tags IS NULL'
+    )).all()
+    if not filas:
+        return 0
+    tabla = Medico.__table__
+    conexion.execute(
+        update(tabla)
+        .where(tabla.c.id == bindparam('b_id'), tabla.c.especialidad_tags.is_(None))
+        .values(especialidad_tags=bindparam('b_tags')),
+        [{'b_id': f.id, 'b_tags': etiquetas_especialidad(f.especialidad, f.subespecialidad)} for f in filas],
+    )
+    incrementar_version_directorio(conexion)
+    print(f'[MIGRACION] Etiquetas de especialidad completadas en {len(filas)} médicos', flush=True)
+    return len(filas)
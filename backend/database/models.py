@@ -1,5 +1,7 @@
-from sqlalchemy import Column, Integer, String, Float, Date, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, BigInteger, String, Float, Date, DateTime, Boolean, ForeignKey, Index, event, func
+from sqlalchemy.dialects.postgresql import ARRAY
 from database.config import Base
+from utils.especialidades import etiquetas_especialidad
 
 class Paciente(Base):
     __tablename__ = "pacientes"
@@ -55,6 +57,21 @@ class Medico(Base):
     latitud = Column(Float, nullable=True)
     longitud = Column(Float, nullable=True)
     email = Column(String(120))
+    # Especialidad y subespecialidades normalizadas (sin tildes, minúsculas); se calculan al guardar
+    especialidad_tags = Column(ARRAY(String(100)), nullable=True)
+
+    __table_args__ = (
+        Index('idx_medicos_especialidad_tags', especialidad_tags, postgresql_using='gin'),
+        # Orden del directorio y de la paginación por cursor: calificación desc (nulos al final), id
+        Index('idx_medicos_calificacion_id', calificacion.desc().nulls_last(), id),
+    )
+
+
+@event.listens_for(Medico, 'before_insert')
+@event.listens_for(Medico, 'before_update')
+def _actualizar_etiquetas(mapper, connection, medico):
+    """Mantiene especialidad_tags al día en cada INSERT/UPDATE hecho con el ORM."""
+    medico.especialidad_tags = etiquetas_especialidad(medico.especialidad, medico.subespecialidad)
 
 
 class Usuario(Base):
@@ -67,3 +84,12 @@ class Usuario(Base):
     paciente_id = Column(Integer, ForeignKey('pacientes.id'), nullable=True)
     medico_id = Column(Integer, ForeignKey('medicos.id'), nullable=True)
     activo = Column(Boolean, default=True)
+
+
+class DirectorioVersion(Base):
+    """Contador que se incrementa en cada cambio de la tabla medicos (una sola fila, id=1)."""
+    __tablename__ = "directorio_version"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+    actualizado_en = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
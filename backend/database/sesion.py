@@ -0,0 +1,61 @@
+"""
+Sesión de base de datos por petición.
+
+obtener_sesion() crea la sesión la primera vez que se usa en la petición y la reutiliza
+hasta el final; cerrar_sesion (registrada como teardown en app.py) la cierra y devuelve
+la conexión al pool, con rollback si la petición terminó con una excepción.
+leer() ejecuta consultas de solo lectura en la réplica (si hay una sana) con su propia sesión.
+Los hilos de fondo y los scripts siguen usando SessionLocal() directamente.
+"""
+from flask import g, has_app_context
+from sqlalchemy.exc import OperationalError
+
+from database.config import SessionLocal, engine_lectura, estado_replica
+
+
+def obtener_sesion():
+    """Sesión de la petición actual (se crea al primer uso)."""
+    if not has_app_context():
+        raise RuntimeError('obtener_sesion() requiere una petición activa; fuera de Flask usa SessionLocal()')
+    if 'db_sesion' not in g:
+        g.db_sesion = SessionLocal()
+    return g.db_sesion
+
+
+def obtener_sesion_lectura():
+    """Sesión de solo lectura de la petición: réplica si está disponible y al día, si no la primaria."""
+    if not has_app_context():
+        raise RuntimeError('obtener_sesion_lectura() requiere una petición activa; fuera de Flask usa SessionLocal()')
+    if 'db_lectura' not in g:
+        g.db_lectura = SessionLocal(bind=engine_lectura())
+    return g.db_lectura
+
+
+def leer(funcion, *args, **kwargs):
+    """
+    Ejecuta funcion(db, *args, **kwargs) con la sesión de lectura. Si la réplica falla a mitad
+    de la consulta, la marca como caída y repite la consulta en la sesión de la primaria.
+    """
+    db = obtener_sesion_lectura()
+    try:
+        return funcion(db, *args, **kwargs)
+    except OperationalError as e:
+        if db.get_bind() is SessionLocal.kw['bind']:
+            raise
+        estado_replica.marcar_caida(e)
+        g.pop('db_lectura', None)
+        db.close()
+        return funcion(obtener_sesion(), *args, **kwargs)
+
+
+def cerrar_sesion(excepcion=None) -> None:
+    """Teardown de Flask: cierra las sesiones de la petición que se hayan abierto."""
+    for clave in ('db_sesion', 'db_lectura'):
+        db = g.pop(clave, None)
+        if db is None:
+            continue
+        try:
+            if excepcion is not None:
+                db.rollback()
+        finally:
+            db.close()
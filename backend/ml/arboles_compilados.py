@@ -0,0 +1,136 @@
+"""
+Motor de inferencia para árboles de decisión aplanados en arreglos de NumPy.
+
+Convierte un RandomForestClassifier o DecisionTreeClassifier ya entrenado en arreglos
+contiguos (feature, threshold, hijos y valor de hoja) y recorre todos los árboles a la vez,
+sin la validación por llamada de sklearn ni el despacho de joblib.
+"""
+import json
+import os
+
+import numpy as np
+
+# Arreglos que se persisten como .npy (uno por archivo, para poder abrirlos con mmap)
+_ARREGLOS = ('feature', 'threshold', 'izquierdo', 'derecho', 'valor', 'raices', 'clases')
+
+
+class BosqueCompilado:
+    """Bosque (o árbol único) compilado a arreglos planos de nodos."""
+
+    def __init__(self, feature: np.ndarray, threshold: np.ndarray, izquierdo: np.ndarray,
+                 derecho: np.ndarray, valor: np.ndarray, raices: np.ndarray,
+                 clases: np.ndarray, profundidad: int):
+        self.feature = feature
+        self.threshold = threshold
+        self.izquierdo = izquierdo
+        self.derecho = derecho
+        self.valor = valor
+        self.raices = raices
+        self.clases = clases
+        self.profundidad = profundidad
+        self.n_features = None
+
+    @classmethod
+    def desde_sklearn(cls, modelo) -> 'BosqueCompilado':
+        """Compila un RandomForestClassifier o DecisionTreeClassifier de una sola salida."""
+        estimadores = getattr(modelo, 'estimators_', None) or [modelo]
+        if getattr(modelo, 'n_outputs_', 1) != 1:
+            raise ValueError('Solo se soportan modelos de una salida')
+
+        features, thresholds, izquierdos, derechos, valores, raices = [], [], [], [], [], []
+        desplazamiento = 0
+        profundidad = 0
+        for estimador in estimadores:
+            arbol = estimador.tree_
+            n = arbol.node_count
+            es_hoja = arbol.children_left == -1
+            indices = np.arange(n, dtype=np.intp) + desplazamiento
+
+            # Las hojas apuntan a sí mismas: el recorrido puede iterar una profundidad fija
+            features.append(np.where(es_hoja, 0, arbol.feature).astype(np.intp))
+            thresholds.append(np.where(es_hoja, 0.0, arbol.threshold).astype(np.float64))
+            izquierdos.append(np.where(es_hoja, indices, arbol.children_left + desplazamiento).astype(np.intp))
+            derechos.append(np.where(es_hoja, indices, arbol.children_right + desplazamiento).astype(np.intp))
+
+            # Misma normalización que DecisionTreeClassifier.predict_proba
+            valor = arbol.value[:, 0, :modelo.n_classes_].astype(np.float64)
+            normalizador = valor.sum(axis=1)[:, np.newaxis]
+            normalizador[normalizador == 0.0] = 1.0
+            valores.append(valor / normalizador)
+
+            raices.append(desplazamiento)
+            profundidad = max(profundidad, arbol.max_depth)
+            desplazamiento += n
+
+        compilado = cls(
+            feature=np.ascontiguousarray(np.concatenate(features)),
+            threshold=np.ascontiguousarray(np.concatenate(thresholds)),
+            izquierdo=np.ascontiguousarray(np.concatenate(izquierdos)),
+            derecho=np.ascontiguousarray(np.concatenate(derechos)),
+            valor=np.ascontiguousarray(np.concatenate(valores)),
+            raices=np.asarray(raices, dtype=np.intp),
+            clases=np.asarray(modelo.classes_),
+            profundidad=int(profundidad),
+        )
+        compilado.n_features = int(modelo.n_features_in_)
+        return compilado
+
+    def guardar(self, directorio: str) -> None:
+        """Guarda los arreglos como .npy sin comprimir más un meta.json."""
+        os.makedirs(directorio, exist_ok=True)
+        for nombre in _ARREGLOS:
+            np.save(os.path.join(directorio, f'{nombre}.npy'), np.ascontiguousarray(getattr(self, nombre)))
+        with open(os.path.join(directorio, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump({'profundidad': self.profundidad, 'n_features': self.n_features}, f)
+
+    @classmethod
+    def cargar(cls, directorio: str, mmap_mode: str | None = 'r') -> 'BosqueCompilado':
+        """
+        Carga un motor guardado con guardar(). Con mmap_mode='r' los arreglos se mapean del archivo:
+        todos los procesos que los abren comparten las mismas páginas de la caché del sistema.
+        """
+        with open(os.path.join(directorio, 'meta.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+        # np.asarray quita la subclase memmap pero conserva el mapeo (sin copia)
+        arreglos = {
+            nombre: np.asarray(np.load(os.path.join(directorio, f'{nombre}.npy'), mmap_mode=mmap_mode))
+            for nombre in _ARREGLOS
+        }
+        compilado = cls(profundidad=int(meta['profundidad']), **arreglos)
+        compilado.n_features = meta.get('n_features')
+        return compilado
+
+    @property
+    def n_arboles(self) -> int:
+        return len(self.raices)
+
+    def hojas(self, X: np.ndarray) -> np.ndarray:
+        """Retorna el índice global de hoja alcanzado por cada (árbol, fila): forma (n_arboles, n_filas)."""
+        # sklearn compara las entradas en float32 contra umbrales float64
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        filas = np.arange(X.shape[0])[np.newaxis, :]
+        nodos = np.repeat(self.raices[:, np.newaxis], X.shape[0], axis=1)
+        for _ in range(self.profundidad):
+            va_izquierda = X[filas, self.feature[nodos]] <= self.threshold[nodos]
+            nodos = np.where(va_izquierda, self.izquierdo[nodos], self.derecho[nodos])
+        return nodos
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """Probabilidades por clase, promediadas entre árboles como RandomForestClassifier."""
+        X = np.asarray(X)
+        if X.ndim != 2 or (self.n_features is not None and X.shape[1] != self.n_features):
+            raise ValueError(f'Se esperaban {self.n_features} parámetros por fila')
+        por_arbol = self.valor[self.hojas(X)]
+        if self.n_arboles == 1:
+            return por_arbol[0]
+        # Acumulación en el orden de los estimadores y división final, igual que sklearn
+        proba = np.zeros(por_arbol.shape[1:], dtype=np.float64)
+        for contribucion in por_arbol:
+            proba += contribucion
+        proba /= self.n_arboles
+        return proba
+
+    def predecir(self, X: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Retorna (clases predichas, probabilidades) con una sola pasada por los árboles."""
+        proba = self.predict_proba(X)
+        return self.clases.take(np.argmax(proba, axis=1)), proba
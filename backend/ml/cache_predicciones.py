@@ -0,0 +1,88 @@
+"""Caché LRU acotada con TTL para resultados de predicción."""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class CachePredicciones:
+    """
+    Caché LRU segura para hilos. Las claves incluyen la versión de los modelos,
+    por lo que una recarga nunca sirve resultados del modelo anterior.
+    """
+
+    def __init__(self, tamano: int = 1024, ttl_seg: float = 600):
+        self.tamano = max(0, int(tamano))
+        self.ttl_seg = float(ttl_seg)
+        self._datos: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.expirados = 0
+        self.desalojos = 0
+
+    @property
+    def habilitada(self) -> bool:
+        return self.tamano > 0
+
+    def obtener(self, clave):
+        """Retorna el valor almacenado o None si no existe o expiró."""
+        if not self.habilitada:
+            return None
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                self.fallos += 1
+                return None
+            expira, valor = entrada
+            if self.ttl_seg > 0 and expira < time.monotonic():
+                del self._datos[clave]
+                self.expirados += 1
+                self.fallos += 1
+                return None
+            self._datos.move_to_end(clave)
+            self.aciertos += 1
+            return valor
+
+    def guardar(self, clave, valor) -> None:
+        if not self.habilitada:
+            return
+        with self._lock:
+            self._datos[clave] = (time.monotonic() + self.ttl_seg, valor)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.tamano:
+                self._datos.popitem(last=False)
+                self.desalojos += 1
+
+    def limpiar(self) -> None:
+        """Vacía la caché (se invoca al recargar modelos)."""
+        with self._lock:
+            self._datos.clear()
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                'habilitada': self.habilitada,
+                'tamano_max': self.tamano,
+                'ttl_seg': self.ttl_seg,
+                'entradas': len(self._datos),
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'expirados': self.expirados,
+                'desalojos': self.desalojos,
+                'tasa_aciertos': round(self.aciertos / consultas, 4) if consultas else 0.0,
+            }
+
+
+def clave_parametros(parametros: list) -> tuple:
+    """Normaliza los 13 parámetros a una tupla de floats (63 y 63.0 comparten entrada)."""
+    return tuple(float(x) for x in parametros)
+
+
+def crear_desde_entorno() -> CachePredicciones:
+    """Crea la caché con PREDICCION_CACHE_TAMANO (0 la desactiva) y PREDICCION_CACHE_TTL_SEG."""
+    return CachePredicciones(
+        tamano=int(os.getenv('PREDICCION_CACHE_TAMANO', 1024)),
+        ttl_seg=float(os.getenv('PREDICCION_CACHE_TTL_SEG', 600)),
+    )
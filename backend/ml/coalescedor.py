@@ -0,0 +1,151 @@
+"""
+Agrupador (micro-batching) de predicciones concurrentes.
+
+Las llamadas que llegan dentro de una ventana corta se evalúan juntas como una sola matriz:
+el bosque cuesta mucho menos por fila en lote que fila por fila. El primer hilo de cada
+ventana actúa como líder: espera la ventana (o a que se llene el lote), evalúa y entrega a
+cada llamador su propio resultado. No usa hilos propios, así que es seguro tras un fork.
+"""
+import os
+import threading
+import time
+
+
+class _Solicitud:
+    __slots__ = ('parametros', 'listo', 'resultado', 'error', 'promovida')
+
+    def __init__(self, parametros: list):
+        self.parametros = parametros
+        self.listo = threading.Event()
+        self.resultado = None
+        self.error = None
+        self.promovida = False
+
+
+class CoalescedorPredicciones:
+    """
+    Agrupa llamadas concurrentes a una función de lote.
+    funcion_lote recibe una lista de vectores y retorna la lista de resultados en el mismo orden.
+    """
+
+    def __init__(self, funcion_lote, ventana_ms: float = 2.0, max_lote: int = 32):
+        self.funcion_lote = funcion_lote
+        self.ventana_ms = max(0.0, float(ventana_ms))
+        self.max_lote = max(1, int(max_lote))
+        self._pendientes: list[_Solicitud] = []
+        self._hay_lider = False
+        self._cond = threading.Condition()
+        # Límites superiores del histograma de tamaños de lote: 1, 2, 4, ... hasta max_lote
+        self._limites = []
+        limite = 1
+        while limite < self.max_lote:
+            self._limites.append(limite)
+            limite *= 2
+        self._limites.append(self.max_lote)
+        self._histograma = [0] * len(self._limites)
+        self.lotes = 0
+        self.solicitudes = 0
+        self.fallbacks = 0
+
+    @property
+    def habilitado(self) -> bool:
+        return self.ventana_ms > 0 and self.max_lote > 1
+
+    def predecir(self, parametros: list):
+        """Retorna el resultado de evaluar parametros, posiblemente junto con otras llamadas."""
+        if not self.habilitado:
+            return self.funcion_lote([parametros])[0]
+
+        solicitud = _Solicitud(parametros)
+        with self._cond:
+            self._pendientes.append(solicitud)
+            lider = not self._hay_lider
+            if lider:
+                self._hay_lider = True
+            elif len(self._pendientes) >= self.max_lote:
+                self._cond.notify_all()
+
+        if not lider:
+            solicitud.listo.wait()
+            if not solicitud.promovida:
+                return self._entregar(solicitud)
+        self._liderar()
+        return self._entregar(solicitud)
+
+    def _liderar(self) -> None:
+        """Espera la ventana, toma hasta max_lote solicitudes y las evalúa en una sola llamada."""
+        limite = time.monotonic() + self.ventana_ms / 1000
+        with self._cond:
+            while len(self._pendientes) < self.max_lote:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    break
+                self._cond.wait(restante)
+            lote = self._pendientes[:self.max_lote]
+            del self._pendientes[:self.max_lote]
+            siguiente = self._pendientes[0] if self._pendientes else None
+            self._hay_lider = siguiente is not None
+            self._registrar(len(lote))
+
+        # Las solicitudes que no entraron en este lote forman el siguiente, con su propio líder
+        if siguiente is not None:
+            siguiente.promovida = True
+            siguiente.listo.set()
+
+        self._evaluar(lote)
+
+    def _evaluar(self, lote: list[_Solicitud]) -> None:
+        try:
+            resultados = self.funcion_lote([s.parametros for s in lote])
+            for solicitud, resultado in zip(lote, resultados):
+                solicitud.resultado = resultado
+        except Exception:
+            # Una fila inválida no debe fallar a las demás: se reintenta fila por fila
+            with self._cond:
+                self.fallbacks += 1
+            for solicitud in lote:
+                try:
+                    solicitud.resultado = self.funcion_lote([solicitud.parametros])[0]
+                except Exception as e:
+                    solicitud.error = e
+        finally:
+            for solicitud in lote:
+                solicitud.promovida = False
+                solicitud.listo.set()
+
+    @staticmethod
+    def _entregar(solicitud: _Solicitud):
+        if solicitud.error is not None:
+            raise solicitud.error
+        return solicitud.resultado
+
+    def _registrar(self, tamano: int) -> None:
+        self.lotes += 1
+        self.solicitudes += tamano
+        for i, limite in enumerate(self._limites):
+            if tamano <= limite:
+                self._histograma[i] += 1
+                break
+
+    def estadisticas(self) -> dict:
+        with self._cond:
+            return {
+                'habilitado': self.habilitado,
+                'ventana_ms': self.ventana_ms,
+                'max_lote': self.max_lote,
+                'lotes': self.lotes,
+                'solicitudes': self.solicitudes,
+                'tamano_promedio': round(self.solicitudes / self.lotes, 2) if self.lotes else 0.0,
+                'reintentos_fila_por_fila': self.fallbacks,
+                'histograma_tamano_lote': {f'<={l}': n for l, n in zip(self._limites, self._histograma)},
+                'pendientes': len(self._pendientes),
+            }
+
+
+def crear_desde_entorno(funcion_lote) -> CoalescedorPredicciones:
+    """Crea el agrupador con PREDICCION_LOTE_VENTANA_MS (0 lo desactiva) y PREDICCION_LOTE_MAX."""
+    return CoalescedorPredicciones(
+        funcion_lote,
+        ventana_ms=float(os.getenv('PREDICCION_LOTE_VENTANA_MS', 0)),
+        max_lote=int(os.getenv('PREDICCION_LOTE_MAX', 32)),
+    )
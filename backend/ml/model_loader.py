@@ -1,13 +1,28 @@
 """Carga y predicción con modelos de ML."""
+import atexit
+import copy
 import os
-import joblib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 
-_modelo_rf = None
-_modelo_dt = None
-_modelo_svm = None
-_svm_scaler = None
-_feature_names = None
+from ml.arboles_compilados import BosqueCompilado
+from ml.cache_predicciones import clave_parametros, crear_desde_entorno
+from ml.coalescedor import crear_desde_entorno as crear_coalescedor
+from ml.registro_modelos import PaqueteModelos, RegistroModelos
+
+# Paquete de modelos vigente; se reemplaza atómicamente en cada recarga
+_registro = RegistroModelos()
+_cache = crear_desde_entorno()
+# La clave de caché incluye la versión del paquete; al recargar se libera la memoria de la anterior
+_registro.al_cambiar(lambda paquete: _cache.limpiar())
+_vigilancia_iniciada = False
+
+# Pool de hilos para predecir_comparativo (vive mientras el proceso)
+_pool_modelos = None
+_pool_lock = threading.Lock()
 
 # Mapeo de nombres del dataset a etiquetas en español
 _FEATURE_LABELS = {
@@ -27,96 +42,203 @@ _FEATURE_LABELS = {
 }
 
 
-def cargar_modelos() -> None:
-    """Carga los modelos de Random Forest, Decision Tree y SVM."""
-    global _modelo_rf, _modelo_dt, _modelo_svm, _svm_scaler, _feature_names
-    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    # Docker: ml_models montado en /app/ml_models; Local: ml_models en proyecto/
-    candidates = [
-        os.path.join(base_dir, 'ml_models'),
-        os.path.join(base_dir, '..', 'ml_models'),
-    ]
-    models_dir = None
-    for d in candidates:
-        pkl = os.path.join(d, 'random_forest_model.pkl')
-        if os.path.isfile(pkl):
-            models_dir = d
-            break
-    if not models_dir:
-        return  # Sin modelo: predecir() lanzará RuntimeError
-    try:
-        _modelo_rf = joblib.load(os.path.join(models_dir, 'random_forest_model.pkl'))
-        _modelo_dt = joblib.load(os.path.join(models_dir, 'decision_tree_model.pkl'))
-        try:
-            _modelo_svm = joblib.load(os.path.join(models_dir, 'svm_model.pkl'))
-            _svm_scaler = joblib.load(os.path.join(models_dir, 'svm_scaler.pkl'))
-        except Exception:
-            _modelo_svm = None
-            _svm_scaler = None
-        try:
-            _feature_names = joblib.load(os.path.join(models_dir, 'feature_names.pkl'))
-        except Exception:
-            _feature_names = None
-    except Exception:
-        pass  # Sin modelo: predecir() lanzará RuntimeError
+def cargar_modelos(rapido: bool = False) -> None:
+    """
+    Carga los modelos de Random Forest, Decision Tree y SVM como un paquete nuevo.
+    Con rapido=True retorna en cuanto el Random Forest está listo; DT, SVM, scaler y nombres de
+    variables se cargan en segundo plano (predecir_comparativo los reporta en 'modelos_pendientes').
+    Si MODELOS_VIGILAR_SEG > 0, además vigila ml_models/ y recarga al desplegar artefactos nuevos.
+    """
+    _registro.cargar(rapido=rapido)
+    _iniciar_vigilancia()
+
+
+def arranque_rapido() -> bool:
+    """ARRANQUE_RAPIDO (por defecto true): servir en cuanto el modelo principal está cargado."""
+    return os.getenv('ARRANQUE_RAPIDO', 'true').lower() in ('true', '1', 'yes')
+
+
+def _iniciar_vigilancia() -> None:
+    global _vigilancia_iniciada
+    if _vigilancia_iniciada:
+        return
+    _vigilancia_iniciada = True
+    _registro.iniciar_vigilancia(float(os.getenv('MODELOS_VIGILAR_SEG', 0)))
+
+
+def _despues_de_fork() -> None:
+    """Con precarga antes de fork (gunicorn --preload) los hilos del proceso padre no existen en el hijo."""
+    global _pool_modelos, _vigilancia_iniciada
+    _pool_modelos = None
+    if _vigilancia_iniciada:
+        _vigilancia_iniciada = False
+        _iniciar_vigilancia()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_despues_de_fork)
+
+
+def recargar_modelos() -> bool:
+    """Carga los modelos en segundo plano y los publica al terminar. False si ya hay una recarga en curso."""
+    return _registro.recargar_en_segundo_plano()
+
+
+def estado_modelos() -> dict:
+    """Versión, origen y estado de recarga del paquete de modelos vigente."""
+    return _registro.estado()
+
+
+def obtener_paquete() -> PaqueteModelos:
+    """Paquete de modelos vigente (inmutable)."""
+    return _registro.actual()
+
+
+def _predecir_arboles(modelo, motor: BosqueCompilado | None, X: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Retorna (predicciones, probabilidades) con una sola pasada, usando el motor compilado si existe."""
+    if motor is not None:
+        return motor.predecir(X)
+    probabilidades = modelo.predict_proba(X)
+    # Equivalente a predict(): la clase con mayor probabilidad
+    return modelo.classes_.take(np.argmax(probabilidades, axis=1)), probabilidades
 
 
 def predecir_riesgo(parametros: list) -> tuple:
     """
     Realiza predicción de riesgo cardíaco con Random Forest.
+    Con PREDICCION_LOTE_VENTANA_MS > 0, las llamadas concurrentes se evalúan juntas en un lote.
     Retorna (prediccion: int, probabilidad_riesgo: float).
     """
-    if _modelo_rf is None:
+    paquete = _registro.actual()
+    if not paquete.disponible:
         raise RuntimeError('Modelo no cargado')
-    X = np.array([parametros])
-    prediccion = int(_modelo_rf.predict(X)[0])
-    probabilidad = float(_modelo_rf.predict_proba(X)[0][1])
-    return prediccion, probabilidad
+    clave = ('riesgo', paquete.version, clave_parametros(parametros))
+    resultado = _cache.obtener(clave)
+    if resultado is not None:
+        return resultado
+    resultado = _coalescedor.predecir(parametros)
+    _cache.guardar(clave, resultado)
+    return resultado
+
+
+def predecir_riesgo_lote(lista_parametros: list[list]) -> list[tuple]:
+    """
+    Predicción de riesgo para N vectores de parámetros con Random Forest.
+    Evalúa todas las filas en una sola llamada a predict_proba sobre una matriz 2-D.
+    Retorna lista de (prediccion: int, probabilidad_riesgo: float) en el mismo orden.
+    """
+    paquete = _registro.actual()
+    if not paquete.disponible:
+        raise RuntimeError('Modelo no cargado')
+    if not lista_parametros:
+        return []
+    X = np.asarray(lista_parametros, dtype=float)
+    predicciones, probabilidades = _predecir_arboles(paquete.rf, paquete.motor_rf, X)
+    return [(int(pred), float(prob[1])) for pred, prob in zip(predicciones, probabilidades)]
+
+
+# Agrupa llamadas concurrentes a predecir_riesgo en una sola matriz (desactivado por defecto)
+_coalescedor = crear_coalescedor(predecir_riesgo_lote)
 
 
 def modelo_disponible() -> bool:
     """Indica si el modelo de predicción está cargado."""
-    return _modelo_rf is not None
+    return _registro.actual().disponible
+
+
+def _obtener_pool() -> ThreadPoolExecutor:
+    """Pool compartido para el análisis comparativo; se crea una vez y se reutiliza entre llamadas."""
+    global _pool_modelos
+    if _pool_modelos is None:
+        with _pool_lock:
+            if _pool_modelos is None:
+                _pool_modelos = ThreadPoolExecutor(max_workers=3, thread_name_prefix='cardionet-modelo')
+                atexit.register(_pool_modelos.shutdown, wait=False)
+    return _pool_modelos
+
+
+def _cronometrar(funcion, *args) -> tuple[dict, float]:
+    """Ejecuta la predicción de un modelo y retorna (resultado, milisegundos)."""
+    inicio = time.perf_counter()
+    resultado = funcion(*args)
+    return resultado, (time.perf_counter() - inicio) * 1000
+
+
+def _comparativo_arbol(modelo, motor: BosqueCompilado | None, X: np.ndarray) -> dict:
+    pred, prob = _predecir_arboles(modelo, motor, X)
+    return {'prediccion': int(pred[0]), 'probabilidad': float(prob[0][1])}
+
+
+def _comparativo_svm(modelo, scaler, X: np.ndarray) -> dict:
+    X_scaled = scaler.transform(X)
+    # SVC.predict usa la función de decisión y no el argmax de Platt: se mantienen ambas llamadas
+    pred = int(modelo.predict(X_scaled)[0])
+    prob = float(modelo.predict_proba(X_scaled)[0][1])
+    return {'prediccion': pred, 'probabilidad': prob}
 
 
 def predecir_comparativo(parametros: list) -> dict:
     """
-    Ejecuta predicción con los 3 modelos (RF, DT, SVM) para análisis comparativo.
-    Retorna dict con predicciones y probabilidades por modelo.
+    Ejecuta predicción con los 3 modelos (RF, DT, SVM) en paralelo para análisis comparativo.
+    Retorna dict con predicciones y probabilidades por modelo, y el tiempo de cada uno en 'tiempos_ms'
+    (vacío si el resultado viene de la caché, indicado por 'desde_cache').
     """
-    X = np.array([parametros])
+    paquete = _registro.actual()
+    clave = ('comparativo', paquete.version, clave_parametros(parametros))
+    guardado = _cache.obtener(clave)
+    if guardado is not None:
+        resultado = copy.deepcopy(guardado)
+        resultado.update({'parametros': parametros, 'tiempos_ms': {}, 'desde_cache': True})
+        return resultado
+
+    X = np.array([parametros], dtype=float)
     resultado = {
         'random_forest': None,
         'decision_tree': None,
         'svm': None,
         'parametros': parametros,
+        'tiempos_ms': {},
+        'desde_cache': False,
+        'version_modelos': paquete.version,
+        'modelos_pendientes': list(paquete.pendientes),
     }
-    if _modelo_rf is not None:
-        pred = int(_modelo_rf.predict(X)[0])
-        prob = float(_modelo_rf.predict_proba(X)[0][1])
-        resultado['random_forest'] = {'prediccion': pred, 'probabilidad': prob}
-    if _modelo_dt is not None:
-        pred = int(_modelo_dt.predict(X)[0])
-        prob = float(_modelo_dt.predict_proba(X)[0][1])
-        resultado['decision_tree'] = {'prediccion': pred, 'probabilidad': prob}
-    if _modelo_svm is not None and _svm_scaler is not None:
-        X_scaled = _svm_scaler.transform(X)
-        pred = int(_modelo_svm.predict(X_scaled)[0])
-        prob = float(_modelo_svm.predict_proba(X_scaled)[0][1])
-        resultado['svm'] = {'prediccion': pred, 'probabilidad': prob}
+    tareas = {}
+    pool = _obtener_pool()
+    if paquete.disponible:
+        tareas['random_forest'] = pool.submit(_cronometrar, _comparativo_arbol, paquete.rf, paquete.motor_rf, X)
+    if paquete.tiene_dt:
+        tareas['decision_tree'] = pool.submit(_cronometrar, _comparativo_arbol, paquete.dt, paquete.motor_dt, X)
+    if paquete.svm is not None and paquete.scaler is not None:
+        tareas['svm'] = pool.submit(_cronometrar, _comparativo_svm, paquete.svm, paquete.scaler, X)
+    for nombre, tarea in tareas.items():
+        resultado[nombre], milisegundos = tarea.result()
+        resultado['tiempos_ms'][nombre] = round(milisegundos, 3)
+    if not paquete.pendientes:
+        _cache.guardar(clave, copy.deepcopy(resultado))
     return resultado
 
 
+def estadisticas_cache() -> dict:
+    """Contadores de la caché de predicciones y versión actual de los modelos."""
+    return {**_cache.estadisticas(), 'version_modelos': _registro.actual().version}
+
+
+def estadisticas_coalescedor() -> dict:
+    """Configuración, lotes evaluados e histograma de tamaños del agrupador de predicciones."""
+    return _coalescedor.estadisticas()
+
+
 def obtener_feature_importances(limite: int = 8) -> list[dict]:
     """
     Retorna la importancia de las variables del modelo Random Forest.
     Formato: [{"nombre": str, "importancia": float}, ...] ordenado por importancia descendente.
-    Si feature_names.pkl no existe, retorna lista vacía.
+    Retorna lista vacía si feature_names.pkl no existe o aún se carga en segundo plano (arranque rápido).
     """
-    if _modelo_rf is None:
+    paquete = _registro.actual()
+    if paquete.importancias is None or paquete.feature_names is None:
         return []
-    importances = _modelo_rf.feature_importances_
-    names = _feature_names if _feature_names is not None else []
+    importances = paquete.importancias
+    names = paquete.feature_names
     if len(names) != len(importances):
         names = [f'Var_{i}' for i in range(len(importances))]
     resultado = []
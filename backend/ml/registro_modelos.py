@@ -0,0 +1,389 @@
+"""
+Registro de paquetes de modelos inmutables con recarga atómica.
+
+Cada paquete agrupa RF, DT, SVM, scaler, nombres de variables y motores compilados de una misma
+carga. Las predicciones toman el paquete actual una sola vez, por lo que una recarga en curso
+nunca mezcla modelos y las peticiones en vuelo terminan con el paquete anterior.
+"""
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, replace
+
+import joblib
+import numpy as np
+
+from ml.arboles_compilados import BosqueCompilado
+from utils.perfil_arranque import etapa
+
+ARCHIVOS_MODELOS = (
+    'random_forest_model.pkl',
+    'decision_tree_model.pkl',
+    'svm_model.pkl',
+    'svm_scaler.pkl',
+    'feature_names.pkl',
+)
+
+
+@dataclass(frozen=True)
+class PaqueteModelos:
+    """Conjunto inmutable de modelos cargados juntos."""
+    version: int = 0
+    directorio: str | None = None
+    firma: tuple = ()
+    cargado_en: float = 0.0
+    rf: object = None
+    dt: object = None
+    svm: object = None
+    scaler: object = None
+    feature_names: list | None = None
+    # Versiones compiladas (arreglos planos) de RF y DT; None si no se pudieron compilar
+    motor_rf: BosqueCompilado | None = None
+    motor_dt: BosqueCompilado | None = None
+    # feature_importances_ del RF (sklearn lo recalcula en cada acceso)
+    importancias: np.ndarray | None = None
+    # 'pickle': joblib.load por proceso; 'mmap': arreglos compilados mapeados y compartidos entre workers
+    modo: str = 'pickle'
+    # Modelos secundarios que aún se cargan en segundo plano (arranque rápido)
+    pendientes: tuple = ()
+
+    @property
+    def disponible(self) -> bool:
+        return self.rf is not None or self.motor_rf is not None
+
+    @property
+    def tiene_dt(self) -> bool:
+        return self.dt is not None or self.motor_dt is not None
+
+    def resumen(self) -> dict:
+        return {
+            'version': self.version,
+            'cargado_en': self.cargado_en,
+            'modo': self.modo,
+            'random_forest': self.disponible,
+            'decision_tree': self.tiene_dt,
+            'svm': self.svm is not None and self.scaler is not None,
+            'motor_compilado': self.motor_rf is not None,
+            'pendientes': list(self.pendientes),
+        }
+
+
+def buscar_directorio_modelos() -> str | None:
+    """Localiza ml_models/ (Docker: /app/ml_models; Local: ml_models en proyecto/)."""
+    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    candidates = [
+        os.environ.get('MODELOS_DIR') or '',
+        os.path.join(base_dir, 'ml_models'),
+        os.path.join(base_dir, '..', 'ml_models'),
+    ]
+    for d in candidates:
+        if d and os.path.isfile(os.path.join(d, 'random_forest_model.pkl')):
+            return d
+    return None
+
+
+def firma_directorio(models_dir: str | None) -> tuple:
+    """(nombre, mtime_ns, tamaño) de cada artefacto; cambia cuando se despliega un modelo nuevo."""
+    if not models_dir:
+        return ()
+    firma = []
+    for nombre in ARCHIVOS_MODELOS:
+        try:
+            st = os.stat(os.path.join(models_dir, nombre))
+            firma.append((nombre, st.st_mtime_ns, st.st_size))
+        except OSError:
+            firma.append((nombre, None, None))
+    return tuple(firma)
+
+
+def _compilar(modelo) -> BosqueCompilado | None:
+    """Compila un modelo de árboles a arreglos planos; None si no es posible (se usa sklearn)."""
+    if modelo is None:
+        return None
+    try:
+        return BosqueCompilado.desde_sklearn(modelo)
+    except Exception:
+        return None
+
+
+def _cargar_opcional(ruta: str, mmap_mode: str | None = None):
+    try:
+        return joblib.load(ruta, mmap_mode=mmap_mode)
+    except Exception:
+        return None
+
+
+def modo_compartido() -> bool:
+    """MODELOS_MMAP=true: servir RF/DT desde arreglos compilados mapeados en memoria (compartidos entre workers)."""
+    return os.getenv('MODELOS_MMAP', 'false').lower() in ('true', '1', 'yes')
+
+
+def directorio_compilado(models_dir: str) -> str:
+    return os.getenv('MODELOS_MMAP_DIR') or os.path.join(models_dir, 'compilado')
+
+
+def _firma_compilada(destino: str) -> list | None:
+    try:
+        with open(os.path.join(destino, 'firma.json'), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def exportar_compilados(models_dir: str, destino: str | None = None) -> str:
+    """
+    Compila RF y DT desde los pickles y los guarda como .npy mapeables junto con la firma de origen.
+    El directorio se escribe aparte y se reemplaza con rename para que ningún worker lea una exportación a medias.
+    """
+    destino = destino or directorio_compilado(models_dir)
+    firma = firma_directorio(models_dir)
+    rf = joblib.load(os.path.join(models_dir, 'random_forest_model.pkl'))
+    dt = joblib.load(os.path.join(models_dir, 'decision_tree_model.pkl'))
+
+    padre = os.path.dirname(os.path.abspath(destino))
+    os.makedirs(padre, exist_ok=True)
+    temporal = tempfile.mkdtemp(prefix='.compilado-', dir=padre)
+    try:
+        BosqueCompilado.desde_sklearn(rf).guardar(os.path.join(temporal, 'rf'))
+        BosqueCompilado.desde_sklearn(dt).guardar(os.path.join(temporal, 'dt'))
+        np.save(os.path.join(temporal, 'rf', 'importancias.npy'), np.asarray(rf.feature_importances_, dtype=np.float64))
+        with open(os.path.join(temporal, 'firma.json'), 'w', encoding='utf-8') as f:
+            json.dump(firma, f)
+        anterior = None
+        if os.path.isdir(destino):
+            anterior = f'{destino}.anterior-{os.getpid()}'
+            os.rename(destino, anterior)
+        os.rename(temporal, destino)
+        # Los procesos que ya mapearon los archivos anteriores los conservan hasta cerrarlos
+        if anterior:
+            shutil.rmtree(anterior, ignore_errors=True)
+    except Exception:
+        shutil.rmtree(temporal, ignore_errors=True)
+        raise
+    return destino
+
+
+def _preparar_compilados(models_dir: str, firma: tuple) -> str | None:
+    """Retorna el directorio compilado vigente; lo exporta si falta o no corresponde a los pickles actuales."""
+    destino = directorio_compilado(models_dir)
+    firma_json = json.loads(json.dumps(firma))
+    if _firma_compilada(destino) != firma_json:
+        try:
+            exportar_compilados(models_dir, destino)
+        except Exception:
+            return None
+    return destino if _firma_compilada(destino) == firma_json else None
+
+
+def _cargar_primario(version: int, models_dir: str, firma: tuple) -> PaqueteModelos:
+    """Carga solo el Random Forest (desde mmap si está habilitado). Lanza excepción si no se puede."""
+    destino = _preparar_compilados(models_dir, firma) if modo_compartido() else None
+    if destino:
+        try:
+            with etapa('modelos: RF (mmap)'):
+                motor_rf = BosqueCompilado.cargar(os.path.join(destino, 'rf'), mmap_mode='r')
+                importancias = np.asarray(np.load(os.path.join(destino, 'rf', 'importancias.npy'), mmap_mode='r'))
+            return PaqueteModelos(
+                version=version, directorio=models_dir, firma=firma, cargado_en=time.time(),
+                motor_rf=motor_rf, importancias=importancias, modo='mmap',
+            )
+        except Exception:
+            pass  # Se usa la carga desde los pickles
+    # La primera deserialización importa sklearn: suele ser el costo dominante del arranque
+    with etapa('modelos: RF (joblib + import sklearn)'):
+        rf = joblib.load(os.path.join(models_dir, 'random_forest_model.pkl'))
+    with etapa('modelos: RF compilar'):
+        motor_rf = _compilar(rf)
+        importancias = np.asarray(rf.feature_importances_, dtype=np.float64)
+    return PaqueteModelos(
+        version=version, directorio=models_dir, firma=firma, cargado_en=time.time(),
+        rf=rf, motor_rf=motor_rf, importancias=importancias,
+    )
+
+
+def _cargar_secundarios(models_dir: str, compartido: bool) -> dict:
+    """Carga DT, SVM, scaler y nombres de variables. Cada uno es opcional."""
+    campos = {}
+    with etapa('modelos: DT'):
+        if compartido:
+            try:
+                campos['motor_dt'] = BosqueCompilado.cargar(
+                    os.path.join(directorio_compilado(models_dir), 'dt'), mmap_mode='r'
+                )
+            except Exception:
+                pass
+        else:
+            dt = _cargar_opcional(os.path.join(models_dir, 'decision_tree_model.pkl'))
+            campos['dt'] = dt
+            campos['motor_dt'] = _compilar(dt)
+    with etapa('modelos: SVM + scaler'):
+        # libsvm exige buffers escribibles: mmap copy-on-write ('c') comparte páginas hasta que se escriben
+        svm = _cargar_opcional(os.path.join(models_dir, 'svm_model.pkl'), mmap_mode='c' if compartido else None)
+        scaler = _cargar_opcional(os.path.join(models_dir, 'svm_scaler.pkl'))
+        if svm is not None and scaler is not None:
+            campos['svm'] = svm
+            campos['scaler'] = scaler
+    campos['feature_names'] = _cargar_opcional(os.path.join(models_dir, 'feature_names.pkl'))
+    return campos
+
+
+def completar_paquete(paquete: PaqueteModelos, version: int) -> PaqueteModelos:
+    """Retorna un paquete nuevo con el mismo RF y los modelos secundarios cargados."""
+    secundarios = _cargar_secundarios(paquete.directorio, paquete.modo == 'mmap')
+    return replace(paquete, version=version, pendientes=(), **secundarios)
+
+
+def cargar_paquete(version: int, models_dir: str | None = None, solo_primario: bool = False) -> PaqueteModelos:
+    """
+    Carga los artefactos de ml_models/ en un paquete nuevo. Sin RF el paquete queda no disponible.
+    Con solo_primario=True carga únicamente el RF y marca DT y SVM como pendientes.
+    """
+    models_dir = models_dir or buscar_directorio_modelos()
+    if not models_dir:
+        return PaqueteModelos(version=version)
+    firma = firma_directorio(models_dir)
+    try:
+        primario = _cargar_primario(version, models_dir, firma)
+    except Exception:
+        return PaqueteModelos(version=version, directorio=models_dir, firma=firma)
+    if solo_primario:
+        return replace(primario, pendientes=('decision_tree', 'svm'))
+    return completar_paquete(primario, version)
+
+
+def calentar_paquete(paquete: PaqueteModelos) -> None:
+    """Ejecuta una predicción de prueba con cada modelo antes de publicarlo (evita el pico de la primera llamada)."""
+    if not paquete.disponible:
+        return
+    n_features = paquete.motor_rf.n_features if paquete.motor_rf is not None else paquete.rf.n_features_in_
+    X = np.zeros((1, int(n_features or 13)))
+    try:
+        (paquete.motor_rf or paquete.rf).predict_proba(X)
+        if paquete.tiene_dt:
+            (paquete.motor_dt or paquete.dt).predict_proba(X)
+        if paquete.svm is not None:
+            paquete.svm.predict_proba(paquete.scaler.transform(X))
+    except Exception:
+        pass
+
+
+class RegistroModelos:
+    """Mantiene el paquete actual y lo reemplaza atómicamente tras cargar uno nuevo en segundo plano."""
+
+    def __init__(self):
+        self._actual = PaqueteModelos()
+        self._lock = threading.Lock()
+        # Serializa las cargas (admin y vigilancia) para que las versiones sean únicas
+        self._lock_carga = threading.Lock()
+        self._hilo_recarga: threading.Thread | None = None
+        self._oyentes: list = []
+        self.ultimo_error: str | None = None
+        self.recargas = 0
+
+    def actual(self) -> PaqueteModelos:
+        """Paquete vigente. Quien predice debe leerlo una vez y usar solo ese paquete."""
+        return self._actual
+
+    def al_cambiar(self, callback) -> None:
+        """Registra callback(paquete_nuevo) que se invoca tras cada reemplazo."""
+        self._oyentes.append(callback)
+
+    def _publicar(self, paquete: PaqueteModelos) -> None:
+        with self._lock:
+            self._actual = paquete
+            self.recargas += 1
+        for callback in self._oyentes:
+            callback(paquete)
+
+    def cargar(self, reemplazar_si_falla: bool = True, rapido: bool = False) -> PaqueteModelos:
+        """
+        Carga y publica un paquete nuevo de forma síncrona.
+        Si el paquete nuevo no tiene RF y reemplazar_si_falla es False, se conserva el actual.
+        Con rapido=True publica en cuanto el RF está listo y carga DT/SVM en un hilo aparte.
+        """
+        with self._lock_carga:
+            paquete = cargar_paquete(self._actual.version + 1, solo_primario=rapido)
+            if not paquete.disponible and not reemplazar_si_falla and self._actual.disponible:
+                self.ultimo_error = 'No se pudo cargar random_forest_model.pkl; se conserva la versión actual'
+                return self._actual
+            calentar_paquete(paquete)
+            self.ultimo_error = None
+            self._publicar(paquete)
+        if paquete.disponible and paquete.pendientes:
+            threading.Thread(
+                target=self._completar, args=(paquete,), name='cardionet-carga-secundarios', daemon=True
+            ).start()
+        return paquete
+
+    def _completar(self, primario: PaqueteModelos) -> None:
+        """Carga los modelos secundarios y publica el paquete completo, salvo que ya lo haya reemplazado otra carga."""
+        try:
+            with self._lock_carga:
+                if self._actual is not primario:
+                    return
+                completo = completar_paquete(primario, primario.version + 1)
+                calentar_paquete(completo)
+                self._publicar(completo)
+        except Exception as e:
+            self.ultimo_error = type(e).__name__  # sin rutas ni detalles: se expone en /api/metricas
+
+    @property
+    def recargando(self) -> bool:
+        hilo = self._hilo_recarga
+        return hilo is not None and hilo.is_alive()
+
+    def recargar_en_segundo_plano(self) -> bool:
+        """Inicia una recarga en un hilo. Retorna False si ya hay una en curso."""
+        with self._lock:
+            if self.recargando:
+                return False
+            self._hilo_recarga = threading.Thread(
+                target=self._recargar_seguro, name='cardionet-recarga-modelos', daemon=True
+            )
+            self._hilo_recarga.start()
+        return True
+
+    def _recargar_seguro(self) -> None:
+        try:
+            self.cargar(reemplazar_si_falla=False)
+        except Exception as e:
+            self.ultimo_error = type(e).__name__
+
+    def iniciar_vigilancia(self, intervalo_seg: float) -> threading.Thread | None:
+        """
+        Revisa periódicamente mtime/tamaño de los artefactos y recarga al detectar cambios.
+        Espera a que la firma se mantenga estable un intervalo para no leer pickles a medio copiar.
+        """
+        if intervalo_seg <= 0:
+            return None
+
+        def vigilar():
+            pendiente = None
+            intentada = None
+            while True:
+                time.sleep(intervalo_seg)
+                firma = firma_directorio(self._actual.directorio or buscar_directorio_modelos())
+                if not firma or firma == self._actual.firma or firma == intentada:
+                    pendiente = None
+                elif firma == pendiente:
+                    # Firma estable durante un intervalo completo: la copia terminó
+                    pendiente = None
+                    intentada = firma
+                    self._recargar_seguro()
+                else:
+                    pendiente = firma
+
+        hilo = threading.Thread(target=vigilar, name='cardionet-vigilancia-modelos', daemon=True)
+        hilo.start()
+        return hilo
+
+    def estado(self) -> dict:
+        return {
+            **self._actual.resumen(),
+            'recargando': self.recargando,
+            'recargas': self.recargas,
+            'ultimo_error': self.ultimo_error,
+        }
@@ -0,0 +1,174 @@
+"""
+Clusters precalculados del mapa de cardiólogos, por nivel de zoom.
+
+Para cada zoom de 0 a MAPA_ZOOM_MAX_CLUSTER los cardiólogos con coordenadas se agrupan en
+celdas de MAPA_CLUSTER_PX píxeles (proyección Web Mercator, teselas de 256 px). Cada cluster
+guarda cantidad, centroide y el médico mejor calificado; en el zoom más fino también sus ids,
+que se usan para devolver marcadores individuales por encima de MAPA_ZOOM_MAX_CLUSTER.
+Las capas solo se recalculan cuando cambian coordenadas o calificaciones en el directorio;
+los datos de cada médico se toman siempre del snapshot vigente.
+"""
+import math
+import os
+import threading
+from dataclasses import dataclass
+
+from repositories.directorio_medicos import obtener_snapshot
+from utils.especialidades import ETIQUETA_CARDIOLOGIA
+
+MAPA_CLUSTER_PX = int(os.getenv('MAPA_CLUSTER_PX', 60))
+MAPA_ZOOM_MAX_CLUSTER = int(os.getenv('MAPA_ZOOM_MAX_CLUSTER', 15))
+LAT_MAX_MERCATOR = 85.05112878
+
+
+@dataclass(frozen=True)
+class Cluster:
+    cantidad: int
+    lat: float
+    lng: float
+    destacado_id: int
+    ids: tuple          # solo en el zoom más fino
+
+
+@dataclass(frozen=True)
+class _Capas:
+    firma: tuple
+    zooms: tuple        # por zoom: dict (x, y) de celda -> Cluster
+
+
+def _mercator(lat: float, lng: float) -> tuple[float, float]:
+    """Coordenadas normalizadas [0, 1) de Web Mercator (y crece hacia el sur)."""
+    lat = max(-LAT_MAX_MERCATOR, min(LAT_MAX_MERCATOR, lat))
+    x = (lng + 180.0) / 360.0
+    seno = math.sin(math.radians(lat))
+    y = 0.5 - math.log((1 + seno) / (1 - seno)) / (4 * math.pi)
+    return min(max(x, 0.0), 0.999999999), min(max(y, 0.0), 0.999999999)
+
+
+def _celdas_por_eje(zoom: int) -> int:
+    return max(1, (256 << zoom) // MAPA_CLUSTER_PX)
+
+
+def _construir(puntos: tuple) -> tuple:
+    """puntos: (id, lat, lng) en orden de calificación desc, así el primero de cada celda es el destacado."""
+    proyectados = [(medico_id, lat, lng, *_mercator(lat, lng)) for medico_id, lat, lng in puntos]
+    zooms = []
+    for zoom in range(MAPA_ZOOM_MAX_CLUSTER + 1):
+        n = _celdas_por_eje(zoom)
+        grupos = {}
+        for medico_id, lat, lng, x, y in proyectados:
+            grupo = grupos.get((int(x * n), int(y * n)))
+            if grupo is None:
+                grupos[(int(x * n), int(y * n))] = [1, lat, lng, medico_id, [medico_id]]
+            else:
+                grupo[0] += 1
+                grupo[1] += lat
+                grupo[2] += lng
+                grupo[4].append(medico_id)
+        fino = zoom == MAPA_ZOOM_MAX_CLUSTER
+        zooms.append({
+            celda: Cluster(cantidad, suma_lat / cantidad, suma_lng / cantidad, destacado, tuple(ids) if fino else ())
+            for celda, (cantidad, suma_lat, suma_lng, destacado, ids) in grupos.items()
+        })
+    return tuple(zooms)
+
+
+class _ClustersMapa:
+    def __init__(self):
+        self._capas: _Capas | None = None
+        self._version: str | None = None
+        self._lock = threading.Lock()
+        self.reconstrucciones = 0
+
+    def capas(self, directorio) -> _Capas:
+        capas = self._capas
+        if capas is not None and self._version == directorio.clave:
+            return capas
+        with self._lock:
+            if self._capas is not None and self._version == directorio.clave:
+                return self._capas
+            puntos = tuple(
+                (m['id'], m['latitud'], m['longitud'])
+                for m, tags in zip(directorio.medicos, directorio.etiquetas)
+                if ETIQUETA_CARDIOLOGIA in tags and m['latitud'] is not None and m['longitud'] is not None
+            )
+            # El orden de los puntos refleja las calificaciones: misma firma = mismas capas
+            if self._capas is None or self._capas.firma != puntos:
+                self._capas = _Capas(firma=puntos, zooms=_construir(puntos))
+                self.reconstrucciones += 1
+            self._version = directorio.clave
+            return self._capas
+
+    def estadisticas(self) -> dict:
+        capas = self._capas
+        return {
+            'version': self._version,
+            'puntos': len(capas.firma) if capas else 0,
+            'clusters_por_zoom': [len(z) for z in capas.zooms] if capas else [],
+            'reconstrucciones': self.reconstrucciones,
+            'cluster_px': MAPA_CLUSTER_PX,
+            'zoom_max_cluster': MAPA_ZOOM_MAX_CLUSTER,
+        }
+
+
+_clusters = _ClustersMapa()
+
+
+def _en_rango(nivel: dict, x0: int, x1: int, y0: int, y1: int):
+    """Clusters del nivel cuyas celdas caen en el rango (recorre lo que sea más corto)."""
+    if (x1 - x0 + 1) * (y1 - y0 + 1) <= len(nivel):
+        for x in range(x0, x1 + 1):
+            for y in range(y0, y1 + 1):
+                cluster = nivel.get((x, y))
+                if cluster is not None:
+                    yield cluster
+    else:
+        for (x, y), cluster in nivel.items():
+            if x0 <= x <= x1 and y0 <= y <= y1:
+                yield cluster
+
+
+def obtener_clusters(oeste: float, sur: float, este: float, norte: float, zoom: int) -> dict:
+    """Clusters y marcadores individuales del área visible en el zoom dado."""
+    directorio = obtener_snapshot()
+    capas = _clusters.capas(directorio)
+    nivel = min(zoom, MAPA_ZOOM_MAX_CLUSTER)
+    n = _celdas_por_eje(nivel)
+    x0, y0 = _mercator(norte, oeste)
+    x1, y1 = _mercator(sur, este)
+
+    def visible(medico) -> bool:
+        return sur <= medico['latitud'] <= norte and oeste <= medico['longitud'] <= este
+
+    clusters, medicos = [], []
+    for cluster in _en_rango(capas.zooms[nivel], int(x0 * n), int(x1 * n), int(y0 * n), int(y1 * n)):
+        if zoom > MAPA_ZOOM_MAX_CLUSTER:
+            medicos.extend(m for m in map(directorio.por_id.get, cluster.ids) if m is not None and visible(m))
+            continue
+        destacado = directorio.por_id.get(cluster.destacado_id)
+        if destacado is None:
+            continue
+        if cluster.cantidad == 1:
+            if visible(destacado):
+                medicos.append(destacado)
+            continue
+        clusters.append({
+            'lat': round(cluster.lat, 6),
+            'lng': round(cluster.lng, 6),
+            'cantidad': cluster.cantidad,
+            'destacado': {
+                'id': destacado['id'],
+                'nombre': destacado['nombre'],
+                'calificacion': destacado['calificacion'],
+            },
+        })
+    return {
+        'zoom': zoom,
+        'clusters': clusters,
+        'medicos': medicos,
+        'total': sum(c['cantidad'] for c in clusters) + len(medicos),
+    }
+
+
+def estadisticas_clusters_mapa() -> dict:
+    return _clusters.estadisticas()
@@ -0,0 +1,229 @@
+"""
+Snapshot en memoria del directorio de médicos.
+
+La tabla medicos tiene pocos miles de filas y cambia poco: cada worker guarda una copia
+inmutable, ordenada por calificación y con los dict de la API ya armados, y la reemplaza
+cuando cambia la versión del directorio (directorio_version, que incrementan
+actualizar_perfil_medico, registrar_medico y los scripts de importación y geocodificación). La versión se
+consulta como máximo cada DIRECTORIO_VERIFICAR_SEG segundos. Como red de seguridad para
+cambios hechos a mano en SQL, el snapshot se reconstruye igual pasados DIRECTORIO_TTL_SEG;
+por eso los ETag y las cachés derivadas usan `clave` (versión + huella del contenido) y no solo
+la versión.
+"""
+import bisect
+import hashlib
+import heapq
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+
+from sqlalchemy.exc import OperationalError
+
+from database.config import SessionLocal, engine, engine_lectura, estado_replica
+from repositories.medico_repo import medico_a_dict, obtener_directorio, obtener_version_directorio
+from utils.especialidades import ETIQUETA_CARDIOLOGIA, etiquetas_especialidad, normalizar_etiqueta
+
+DIRECTORIO_VERIFICAR_SEG = float(os.getenv('DIRECTORIO_VERIFICAR_SEG', 5))
+DIRECTORIO_TTL_SEG = float(os.getenv('DIRECTORIO_TTL_SEG', 600))
+
+_NUMERO = re.compile(r'\d[\d,]*(?:\.\d+)?')
+
+
+@dataclass(frozen=True)
+class Directorio:
+    """Copia inmutable de la tabla medicos. Los dict se comparten entre peticiones: no modificarlos."""
+    version: int
+    medicos: tuple              # todos, calificación desc (sin calificación al final), luego id
+    cardiologos: tuple          # subconjunto de medicos con la etiqueta 'cardiologia'
+    claves_cardiologos: tuple   # clave de orden de cada cardiólogo (ver _clave_orden), ascendente
+    etiquetas: tuple            # frozenset de especialidad_tags alineado con medicos
+    distritos: tuple            # distrito normalizado ('' si no hay), alineado con medicos
+    provincias: tuple           # provincia normalizada, alineada con medicos
+    precios: tuple              # precio_visita en soles (float) o None, alineado con medicos
+    por_id: dict
+    construido_en: float
+    huella: str                 # resumen del contenido: igual en todos los workers para los mismos datos
+
+    @property
+    def clave(self) -> str:
+        return f'{self.version}.{self.huella}'
+
+
+def _clave_orden(calificacion: float | None, medico_id: int) -> tuple:
+    """Clave ascendente equivalente a ORDER BY calificacion DESC NULLS LAST, id."""
+    return calificacion is None, -(calificacion or 0.0), medico_id
+
+
+def _precio_soles(precio: str | None) -> float | None:
+    """'S/ 200' -> 200.0; 'S/ 1,200' -> 1200.0; 'S/ 150 - 200' -> 150.0. None si no hay número."""
+    encontrado = _NUMERO.search(precio or '')
+    return float(encontrado.group().replace(',', '')) if encontrado else None
+
+
+def _huella(medicos: tuple, etiquetas: tuple) -> str:
+    resumen = hashlib.blake2b(digest_size=8)
+    for medico, tags in zip(medicos, etiquetas):
+        resumen.update(repr((tuple(medico.values()), sorted(tags))).encode())
+    return resumen.hexdigest()
+
+
+def _construir(db) -> Directorio:
+    # La versión se lee antes que las filas: si cambian en medio, la próxima verificación reconstruye
+    version = obtener_version_directorio(db)
+    filas = obtener_directorio(db)
+    medicos = tuple(medico_a_dict(m) for m in filas)
+    # Filas aún sin backfill: mismas etiquetas que calcularía el ORM al guardar
+    etiquetas = tuple(frozenset(m.especialidad_tags or etiquetas_especialidad(m.especialidad, m.subespecialidad))
+                      for m in filas)
+    cardiologos = tuple(m for m, tags in zip(medicos, etiquetas) if ETIQUETA_CARDIOLOGIA in tags)
+    return Directorio(
+        version=version,
+        medicos=medicos,
+        cardiologos=cardiologos,
+        claves_cardiologos=tuple(_clave_orden(m['calificacion'], m['id']) for m in cardiologos),
+        etiquetas=etiquetas,
+        distritos=tuple(normalizar_etiqueta(m['distrito']) for m in medicos),
+        provincias=tuple(normalizar_etiqueta(m['provincia']) for m in medicos),
+        precios=tuple(_precio_soles(m['precio_visita']) for m in medicos),
+        por_id={m['id']: m for m in medicos},
+        construido_en=time.time(),
+        huella=_huella(medicos, etiquetas),
+    )
+
+
+def _con_sesion(funcion, primaria: bool = False):
+    """Ejecuta funcion(db) en la réplica (si está sana) o en la primaria, con fallback a la primaria."""
+    bind = engine if primaria else engine_lectura()
+    db = SessionLocal(bind=bind)
+    try:
+        return funcion(db)
+    except OperationalError as e:
+        if bind is engine:
+            raise
+        estado_replica.marcar_caida(e)
+        return _con_sesion(funcion, primaria=True)
+    finally:
+        db.close()
+
+
+class _Snapshot:
+    def __init__(self):
+        self._actual: Directorio | None = None
+        self._lock = threading.Lock()
+        self._verificado_en = 0.0
+        self._forzar_primaria = False
+        self.reconstrucciones = 0
+
+    def obtener(self) -> Directorio:
+        actual = self._actual
+        if actual is not None and time.monotonic() - self._verificado_en < DIRECTORIO_VERIFICAR_SEG:
+            return actual
+        # Con un snapshot vigente, solo un hilo verifica y los demás siguen con el actual
+        if not self._lock.acquire(blocking=actual is None):
+            return actual
+        try:
+            if self._actual is not actual and self._actual is not None:
+                return self._actual
+            primaria = self._forzar_primaria
+            version = _con_sesion(obtener_version_directorio, primaria)
+            vencido = self._actual is not None and time.time() - self._actual.construido_en > DIRECTORIO_TTL_SEG
+            if self._actual is None or version != self._actual.version or primaria or vencido:
+                self._actual = _con_sesion(_construir, primaria)
+                self.reconstrucciones += 1
+            self._forzar_primaria = False
+            self._verificado_en = time.monotonic()
+            return self._actual
+        finally:
+            self._lock.release()
+
+    def invalidar(self) -> None:
+        """Tras un cambio hecho por este proceso: reconstruir desde la primaria en el próximo acceso."""
+        self._forzar_primaria = True
+        self._verificado_en = 0.0
+
+    def estadisticas(self) -> dict:
+        actual = self._actual
+        return {
+            'version': actual.version if actual else None,
+            'medicos': len(actual.medicos) if actual else 0,
+            'cardiologos': len(actual.cardiologos) if actual else 0,
+            'construido_en': actual.construido_en if actual else None,
+            'reconstrucciones': self.reconstrucciones,
+            'verificar_cada_seg': DIRECTORIO_VERIFICAR_SEG,
+            'ttl_seg': DIRECTORIO_TTL_SEG,
+        }
+
+
+_snapshot = _Snapshot()
+
+
+def obtener_snapshot() -> Directorio:
+    """Snapshot vigente del directorio (lo construye o renueva si hace falta)."""
+    return _snapshot.obtener()
+
+
+def version_directorio() -> str:
+    """Versión y huella del snapshot vigente (base de los ETag de los endpoints del directorio)."""
+    return _snapshot.obtener().clave
+
+
+def invalidar_directorio() -> None:
+    _snapshot.invalidar()
+
+
+def estadisticas_directorio() -> dict:
+    return _snapshot.estadisticas()
+
+
+def recomendar(especialidades: list[str], limite: int = 5, distrito: str = None,
+               provincia: str = None, precio_max: float = None) -> list[dict]:
+    """
+    Top de médicos para un perfil en una sola pasada por el snapshot: cardiólogos y médicos con
+    alguna de las especialidades pedidas. Orden: coincidencias con las preferencias (distrito +2,
+    provincia +1, precio conocido dentro del presupuesto +1), calificación, especialistas antes
+    que generales. Con precio_max se excluye a quien tiene un precio conocido mayor.
+    """
+    directorio = obtener_snapshot()
+    buscadas = {normalizar_etiqueta(e) for e in especialidades} - {''}
+    distrito = normalizar_etiqueta(distrito)
+    provincia = normalizar_etiqueta(provincia)
+
+    def candidatos():
+        for posicion, (medico, tags) in enumerate(zip(directorio.medicos, directorio.etiquetas)):
+            especialista = not buscadas.isdisjoint(tags)
+            if not especialista and ETIQUETA_CARDIOLOGIA not in tags:
+                continue
+            puntos = 0
+            if precio_max is not None:
+                precio = directorio.precios[posicion]
+                if precio is not None:
+                    if precio > precio_max:
+                        continue
+                    puntos += 1
+            if distrito and directorio.distritos[posicion] == distrito:
+                puntos += 2
+            if provincia and directorio.provincias[posicion] == provincia:
+                puntos += 1
+            # posicion desempata y evita comparar los dict
+            yield (-puntos, -(medico['calificacion'] or 0), not especialista, posicion), medico
+
+    return [medico for _, medico in heapq.nsmallest(limite, candidatos(), key=lambda c: c[0])]
+
+
+def contar_cardiologos() -> int:
+    return len(obtener_snapshot().cardiologos)
+
+
+def obtener_todos_cardiologos(limite: int = None, offset: int = 0, despues_de: tuple = None) -> list[dict]:
+    """
+    Cardiólogos ordenados por calificación, con paginación opcional. Con despues_de
+    (calificacion, id) del último de la página anterior, la página empieza justo después
+    de ese médico (búsqueda binaria) y offset se ignora.
+    """
+    directorio = obtener_snapshot()
+    if despues_de is not None:
+        offset = bisect.bisect_right(directorio.claves_cardiologos, _clave_orden(*despues_de))
+    fin = None if limite is None else offset + limite
+    return list(directorio.cardiologos[offset:fin])
@@ -0,0 +1,154 @@
+"""
+Índice espacial en memoria (grilla de celdas de GEO_CELDA_GRADOS) sobre latitud/longitud de medicos.
+
+Se sincroniza con el snapshot del directorio: cuando cambia la versión (por ejemplo, cuando
+geocodificar_medicos.py agrega coordenadas) solo se mueven, agregan o quitan las entradas cuyas
+coordenadas o etiquetas cambiaron; el resto de la grilla no se toca.
+La búsqueda de los k más cercanos recorre anillos de celdas alrededor del punto y se detiene
+cuando el anillo siguiente ya no puede tener a nadie más cerca que el k-ésimo encontrado.
+"""
+import heapq
+import math
+import os
+import threading
+
+from repositories.directorio_medicos import Directorio, obtener_snapshot
+
+GEO_CELDA_GRADOS = float(os.getenv('GEO_CELDA_GRADOS', 0.05))   # ~5.5 km en Lima
+RADIO_TIERRA_KM = 6371.0088
+KM_POR_GRADO = math.pi * RADIO_TIERRA_KM / 180
+
+
+def distancia_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Distancia haversine en km."""
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dlat = p2 - p1
+    dlng = math.radians(lng2 - lng1)
+    a = math.sin(dlat / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dlng / 2) ** 2
+    return 2 * RADIO_TIERRA_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _celda(lat: float, lng: float) -> tuple[int, int]:
+    return math.floor(lat / GEO_CELDA_GRADOS), math.floor(lng / GEO_CELDA_GRADOS)
+
+
+def _distancia_minima_anillo(lat: float, anillo: int) -> float:
+    """Cota inferior (km) de la distancia a cualquier punto de un anillo de celdas."""
+    if anillo <= 1:
+        return 0.0
+    lat_extrema = min(89.0, abs(lat) + (anillo + 1) * GEO_CELDA_GRADOS)
+    return (anillo - 1) * GEO_CELDA_GRADOS * KM_POR_GRADO * math.cos(math.radians(lat_extrema))
+
+
+class IndiceGeo:
+    def __init__(self):
+        self._celdas: dict[tuple[int, int], set[int]] = {}
+        self._entradas: dict[int, tuple] = {}      # id -> (lat, lng, etiquetas)
+        self._version: str | None = None
+        self._lock = threading.Lock()
+        self.sincronizaciones = 0
+        self.movimientos = 0
+
+    def _quitar(self, medico_id: int) -> None:
+        lat, lng, _ = self._entradas.pop(medico_id)
+        celda = _celda(lat, lng)
+        miembros = self._celdas[celda]
+        miembros.discard(medico_id)
+        if not miembros:
+            del self._celdas[celda]
+
+    def _poner(self, medico_id: int, entrada: tuple) -> None:
+        self._entradas[medico_id] = entrada
+        self._celdas.setdefault(_celda(entrada[0], entrada[1]), set()).add(medico_id)
+
+    def sincronizar(self, directorio: Directorio) -> None:
+        """Aplica al índice solo las diferencias con el snapshot."""
+        with self._lock:
+            if directorio.clave == self._version:
+                return
+            nuevas = {
+                m['id']: (m['latitud'], m['longitud'], tags)
+                for m, tags in zip(directorio.medicos, directorio.etiquetas)
+                if m['latitud'] is not None and m['longitud'] is not None
+            }
+            for medico_id in self._entradas.keys() - nuevas.keys():
+                self._quitar(medico_id)
+                self.movimientos += 1
+            for medico_id, entrada in nuevas.items():
+                actual = self._entradas.get(medico_id)
+                if actual == entrada:
+                    continue
+                if actual is not None:
+                    self._quitar(medico_id)
+                self._poner(medico_id, entrada)
+                self.movimientos += 1
+            self._version = directorio.clave
+            self.sincronizaciones += 1
+
+    def cercanos(self, lat: float, lng: float, k: int, radio_km: float, etiqueta: str) -> list[tuple[float, int]]:
+        """Los k (distancia_km, id) más cercanos con la etiqueta dada, dentro de radio_km."""
+        centro_lat, centro_lng = _celda(lat, lng)
+        mejores = []        # heap de (-distancia, id) con los k mejores
+        with self._lock:
+            anillo = 0
+            while True:
+                cota = _distancia_minima_anillo(lat, anillo)
+                if cota > radio_km or (len(mejores) == k and cota > -mejores[0][0]):
+                    break
+                if not self._celdas or anillo * GEO_CELDA_GRADOS > 180:
+                    break
+                for celda in self._anillo(centro_lat, centro_lng, anillo):
+                    for medico_id in self._celdas.get(celda, ()):
+                        m_lat, m_lng, tags = self._entradas[medico_id]
+                        if etiqueta not in tags:
+                            continue
+                        d = distancia_km(lat, lng, m_lat, m_lng)
+                        if d > radio_km:
+                            continue
+                        if len(mejores) < k:
+                            heapq.heappush(mejores, (-d, medico_id))
+                        elif d < -mejores[0][0]:
+                            heapq.heapreplace(mejores, (-d, medico_id))
+                anillo += 1
+        return sorted((-d, medico_id) for d, medico_id in mejores)
+
+    @staticmethod
+    def _anillo(fila: int, columna: int, anillo: int):
+        if anillo == 0:
+            yield fila, columna
+            return
+        for dc in range(-anillo, anillo + 1):
+            yield fila - anillo, columna + dc
+            yield fila + anillo, columna + dc
+        for df in range(-anillo + 1, anillo):
+            yield fila + df, columna - anillo
+            yield fila + df, columna + anillo
+
+    def estadisticas(self) -> dict:
+        return {
+            'version': self._version,
+            'con_coordenadas': len(self._entradas),
+            'celdas': len(self._celdas),
+            'celda_grados': GEO_CELDA_GRADOS,
+            'sincronizaciones': self.sincronizaciones,
+            'movimientos': self.movimientos,
+        }
+
+
+_indice = IndiceGeo()
+
+
+def buscar_cercanos(lat: float, lng: float, k: int, radio_km: float, etiqueta: str) -> list[dict]:
+    """Médicos más cercanos al punto (copias del dict del directorio con distancia_km)."""
+    directorio = obtener_snapshot()
+    _indice.sincronizar(directorio)
+    resultado = []
+    for distancia, medico_id in _indice.cercanos(lat, lng, k, radio_km, etiqueta):
+        medico = directorio.por_id.get(medico_id)
+        if medico is not None:
+            resultado.append({**medico, 'distancia_km': round(distancia, 2)})
+    return resultado
+
+
+def estadisticas_indice_geo() -> dict:
+    return _indice.estadisticas()
@@ -1,6 +1,9 @@
 """Repositorio de acceso a datos de médicos."""
+from sqlalchemy import and_, func, nulls_last, or_, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
-from database.models import Medico
+from database.models import Medico, DirectorioVersion
+from utils.especialidades import ETIQUETA_CARDIOLOGIA, normalizar_etiqueta
 
 
 def medico_a_dict(m) -> dict:
@@ -35,32 +38,65 @@ def obtener_por_id(db: Session, medico_id: int) -> Medico | None:
     return db.query(Medico).filter(Medico.id == medico_id).first()
 
 
-def buscar_por_especialidad(db: Session, especialidad: str, limite: int = 5) -> list:
-    """Busca médicos por subespecialidad o especialidad CARDIOLOGIA."""
-    return db.query(Medico).filter(
-        (Medico.subespecialidad.ilike(f'%{especialidad}%')) |
-        _es_cardiologo()
-    ).order_by(Medico.calificacion.desc()).limit(limite).all()
-
-
-def buscar_cardiologos_generales(db: Session, limite: int = 5) -> list:
-    """Obtiene los mejores cardiólogos generales."""
-    return db.query(Medico).filter(_es_cardiologo()).order_by(Medico.calificacion.desc()).limit(limite).all()
-
-
-def _es_cardiologo():
-    """Condición para filtrar cardiólogos (CARDIOLOGIA, CARDIÓLOGO, etc.)."""
-    return Medico.especialidad.ilike('%CARDIOLOG%')
-
-
-def contar_cardiologos(db: Session) -> int:
-    """Cuenta el total de cardiólogos."""
-    return db.query(Medico).filter(_es_cardiologo()).count()
-
-
-def obtener_todos_cardiologos(db: Session, limite: int = None, offset: int = 0) -> list:
-    """Obtiene cardiólogos ordenados por calificación, con paginación opcional."""
-    query = db.query(Medico).filter(_es_cardiologo()).order_by(Medico.calificacion.desc()).offset(offset)
-    if limite is not None:
-        query = query.limit(limite)
-    return query.all()
+def obtener_directorio(db: Session) -> list:
+    """Todos los médicos, los mejor calificados primero (sin calificación al final)."""
+    return db.query(Medico).order_by(nulls_last(Medico.calificacion.desc()), Medico.id).all()
+
+
+def obtener_cardiologos_despues_de(db: Session, despues_de: tuple | None, limite: int) -> list:
+    """
+    Página de cardiólogos por clave (calificacion, id) en el orden del directorio, sin OFFSET:
+    arranca donde terminó la página anterior usando idx_medicos_calificacion_id.
+    """
+    consulta = db.query(Medico).filter(Medico.especialidad_tags.contains([ETIQUETA_CARDIOLOGIA]))
+    if despues_de is not None:
+        calificacion, medico_id = despues_de
+        if calificacion is None:
+            consulta = consulta.filter(Medico.calificacion.is_(None), Medico.id > medico_id)
+        else:
+            consulta = consulta.filter(or_(
+                Medico.calificacion < calificacion,
+                and_(Medico.calificacion == calificacion, Medico.id > medico_id),
+                Medico.calificacion.is_(None),
+            ))
+    return consulta.order_by(nulls_last(Medico.calificacion.desc()), Medico.id).limit(limite).all()
+
+
+_COLUMNAS_EXPORTACION = (
+    Medico.id, Medico.nombre, Medico.especialidad, Medico.subespecialidad, Medico.region,
+    Medico.calificacion, Medico.telefono, Medico.ubicacion_consultorio, Medico.provincia,
+    Medico.distrito, Medico.num_opiniones, Medico.precio_visita, Medico.direccion_completa,
+    Medico.latitud, Medico.longitud, Medico.email,
+)
+
+
+def iterar_medicos(db: Session, distrito: str = None, etiqueta: str = None, desde_id: int = 0,
+                   tamano_lote: int = 500):
+    """
+    Filas (no entidades ORM) con id > desde_id en orden de id, leídas con un cursor del
+    servidor de tamano_lote en tamano_lote: la memoria no crece con el tamaño de la tabla.
+    Las filas admiten medico_a_dict.
+    """
+    consulta = select(*_COLUMNAS_EXPORTACION).where(Medico.id > desde_id).order_by(Medico.id)
+    if distrito:
+        consulta = consulta.where(func.lower(Medico.distrito) == distrito.strip().lower())
+    if etiqueta:
+        consulta = consulta.where(Medico.especialidad_tags.contains([normalizar_etiqueta(etiqueta)]))
+    return db.execute(consulta.execution_options(yield_per=tamano_lote))
+
+
+def obtener_version_directorio(db: Session) -> int:
+    """Versión actual del directorio (0 si aún no hubo cambios registrados)."""
+    return db.execute(select(DirectorioVersion.version).where(DirectorioVersion.id == 1)).scalar() or 0
+
+
+def incrementar_version_directorio(db: Session) -> None:
+    """
+    Marca que la tabla medicos cambió. Se ejecuta en la misma transacción que el cambio
+    (sin commit): los workers reconstruyen su snapshot al ver la versión nueva.
+    """
+    sentencia = pg_insert(DirectorioVersion).values(id=1, version=1)
+    db.execute(sentencia.on_conflict_do_update(
+        index_elements=[DirectorioVersion.id],
+        set_={'version': DirectorioVersion.version + 1, 'actualizado_en': func.now()},
+    ))
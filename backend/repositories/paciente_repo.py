@@ -1,39 +1,108 @@
 """Repositorio de acceso a datos de pacientes y evaluaciones."""
+from sqlalchemy import insert, literal, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from database.models import Paciente, Evaluacion
 
 
-def obtener_o_crear_paciente(db: Session, paciente_data: dict) -> int:
-    """Obtiene el ID de un paciente existente por DNI o crea uno nuevo."""
-    paciente_existente = db.query(Paciente).filter(Paciente.dni == paciente_data['dni']).first()
-    if paciente_existente:
-        return paciente_existente.id
-    nuevo_paciente = Paciente(**paciente_data)
-    db.add(nuevo_paciente)
-    db.commit()
-    db.refresh(nuevo_paciente)
-    return nuevo_paciente.id
-
-
-def guardar_evaluacion(db: Session, paciente_id: int | None, parametros: list, prediccion: int) -> None:
-    """Guarda una evaluación en la base de datos (paciente_id opcional para datos de entrenamiento)."""
-    nueva_evaluacion = Evaluacion(
-        paciente_id=paciente_id,
-        edad=parametros[0],
-        sexo=parametros[1],
-        dolor_pecho=parametros[2],
-        presion_arterial=parametros[3],
-        colesterol=parametros[4],
-        glucosa=parametros[5],
-        resultado_ecg=parametros[6],
-        frecuencia_cardiaca_max=parametros[7],
-        angina=parametros[8],
-        depresion_st=parametros[9],
-        pendiente_st=parametros[10],
-        numero_vasos=parametros[11],
-        thalassemia=parametros[12],
-        resultado_prediccion=int(prediccion),
-        modelo_usado='Random Forest'
-    )
-    db.add(nueva_evaluacion)
+def _upsert_pacientes(filas: list[dict]):
+    """
+    INSERT ... ON CONFLICT (dni) ... RETURNING dni, id para una o varias filas.
+    Un paciente existente no se modifica: el UPDATE reasigna el mismo DNI solo para que RETURNING
+    devuelva su id (/api/evaluacion no requiere autenticación).
+    """
+    sentencia = pg_insert(Paciente).values(filas)
+    return sentencia.on_conflict_do_update(
+        index_elements=[Paciente.dni],
+        set_={'dni': sentencia.excluded.dni},
+    ).returning(Paciente.dni, Paciente.id)
+
+
+def _error_integridad(e: IntegrityError) -> ValueError:
+    """El DNI ya no puede chocar (upsert); lo que queda es una historia clínica de otro DNI."""
+    if 'historia_clinica' in str(e.orig):
+        return ValueError('La historia clínica ya está registrada con otro DNI')
+    return ValueError('Los datos del paciente entran en conflicto con un registro existente')
+
+
+def _campos_evaluacion(paciente_id: int | None, parametros: list, prediccion: int) -> dict:
+    """Mapea los 13 parámetros del modelo a las columnas de Evaluacion."""
+    return {
+        'paciente_id': paciente_id,
+        'edad': parametros[0],
+        'sexo': parametros[1],
+        'dolor_pecho': parametros[2],
+        'presion_arterial': parametros[3],
+        'colesterol': parametros[4],
+        'glucosa': parametros[5],
+        'resultado_ecg': parametros[6],
+        'frecuencia_cardiaca_max': parametros[7],
+        'angina': parametros[8],
+        'depresion_st': parametros[9],
+        'pendiente_st': parametros[10],
+        'numero_vasos': parametros[11],
+        'thalassemia': parametros[12],
+        'resultado_prediccion': int(prediccion),
+        'modelo_usado': 'Random Forest',
+    }
+
+
+def guardar_evaluacion_paciente(db: Session, paciente_data: dict, parametros: list, prediccion: int) -> int:
+    """
+    Upsert del paciente por DNI e inserción de la evaluación en una sola sentencia
+    (CTE con INSERT ... ON CONFLICT ... RETURNING id) y un solo commit. Retorna el paciente_id.
+    """
+    paciente = _upsert_pacientes([paciente_data]).cte('paciente')
+    campos = _campos_evaluacion(None, parametros, prediccion)
+    del campos['paciente_id']
+    sentencia = insert(Evaluacion).from_select(
+        ['paciente_id', *campos],
+        select(paciente.c.id, *(literal(valor, type_=Evaluacion.__table__.c[columna].type)
+                                for columna, valor in campos.items())),
+    ).returning(Evaluacion.paciente_id)
+    try:
+        paciente_id = db.execute(sentencia).scalar_one()
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        raise _error_integridad(e) from e
+    return paciente_id
+
+
+def guardar_evaluaciones_lote(db: Session, filas: list[tuple[list, int]], paciente_id: int | None = None) -> None:
+    """Inserta varias evaluaciones (parametros, prediccion) con un INSERT multi-fila y un solo commit."""
+    if not filas:
+        return
+    db.execute(insert(Evaluacion), [_campos_evaluacion(paciente_id, p, pred) for p, pred in filas])
     db.commit()
+
+
+def guardar_evaluaciones_con_pacientes(db: Session, items: list[tuple[dict | None, list, int]]) -> list[int | None]:
+    """
+    Guarda varias evaluaciones (paciente_data o None, parametros, prediccion) en una transacción.
+    Un item con paciente usa guardar_evaluacion_paciente (un solo round trip); con varios, un upsert
+    multi-fila de pacientes por DNI y un INSERT multi-fila de evaluaciones. Retorna el paciente_id
+    de cada item en el mismo orden.
+    """
+    if not items:
+        return []
+    if len(items) == 1 and items[0][0]:
+        return [guardar_evaluacion_paciente(db, *items[0])]
+
+    # ON CONFLICT no admite el mismo DNI dos veces en una sentencia: una fila por DNI
+    pacientes = {datos['dni']: datos for datos, _, _ in items if datos}
+    ids_por_dni = {}
+    try:
+        if pacientes:
+            ids_por_dni = dict(db.execute(_upsert_pacientes(list(pacientes.values()))).all())
+        paciente_ids = [ids_por_dni.get(datos['dni']) if datos else None for datos, _, _ in items]
+        db.execute(insert(Evaluacion), [
+            _campos_evaluacion(paciente_id, parametros, prediccion)
+            for paciente_id, (_, parametros, prediccion) in zip(paciente_ids, items)
+        ])
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        raise _error_integridad(e) from e
+    return paciente_ids
@@ -6,12 +6,47 @@ from flask_limiter import Limiter
 from services.auth_service import registrar_paciente, registrar_medico, login
 from utils.jwt_utils import obtener_usuario_desde_request
 from utils.security import mensaje_error_seguro
-from database.config import SessionLocal
+from database.sesion import leer
 from database.models import Usuario, Paciente, Medico
 
 auth_bp = Blueprint('auth', __name__)
 
 
+def _datos_usuario(db, usuario_id: int) -> dict | None:
+    """Usuario autenticado con su paciente o médico vinculado (None si no existe)."""
+    usuario = db.query(Usuario).filter(Usuario.id == usuario_id).first()
+    if not usuario:
+        return None
+
+    resp = {
+        'usuario': {
+            'id': usuario.id,
+            'email': usuario.email,
+            'rol': usuario.rol,
+            'paciente_id': usuario.paciente_id,
+            'medico_id': usuario.medico_id
+        }
+    }
+    if usuario.rol == 'paciente' and usuario.paciente_id:
+        p = db.query(Paciente).filter(Paciente.id == usuario.paciente_id).first()
+        if p:
+            resp['paciente'] = {
+                'id': p.id,
+                'apellidos_nombre': p.apellidos_nombre,
+                'dni': p.dni
+            }
+    if usuario.rol == 'medico' and usuario.medico_id:
+        m = db.query(Medico).filter(Medico.id == usuario.medico_id).first()
+        if m:
+            resp['medico'] = {
+                'id': m.id,
+                'nombre': m.nombre,
+                'especialidad': m.especialidad,
+                'distrito': m.distrito
+            }
+    return resp
+
+
 def init_auth_bp(limiter: Limiter):
     """Registra rutas de auth con rate limiting estricto."""
 
@@ -90,40 +125,10 @@ def init_auth_bp(limiter: Limiter):
             if not payload:
                 return jsonify({'error': 'No autorizado'}), 401
 
-            db = SessionLocal()
-            try:
-                usuario = db.query(Usuario).filter(Usuario.id == int(payload['sub'])).first()
-                if not usuario:
-                    return jsonify({'error': 'Usuario no encontrado'}), 404
-
-                resp = {
-                    'usuario': {
-                        'id': usuario.id,
-                        'email': usuario.email,
-                        'rol': usuario.rol,
-                        'paciente_id': usuario.paciente_id,
-                        'medico_id': usuario.medico_id
-                    }
-                }
-                if usuario.rol == 'paciente' and usuario.paciente_id:
-                    p = db.query(Paciente).filter(Paciente.id == usuario.paciente_id).first()
-                    if p:
-                        resp['paciente'] = {
-                            'id': p.id,
-                            'apellidos_nombre': p.apellidos_nombre,
-                            'dni': p.dni
-                        }
-                if usuario.rol == 'medico' and usuario.medico_id:
-                    m = db.query(Medico).filter(Medico.id == usuario.medico_id).first()
-                    if m:
-                        resp['medico'] = {
-                            'id': m.id,
-                            'nombre': m.nombre,
-                            'especialidad': m.especialidad,
-                            'distrito': m.distrito
-                        }
-                return jsonify(resp)
-            finally:
-                db.close()
+            # Solo lectura: puede atenderse desde la réplica
+            resp = leer(_datos_usuario, int(payload['sub']))
+            if resp is None:
+                return jsonify({'error': 'Usuario no encontrado'}), 404
+            return jsonify(resp)
         except Exception as e:
             return jsonify({'error': mensaje_error_seguro(e)}), 400
@@ -2,11 +2,10 @@
 from flask import Blueprint, request, jsonify
 from flask_limiter import Limiter
 
-from database.config import SessionLocal
-from repositories.paciente_repo import guardar_evaluacion
-from validators.evaluacion_validator import validar_datos_evaluacion
-from services.evaluacion_service import ejecutar_evaluacion
+from validators.evaluacion_validator import validar_datos_evaluacion, validar_lote
+from services.evaluacion_service import ejecutar_evaluacion, ejecutar_evaluacion_lote
 from ml.model_loader import modelo_disponible, predecir_comparativo
+from services.persistencia_diferida import encolar_evaluacion
 from utils.security import mensaje_error_seguro
 
 evaluacion_bp = Blueprint('evaluacion', __name__)
@@ -42,6 +41,28 @@ def init_evaluacion_bp(limiter: Limiter):
         except Exception as e:
             return jsonify({'error': mensaje_error_seguro(e)}), 400
 
+    @evaluacion_bp.route('/evaluacion/lote', methods=['POST'])
+    @limiter.limit("10 per minute")
+    def evaluar_lote():
+        """Evalúa un lote de vectores de parámetros (campañas de tamizaje)."""
+        try:
+            data = request.json
+            filas = validar_lote(data)
+            guardar = data.get('guardar', True) is not False
+
+            if not modelo_disponible():
+                return jsonify({'error': 'Modelo no cargado'}), 500
+
+            resultado = ejecutar_evaluacion_lote(filas, guardar=guardar)
+            return jsonify(resultado)
+
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except RuntimeError as e:
+            return jsonify({'error': str(e)}), 500
+        except Exception as e:
+            return jsonify({'error': mensaje_error_seguro(e)}), 400
+
     @evaluacion_bp.route('/evaluacion/comparativo', methods=['POST'])
     @limiter.limit("30 per minute")
     def evaluacion_comparativo():
@@ -61,14 +82,10 @@ def init_evaluacion_bp(limiter: Limiter):
             comparativo = predecir_comparativo(parametros)
             comparativo['metricas_modelos'] = METRICAS_MODELOS
 
-            # Guardar evaluación (paciente_id=None) para entrenamiento futuro de modelos
+            # Guardar evaluación (paciente_id=None) para entrenamiento futuro de modelos, fuera de la respuesta
             pred_rf = comparativo.get('random_forest')
             if pred_rf is not None:
-                db = SessionLocal()
-                try:
-                    guardar_evaluacion(db, paciente_id=None, parametros=parametros, prediccion=pred_rf['prediccion'])
-                finally:
-                    db.close()
+                encolar_evaluacion(None, parametros, pred_rf['prediccion'])
 
             return jsonify(comparativo)
 
@@ -1,12 +1,22 @@
 """Blueprint para health check."""
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, request
 
-from ml.model_loader import modelo_disponible
+from database.config import estadisticas_pool
+from ml.model_loader import modelo_disponible, estadisticas_cache, estadisticas_coalescedor, estado_modelos
+from repositories.directorio_medicos import estadisticas_directorio
+from repositories.indice_geo import estadisticas_indice_geo
+from repositories.clusters_mapa import estadisticas_clusters_mapa
+from services.persistencia_diferida import estadisticas_persistencia
+from utils.memoria import memoria_proceso
+from utils.perfil_arranque import resumen as resumen_arranque
+from utils.respuestas_http import respuesta_versionada, estadisticas_respuestas
+from utils.security import token_admin_valido
 
 health_bp = Blueprint('health', __name__)
 
 
 @health_bp.route('/salud', methods=['GET'])
+@respuesta_versionada(lambda: int(modelo_disponible()))
 def salud():
     """Health check de la API."""
     return jsonify({
@@ -14,3 +24,23 @@ def salud():
         'mensaje': 'API funcionando correctamente',
         'modelo_ml_cargado': modelo_disponible()
     })
+
+
+@health_bp.route('/metricas', methods=['GET'])
+def metricas():
+    """Métricas internas del worker que atiende la petición (header X-Admin-Token)."""
+    if not token_admin_valido(request.headers.get('X-Admin-Token')):
+        return jsonify({'error': 'No autorizado'}), 403
+    return jsonify({
+        'cache_predicciones': estadisticas_cache(),
+        'coalescedor_predicciones': estadisticas_coalescedor(),
+        'modelos': estado_modelos(),
+        'persistencia': estadisticas_persistencia(),
+        'pool_bd': estadisticas_pool(),
+        'directorio_medicos': estadisticas_directorio(),
+        'indice_geo': estadisticas_indice_geo(),
+        'clusters_mapa': estadisticas_clusters_mapa(),
+        'respuestas_http': estadisticas_respuestas(),
+        'memoria': memoria_proceso(),
+        'arranque': resumen_arranque(),
+    })
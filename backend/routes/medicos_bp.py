@@ -1,12 +1,17 @@
 """Blueprint para endpoints de médicos."""
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 
 from services.medico_service import (
     obtener_medicos_recomendados,
     obtener_todos_medicos,
+    obtener_medicos_cercanos,
+    obtener_mapa_medicos,
+    exportar_medicos,
     obtener_perfil_medico,
     actualizar_perfil_medico
 )
+from repositories.directorio_medicos import version_directorio
+from utils.respuestas_http import respuesta_versionada
 from utils.security import mensaje_error_seguro
 from utils.jwt_utils import requerir_auth, obtener_usuario_desde_request
 
@@ -22,20 +27,81 @@ def init_medicos_bp(limiter):
         try:
             data = request.json or {}
             perfil_riesgo = data.get('perfil_riesgo', {})
-            resultado = obtener_medicos_recomendados(perfil_riesgo)
+            resultado = obtener_medicos_recomendados(perfil_riesgo, data.get('preferencias'))
             return jsonify(resultado)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             return jsonify({'error': mensaje_error_seguro(e)}), 400
 
     @medicos_bp.route('/todos', methods=['GET'])
+    @respuesta_versionada(version_directorio)
     def todos():
         try:
-            page = max(1, int(request.args.get('page', 1)))
-            per_page = min(1000, max(1, int(request.args.get('per_page', 10))))
-            resultado = obtener_todos_medicos(page=page, per_page=per_page)
+            cursor = request.args.get('cursor')
+            try:
+                page = max(1, int(request.args.get('page', 1)))
+                per_page = min(1000, max(1, int(request.args.get('per_page', 10))))
+            except ValueError:
+                return jsonify({'error': 'Parámetros page y per_page deben ser números'}), 400
+            resultado = obtener_todos_medicos(page=page, per_page=per_page, cursor=cursor)
+            return jsonify(resultado)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            return jsonify({'error': mensaje_error_seguro(e)}), 400
+
+    @medicos_bp.route('/cercanos', methods=['GET'])
+    @limiter.limit("120 per minute")
+    @respuesta_versionada(version_directorio)
+    def cercanos():
+        try:
+            if request.args.get('lat') is None or request.args.get('lng') is None:
+                return jsonify({'error': 'Parámetros lat y lng requeridos'}), 400
+            resultado = obtener_medicos_cercanos(
+                request.args.get('lat'),
+                request.args.get('lng'),
+                radio_km=request.args.get('radio_km', 10),
+                k=request.args.get('k', 10),
+                subespecialidad=request.args.get('subespecialidad')
+            )
+            return jsonify(resultado)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            return jsonify({'error': mensaje_error_seguro(e)}), 400
+
+    @medicos_bp.route('/mapa', methods=['GET'])
+    @limiter.limit("240 per minute")
+    @respuesta_versionada(version_directorio)
+    def mapa():
+        try:
+            if request.args.get('bbox') is None or request.args.get('zoom') is None:
+                return jsonify({'error': 'Parámetros bbox y zoom requeridos'}), 400
+            resultado = obtener_mapa_medicos(request.args.get('bbox'), request.args.get('zoom'))
             return jsonify(resultado)
-        except ValueError:
-            return jsonify({'error': 'Parámetros page y per_page deben ser números'}), 400
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            return jsonify({'error': mensaje_error_seguro(e)}), 400
+
+    @medicos_bp.route('/export', methods=['GET'])
+    @limiter.limit("10 per minute")
+    def export():
+        try:
+            formato = request.args.get('format', 'ndjson')
+            contenido, mimetype = exportar_medicos(
+                formato,
+                distrito=request.args.get('distrito'),
+                subespecialidad=request.args.get('subespecialidad'),
+                desde_id=request.args.get('desde_id', 0)
+            )
+            respuesta = Response(stream_with_context(contenido), mimetype=mimetype)
+            respuesta.headers['Content-Disposition'] = f'attachment; filename=medicos.{formato}'
+            respuesta.headers['X-Accel-Buffering'] = 'no'
+            return respuesta
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             return jsonify({'error': mensaje_error_seguro(e)}), 400
 
@@ -48,7 +114,12 @@ def init_medicos_bp(limiter):
             if not medico_id:
                 return jsonify({'error': 'No asociado a un médico'}), 403
             resultado = obtener_perfil_medico(int(medico_id))
-            return jsonify(resultado)
+            # ETag del propio perfil leído de la base: el snapshot de este worker puede ir atrasado
+            respuesta = jsonify(resultado)
+            respuesta.add_etag()
+            respuesta.headers['Cache-Control'] = 'private, no-cache'
+            respuesta.vary.add('Authorization')
+            return respuesta.make_conditional(request)
         except ValueError as e:
             return jsonify({'error': str(e)}), 404
         except Exception as e:
@@ -0,0 +1,26 @@
+"""Blueprint para administración de modelos de ML (recarga en caliente)."""
+from flask import Blueprint, request, jsonify
+from flask_limiter import Limiter
+
+from ml.model_loader import recargar_modelos, estado_modelos
+from utils.security import token_admin_valido
+
+modelos_bp = Blueprint('modelos', __name__)
+
+
+def init_modelos_bp(limiter: Limiter):
+    """Registra las rutas de administración de modelos (requieren header X-Admin-Token)."""
+
+    @modelos_bp.route('/estado', methods=['GET'])
+    def estado():
+        if not token_admin_valido(request.headers.get('X-Admin-Token')):
+            return jsonify({'error': 'No autorizado'}), 403
+        return jsonify(estado_modelos())
+
+    @modelos_bp.route('/recargar', methods=['POST'])
+    @limiter.limit("5 per minute")
+    def recargar():
+        if not token_admin_valido(request.headers.get('X-Admin-Token')):
+            return jsonify({'error': 'No autorizado'}), 403
+        iniciada = recargar_modelos()
+        return jsonify({'recarga_iniciada': iniciada, **estado_modelos()}), 202
@@ -12,6 +12,7 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from sqlalchemy import text
 from database.config import SessionLocal
 from database.models import Medico
+from repositories.medico_repo import incrementar_version_directorio
 
 
 def actualizar_subespecialidades():
@@ -40,6 +41,7 @@ def actualizar_subespecialidades():
         for i, medico in enumerate(medicos):
             medico.subespecialidad = subespecialidades_default[i % len(subespecialidades_default)]
 
+        incrementar_version_directorio(db)
         db.commit()
         print(f"✓ {len(medicos)} médicos actualizados")
     except Exception as e:
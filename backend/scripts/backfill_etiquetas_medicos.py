@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Completa medicos.especialidad_tags (etiquetas normalizadas sin tildes) y compara planes de consulta.
+1. Crea la columna y el índice GIN si no existen.
+2. Recalcula las etiquetas de todos los médicos (UPDATE por lotes) e incrementa la versión del directorio.
+3. EXPLAIN ANALYZE de la búsqueda anterior (ILIKE '%...%') contra la búsqueda por etiquetas (&&).
+
+Uso:
+  python scripts/backfill_etiquetas_medicos.py
+  python scripts/backfill_etiquetas_medicos.py --solo-explain --especialidad "Arritmias"
+  Docker: docker-compose exec backend python scripts/backfill_etiquetas_medicos.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import bindparam, text, update
+
+from database.config import SessionLocal, engine
+from database.migraciones import aplicar_migraciones
+from database.models import Medico
+from repositories.medico_repo import incrementar_version_directorio
+from utils.especialidades import ETIQUETA_CARDIOLOGIA, etiquetas_especialidad, normalizar_etiqueta
+
+_SQL_ANTES = """
+    SELECT * FROM medicos
+    WHERE subespecialidad ILIKE :patron OR especialidad ILIKE '%CARDIOLOG%'
+    ORDER BY calificacion DESC LIMIT 5
+"""
+_SQL_DESPUES = """
+    SELECT * FROM medicos
+    WHERE especialidad_tags && CAST(:etiquetas AS VARCHAR(100)[])
+    ORDER BY calificacion DESC NULLS LAST, id LIMIT 5
+"""
+_SQL_CONTEO_ANTES = "SELECT count(*) FROM medicos WHERE especialidad ILIKE '%CARDIOLOG%'"
+_SQL_CONTEO_DESPUES = "SELECT count(*) FROM medicos WHERE especialidad_tags @> ARRAY['cardiologia']::VARCHAR(100)[]"
+
+
+def backfill(tamano_lote: int = 500) -> int:
+    """Recalcula especialidad_tags para todas las filas. Retorna cuántas cambiaron."""
+    db = SessionLocal()
+    try:
+        filas = db.query(Medico.id, Medico.especialidad, Medico.subespecialidad, Medico.especialidad_tags).all()
+        cambios = []
+        for fila in filas:
+            etiquetas = etiquetas_especialidad(fila.especialidad, fila.subespecialidad)
+            if etiquetas != (fila.especialidad_tags or []):
+                cambios.append({'b_id': fila.id, 'b_tags': etiquetas})
+        sentencia = update(Medico.__table__).where(Medico.__table__.c.id == bindparam('b_id')).values(
+            especialidad_tags=bindparam('b_tags'))
+        for inicio in range(0, len(cambios), tamano_lote):
+            db.execute(sentencia, cambios[inicio:inicio + tamano_lote])
+        if cambios:
+            incrementar_version_directorio(db)
+        db.commit()
+        print(f"[OK] {len(filas)} médicos revisados, {len(cambios)} con etiquetas actualizadas")
+        return len(cambios)
+    except Exception as e:
+        db.rollback()
+        print(f"[X] {e}")
+        raise
+    finally:
+        db.close()
+
+
+def _explain(sql: str, parametros: dict, sin_seqscan: bool = False) -> list[str]:
+    """EXPLAIN ANALYZE en su propia transacción (SET LOCAL no afecta a las demás)."""
+    with engine.begin() as conexion:
+        if sin_seqscan:
+            conexion.execute(text("SET LOCAL enable_seqscan = off"))
+        return conexion.execute(text(f"EXPLAIN (ANALYZE, BUFFERS) {sql}"), parametros).scalars().all()
+
+
+def comparar_planes(especialidad: str) -> None:
+    etiquetas = [ETIQUETA_CARDIOLOGIA, normalizar_etiqueta(especialidad)]
+    casos = [
+        ("ANTES  búsqueda ILIKE", _SQL_ANTES, {'patron': f'%{especialidad}%'}, False),
+        ("DESPUÉS búsqueda por etiquetas", _SQL_DESPUES, {'etiquetas': etiquetas}, False),
+        ("DESPUÉS búsqueda por etiquetas (enable_seqscan=off: muestra el uso del GIN)",
+         _SQL_DESPUES, {'etiquetas': etiquetas}, True),
+        ("ANTES  conteo de cardiólogos", _SQL_CONTEO_ANTES, {}, False),
+        ("DESPUÉS conteo de cardiólogos", _SQL_CONTEO_DESPUES, {}, False),
+    ]
+    with engine.begin() as conexion:
+        conexion.execute(text("ANALYZE medicos"))
+        total = conexion.execute(text("SELECT count(*) FROM medicos")).scalar()
+    print(f"\nEXPLAIN ANALYZE sobre {total} médicos (especialidad: {especialidad!r})")
+    for titulo, sql, parametros, sin_seqscan in casos:
+        print(f"\n{titulo}")
+        for linea in _explain(sql, parametros, sin_seqscan):
+            print(f"  {linea}")
+    print("\nCon pocas filas el planificador puede preferir un Seq Scan igualmente barato;"
+          " el índice GIN se vuelve determinante al crecer la tabla.")
+
+
+def main(solo_explain: bool = False, especialidad: str = "Arritmias"):
+    aplicar_migraciones(engine)
+    if not solo_explain:
+        backfill()
+    comparar_planes(especialidad)
+
+
+if __name__ == "__main__":
+    import argparse
+    p = argparse.ArgumentParser(description="Backfill de especialidad_tags y comparación de planes")
+    p.add_argument("--solo-explain", action="store_true", help="No recalcula etiquetas, solo compara planes")
+    p.add_argument("--especialidad", default="Arritmias", help="Especialidad usada en la comparación")
+    args = p.parse_args()
+    main(solo_explain=args.solo_explain, especialidad=args.especialidad)
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Mide el agrupador de predicciones (micro-batching) con N hilos llamando a predecir_riesgo.
+Compara fila por fila contra lotes agrupados con la ventana indicada, sin caché,
+y verifica que cada llamador reciba el mismo resultado que la evaluación directa.
+
+Uso:
+  python scripts/benchmark_coalescedor.py
+  python scripts/benchmark_coalescedor.py --hilos 64 --ventana-ms 1 --max-lote 64
+  Docker: docker-compose exec backend python scripts/benchmark_coalescedor.py
+"""
+import os
+import sys
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["PREDICCION_CACHE_TAMANO"] = "0"
+
+import numpy as np
+
+import ml.model_loader as model_loader
+from ml.coalescedor import CoalescedorPredicciones
+
+
+def _filas(n: int) -> list[list]:
+    rng = np.random.default_rng(0)
+    return [[int(rng.integers(29, 78)), int(rng.integers(0, 2)), int(rng.integers(0, 4)),
+             int(rng.integers(94, 200)), float(rng.integers(126, 400)), int(rng.integers(0, 2)),
+             int(rng.integers(0, 3)), int(rng.integers(71, 202)), int(rng.integers(0, 2)),
+             round(float(rng.uniform(0, 6.2)), 1), int(rng.integers(0, 3)), int(rng.integers(0, 4)),
+             int(rng.integers(0, 4))] for _ in range(n)]
+
+
+def _correr(filas: list[list], hilos: int) -> tuple[list, float, list[float]]:
+    """Retorna (resultados, segundos totales, latencias por llamada en ms)."""
+    latencias = []
+
+    def llamar(parametros):
+        inicio = time.perf_counter()
+        resultado = model_loader.predecir_riesgo(parametros)
+        latencias.append((time.perf_counter() - inicio) * 1000)
+        return resultado
+
+    with ThreadPoolExecutor(max_workers=hilos) as pool:
+        inicio = time.perf_counter()
+        resultados = list(pool.map(llamar, filas))
+        return resultados, time.perf_counter() - inicio, latencias
+
+
+def main(solicitudes: int = 2000, hilos: int = 32, ventana_ms: float = 2.0, max_lote: int = 32):
+    warnings.filterwarnings("ignore")
+    model_loader.cargar_modelos()
+    if not model_loader.modelo_disponible():
+        print("[X] Modelos no encontrados en ml_models/")
+        sys.exit(1)
+
+    filas = _filas(solicitudes)
+    esperado = model_loader.predecir_riesgo_lote(filas)
+    print(f"{solicitudes} llamadas a predecir_riesgo desde {hilos} hilos")
+
+    configuraciones = [("fila por fila", 0.0), (f"agrupado ({ventana_ms} ms, máx. {max_lote})", ventana_ms)]
+    todo_ok = True
+    for nombre, ventana in configuraciones:
+        model_loader._coalescedor = CoalescedorPredicciones(
+            model_loader.predecir_riesgo_lote, ventana_ms=ventana, max_lote=max_lote)
+        resultados, segundos, latencias = _correr(filas, hilos)
+        ok = resultados == esperado
+        todo_ok = todo_ok and ok
+        print(f"\n{nombre}")
+        print(f"  Throughput: {solicitudes / segundos:9.0f} pred/s | latencia p50 {np.median(latencias):7.2f} ms"
+              f" | p95 {np.percentile(latencias, 95):7.2f} ms | resultados {'idénticos' if ok else 'DISTINTOS'}")
+        stats = model_loader.estadisticas_coalescedor()
+        if stats["habilitado"]:
+            print(f"  Lotes: {stats['lotes']} (tamaño promedio {stats['tamano_promedio']})")
+            print(f"  Histograma: {stats['histograma_tamano_lote']}")
+
+    if todo_ok:
+        print("\n[OK] Cada llamador recibió su propio resultado")
+    else:
+        print("\n[X] Resultados distintos a la evaluación directa")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    import argparse
+    p = argparse.ArgumentParser(description="Benchmark del agrupador de predicciones concurrentes")
+    p.add_argument("--solicitudes", "-n", type=int, default=2000, help="Número de llamadas")
+    p.add_argument("--hilos", type=int, default=32, help="Hilos concurrentes")
+    p.add_argument("--ventana-ms", type=float, default=2.0, help="Ventana de agrupación en ms")
+    p.add_argument("--max-lote", type=int, default=32, help="Tamaño máximo de lote")
+    args = p.parse_args()
+    main(solicitudes=args.solicitudes, hilos=args.hilos, ventana_ms=args.ventana_ms, max_lote=args.max_lote)
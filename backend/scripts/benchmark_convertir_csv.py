@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Mide filas por segundo de convertir_csv_doctoralia.py sobre una copia agrandada de
+data/doctoralia.csv (cada fila repetida --factor veces, con el nombre numerado para que
+no se descarte como duplicado):
+- antes: regex sin precompilar y es_cardiologo con NFD + filtro por carácter, un proceso
+- actual con --workers 1, 2, 4...: regex precompiladas, es_cardiologo con translate y caché
+Verifica además que todas las variantes generen el mismo JSON.
+
+Uso:
+  python scripts/benchmark_convertir_csv.py
+  python scripts/benchmark_convertir_csv.py --factor 500 --workers 1,2,4,8
+  Docker: docker-compose exec backend python scripts/benchmark_convertir_csv.py
+"""
+import contextlib
+import csv
+import io
+import os
+import re
+import sys
+import tempfile
+import time
+import unicodedata
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import scripts.convertir_csv_doctoralia as conversor
+
+
+def _limpiar_texto_antes(s: str) -> str:
+    if not s:
+        return ""
+    s = re.sub(r"<[^>]+>", "", s)
+    return " ".join(s.split()).strip()
+
+
+def _extraer_num_opiniones_antes(texto: str) -> int | None:
+    if not texto:
+        return None
+    m = re.search(r"(\d+)\s*opini[oó]n", texto, re.I)
+    return int(m.group(1)) if m else None
+
+
+def _extraer_precio_antes(campo3: str) -> str | None:
+    if not campo3:
+        return None
+    m = re.search(r"S/[\s\xa0]*(\d+)", campo3)
+    return f"S/ {m.group(1)}" if m else None
+
+
+def _es_cardiologo_antes(esp: str) -> bool:
+    if not esp:
+        return False
+    norm = unicodedata.normalize("NFD", esp.lower())
+    sin_acentos = "".join(c for c in norm if unicodedata.category(c) != "Mn")
+    return "cardiolog" in sin_acentos or "cardio" in sin_acentos
+
+
+_ANTES = {
+    "limpiar_texto": _limpiar_texto_antes,
+    "extraer_num_opiniones": _extraer_num_opiniones_antes,
+    "extraer_precio": _extraer_precio_antes,
+    "es_cardiologo": _es_cardiologo_antes,
+}
+
+
+def _agrandar(ruta_csv: str, destino: str, factor: int) -> int:
+    with open(ruta_csv, "r", encoding="utf-8", newline="") as f:
+        lector = csv.DictReader(f)
+        campos = lector.fieldnames
+        filas = list(lector)
+    with open(destino, "w", encoding="utf-8", newline="") as f:
+        escritor = csv.DictWriter(f, fieldnames=campos)
+        escritor.writeheader()
+        for i in range(factor):
+            for fila in filas:
+                escritor.writerow({**fila, "Campo1": f"{fila['Campo1']} {i}"})
+    return len(filas) * factor
+
+
+def _medir(ruta_csv: str, ruta_json: str, workers: int) -> float:
+    inicio = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        conversor.convertir(ruta_csv, ruta_json, workers=workers)
+    return time.perf_counter() - inicio
+
+
+def main(ruta_csv: str | None = None, factor: int = 200, workers: tuple = (1, 2, 4)):
+    if not ruta_csv:
+        backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        ruta_csv = os.path.join(os.path.dirname(backend_dir), "data", "doctoralia.csv")
+    if not os.path.exists(ruta_csv):
+        print(f"[X] CSV no encontrado: {ruta_csv}")
+        sys.exit(1)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        grande = os.path.join(tmp, "doctoralia_grande.csv")
+        filas = _agrandar(ruta_csv, grande, factor)
+        print(f"{filas} filas ({os.path.getsize(grande) / 1e6:.1f} MB), {os.cpu_count()} CPUs\n")
+        print(f"{'variante':<14} {'segundos':>9} {'filas/s':>10} {'x antes':>8}")
+
+        referencia = os.path.join(tmp, "antes.json")
+        actuales = {nombre: getattr(conversor, nombre) for nombre in _ANTES}
+        try:
+            for nombre, funcion in _ANTES.items():
+                setattr(conversor, nombre, funcion)
+            antes = _medir(grande, referencia, workers=1)
+        finally:
+            for nombre, funcion in actuales.items():
+                setattr(conversor, nombre, funcion)
+        print(f"{'antes':<14} {antes:>9.2f} {filas / antes:>10.0f} {1:>8.2f}")
+
+        with open(referencia, "rb") as f:
+            esperado = f.read()
+        for n in workers:
+            salida = os.path.join(tmp, f"workers_{n}.json")
+            segundos = _medir(grande, salida, workers=n)
+            with open(salida, "rb") as f:
+                igual = f.read() == esperado
+            marca = "" if igual else "  [X] salida distinta"
+            print(f"{f'workers={n}':<14} {segundos:>9.2f} {filas / segundos:>10.0f} {antes / segundos:>8.2f}{marca}")
+
+    print("\n[OK] Mismo JSON en todas las variantes (salvo las marcadas)")
+
+
+if __name__ == "__main__":
+    import argparse
+    p = argparse.ArgumentParser(description="Throughput de la conversión CSV -> JSON de Doctoralia")
+    p.add_argument("ruta_csv", nargs="?", help="CSV base (por defecto data/doctoralia.csv)")
+    p.add_argument("--factor", type=int, default=200, help="Veces que se repite cada fila")
+    p.add_argument("--workers", default="1,2,4", help="Lista de workers a medir, separados por coma")
+    args = p.parse_args()
+    main(ruta_csv=args.ruta_csv, factor=args.factor, workers=tuple(int(w) for w in args.workers.split(",")))
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Compara el motor compilado de árboles contra sklearn.
+1. Verifica que las probabilidades coincidan exactamente en heart_disease_sample.csv.
+2. Mide la latencia por fila (camino anterior: predict + predict_proba) y por lote.
+
+Uso:
+  python scripts/benchmark_inferencia.py
+  python scripts/benchmark_inferencia.py --repeticiones 500
+  Docker: docker-compose exec backend python scripts/benchmark_inferencia.py
+"""
+import os
+import sys
+import time
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+import ml.model_loader as model_loader
+
+
+def _cargar_dataset(ruta_csv: str | None = None) -> np.ndarray:
+    """Carga las 13 columnas de entrada del CSV de muestra."""
+    if not ruta_csv:
+        backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        ruta_csv = os.path.join(os.path.dirname(backend_dir), "data", "heart_disease_sample.csv")
+    datos = np.genfromtxt(ruta_csv, delimiter=",", skip_header=1)
+    return datos[:, :13]
+
+
+def _medir(funcion, repeticiones: int) -> tuple[float, float]:
+    """Retorna (mediana, p95) en microsegundos."""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1e6)
+    return float(np.median(tiempos)), float(np.percentile(tiempos, 95))
+
+
+def comparar(nombre: str, modelo, motor, X: np.ndarray, repeticiones: int) -> bool:
+    """Verifica exactitud y mide latencias de un modelo."""
+    if modelo is None or motor is None:
+        print(f"[X] {nombre}: modelo o motor compilado no disponible")
+        return False
+
+    esperado = modelo.predict_proba(X)
+    obtenido = motor.predict_proba(X)
+    exacto = np.array_equal(esperado, obtenido)
+    mismas_clases = np.array_equal(modelo.predict(X), motor.predecir(X)[0])
+    print(f"\n{nombre} ({motor.n_arboles} árboles, profundidad {motor.profundidad}, {len(motor.feature)} nodos)")
+    print(f"  Probabilidades idénticas: {'sí' if exacto else 'NO'} "
+          f"(máx. diferencia {np.abs(esperado - obtenido).max():.3e})")
+    print(f"  Predicciones idénticas:   {'sí' if mismas_clases else 'NO'}")
+
+    fila = X[:1]
+    med_sk, p95_sk = _medir(lambda: (modelo.predict(fila), modelo.predict_proba(fila)), repeticiones)
+    med_mc, p95_mc = _medir(lambda: motor.predecir(fila), repeticiones)
+    print(f"  1 fila   sklearn (predict + predict_proba): mediana {med_sk:9.1f} µs | p95 {p95_sk:9.1f} µs")
+    print(f"  1 fila   motor compilado:                  mediana {med_mc:9.1f} µs | p95 {p95_mc:9.1f} µs"
+          f"  ({med_sk / med_mc:.0f}x)")
+
+    med_sk, _ = _medir(lambda: modelo.predict_proba(X), max(1, repeticiones // 10))
+    med_mc, _ = _medir(lambda: motor.predict_proba(X), max(1, repeticiones // 10))
+    print(f"  {len(X)} filas sklearn predict_proba:          mediana {med_sk:9.1f} µs")
+    print(f"  {len(X)} filas motor compilado:                mediana {med_mc:9.1f} µs  ({med_sk / med_mc:.0f}x)")
+    return exacto and mismas_clases
+
+
+def main(ruta_csv: str | None = None, repeticiones: int = 200):
+    warnings.filterwarnings("ignore")
+    model_loader.cargar_modelos()
+    if not model_loader.modelo_disponible():
+        print("[X] Modelos no encontrados en ml_models/")
+        sys.exit(1)
+
+    paquete = model_loader.obtener_paquete()
+    X = _cargar_dataset(ruta_csv)
+    print(f"Dataset: {X.shape[0]} filas x {X.shape[1]} parámetros")
+    ok_rf = comparar("Random Forest", paquete.rf, paquete.motor_rf, X, repeticiones)
+    ok_dt = comparar("Decision Tree", paquete.dt, paquete.motor_dt, X, repeticiones)
+
+    if ok_rf and ok_dt:
+        print("\n[OK] El motor compilado reproduce exactamente a sklearn")
+    else:
+        print("\n[X] Diferencias entre el motor compilado y sklearn")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    import argparse
+    p = argparse.ArgumentParser(description="Benchmark del motor compilado de árboles vs sklearn")
+    p.add_argument("ruta_csv", nargs="?", help="CSV con las 13 columnas de entrada (+ target)")
+    p.add_argument("--repeticiones", "-r", type=int, default=200, help="Repeticiones por medición")
+    args = p.parse_args()
+    main(ruta_csv=args.ruta_csv, repeticiones=args.repeticiones)
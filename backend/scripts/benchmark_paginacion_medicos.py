@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Compara la paginación de cardiólogos a distintas profundidades:
+1. SQL con OFFSET + COUNT(*) por página (cómo se paginaba antes del snapshot).
+2. SQL por clave (calificacion, id) sin OFFSET (obtener_cardiologos_despues_de, idx_medicos_calificacion_id).
+3. Snapshot en memoria con page/per_page y con cursor (lo que sirve /api/medicos/todos).
+Con --filas N inserta N cardiólogos sintéticos en una transacción que se revierte al final.
+
+Uso:
+  python scripts/benchmark_paginacion_medicos.py
+  python scripts/benchmark_paginacion_medicos.py --filas 50000 --per-page 20 --repeticiones 50
+  Docker: docker-compose exec backend python scripts/benchmark_paginacion_medicos.py
+"""
+import bisect
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+
+from database.config import SessionLocal, engine
+from database.migraciones import aplicar_migraciones
+from repositories.directorio_medicos import _clave_orden, _construir
+from repositories.medico_repo import obtener_cardiologos_despues_de
+
+_FILTRO = "especialidad_tags @> ARRAY['cardiologia']::VARCHAR(100)[]"
+_SQL_OFFSET = text(f"""
+    SELECT * FROM medicos WHERE {_FILTRO}
+    ORDER BY calificacion DESC NULLS LAST, id LIMIT :limite OFFSET :offset
+""")
+_SQL_CONTEO = text(f"SELECT count(*) FROM medicos WHERE {_FILTRO}")
+_SQL_CLAVE_EN = text(f"""
+    SELECT calificacion, id FROM medicos WHERE {_FILTRO}
+    ORDER BY calificacion DESC NULLS LAST, id LIMIT 1 OFFSET :offset
+""")
+
+
+def _insertar_sinteticos(db, filas: int) -> None:
+    rng = random.Random(0)
+    datos = [{
+        'nombre': f'Dr. Sintético {i}', 'especialidad': 'CARDIOLOGIA',
+        'calificacion': None if rng.random() < 0.05 else round(rng.uniform(1, 5), 1),
+        'tags': ['cardiologia'],
+    } for i in range(filas)]
+    db.execute(text("""
+        INSERT INTO medicos (nombre, especialidad, calificacion, especialidad_tags)
+        VALUES (:nombre, :especialidad, :calificacion, CAST(:tags AS VARCHAR(100)[]))
+    """), datos)
+    db.execute(text("ANALYZE medicos"))
+
+
+def _medir(funcion, repeticiones: int) -> float:
+    """Mediana en ms."""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    tiempos.sort()
+    return tiempos[len(tiempos) // 2]
+
+
+def main(filas: int = 0, per_page: int = 10, repeticiones: int = 20):
+    aplicar_migraciones(engine)
+    db = SessionLocal()
+    try:
+        if filas:
+            _insertar_sinteticos(db, filas)
+        total = db.execute(_SQL_CONTEO).scalar()
+        if total == 0:
+            print("[X] No hay cardiólogos (ejecuta backfill_etiquetas_medicos.py o usa --filas)")
+            sys.exit(1)
+        directorio = _construir(db)
+        ultima = max(1, (total + per_page - 1) // per_page)
+        paginas = sorted({p for p in (1, 10, 100, 1000, ultima // 2, ultima) if 1 <= p <= ultima})
+        print(f"{total} cardiólogos, {per_page} por página, mediana de {repeticiones} repeticiones (ms)\n")
+        print(f"{'página':>8} {'OFFSET+COUNT':>13} {'SQL clave':>10} {'snapshot page':>14} {'snapshot cursor':>16}")
+
+        for pagina in paginas:
+            offset = (pagina - 1) * per_page
+            clave = tuple(db.execute(_SQL_CLAVE_EN, {'offset': offset - 1}).one()) if offset else None
+
+            def sql_offset():
+                db.execute(_SQL_OFFSET, {'limite': per_page, 'offset': offset}).all()
+                db.execute(_SQL_CONTEO).scalar()
+
+            def sql_clave():
+                obtener_cardiologos_despues_de(db, clave, per_page)
+
+            def snapshot_page():
+                directorio.cardiologos[offset:offset + per_page]
+
+            def snapshot_cursor():
+                inicio = bisect.bisect_right(directorio.claves_cardiologos, _clave_orden(*clave)) if clave else 0
+                directorio.cardiologos[inicio:inicio + per_page]
+
+            a = _medir(sql_offset, repeticiones)
+            b = _medir(sql_clave, repeticiones)
+            c = _medir(snapshot_page, repeticiones)
+            d = _medir(snapshot_cursor, repeticiones)
+            print(f"{pagina:>8} {a:>13.3f} {b:>10.3f} {c:>14.4f} {d:>16.4f}")
+
+        print("\n[OK] OFFSET recorre y descarta las filas anteriores en cada página; la clave"
+              " y el snapshot empiezan directamente en la posición pedida")
+    finally:
+        db.rollback()
+        db.close()
+
+
+if __name__ == "__main__":
+    import argparse
+    p = argparse.ArgumentParser(description="Benchmark de paginación del directorio de cardiólogos")
+    p.add_argument("--filas", type=int, default=0, help="Cardiólogos sintéticos a insertar (se revierten)")
+    p.add_argument("--per-page", type=int, default=10)
+    p.add_argument("--repeticiones", type=int, default=20)
+    args = p.parse_args()
+    main(filas=args.filas, per_page=args.per_page, repeticiones=args.repeticiones)
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Mide bytes enviados y CPU por petición de los endpoints del directorio antes y después
+de la compresión y los ETag (utils/respuestas_http.py):
+- antes: la vista sin decorar (JSON sin comprimir, se serializa en cada petición)
+- gzip / br: primera petición (serializa y comprime) y siguientes (cuerpo ya comprimido en caché)
+- 304: el cliente envía If-None-Match con el ETag recibido
+
+Uso:
+  python scripts/benchmark_respuestas_http.py
+  python scripts/benchmark_respuestas_http.py --repeticiones 200
+  Docker: docker-compose exec backend python scripts/benchmark_respuestas_http.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from flask_limiter import Limiter
+
+import utils.respuestas_http as respuestas_http
+from routes.health_bp import health_bp
+from routes.medicos_bp import medicos_bp, init_medicos_bp
+
+_URLS = (
+    ('/api/medicos/todos?page=1&per_page=1000', 'medicos.todos'),
+    ('/api/medicos/todos?page=1&per_page=10', 'medicos.todos'),
+    ('/api/medicos/mapa?bbox=-77.3,-12.3,-76.8,-11.8&zoom=12', 'medicos.mapa'),
+    ('/api/salud', 'health.salud'),
+)
+
+
+def _app() -> Flask:
+    app = Flask(__name__)
+    limiter = Limiter(app=app, key_func=lambda: 'benchmark', default_limits=["1000000 per minute"])
+    init_medicos_bp(limiter)
+    app.register_blueprint(medicos_bp, url_prefix='/api/medicos')
+    app.register_blueprint(health_bp, url_prefix='/api')
+    # Las mismas vistas sin el decorador, para medir el "antes" por el mismo camino
+    for _, endpoint in _URLS:
+        app.add_url_rule(f'/antes/{endpoint}', endpoint=f'antes.{endpoint}',
+                         view_func=app.view_functions[endpoint].__wrapped__)
+    return app
+
+
+def _cpu_ms(funcion, repeticiones: int) -> float:
+    """CPU del proceso por llamada, en ms."""
+    inicio = time.process_time()
+    for _ in range(repeticiones):
+        funcion()
+    return (time.process_time() - inicio) * 1000 / repeticiones
+
+
+def main(repeticiones: int = 100):
+    app = _app()
+    cliente = app.test_client()
+    codificaciones = ['gzip'] + (['br'] if respuestas_http.brotli is not None else [])
+    if respuestas_http.brotli is None:
+        print("(Brotli no instalado: solo se mide gzip)")
+
+    print(f"{'endpoint':<58} {'modo':<14} {'bytes':>9} {'CPU ms':>8}")
+    for url, endpoint in _URLS:
+        consulta = url.partition('?')[2]
+        url_antes = f"/antes/{endpoint}?{consulta}"
+        cuerpo = cliente.get(url_antes, headers={'Accept-Encoding': 'gzip, br'}).data
+        antes = _cpu_ms(lambda: cliente.get(url_antes, headers={'Accept-Encoding': 'gzip, br'}), repeticiones)
+        print(f"{url:<58} {'antes':<14} {len(cuerpo):>9} {antes:>8.3f}")
+
+        for codificacion in codificaciones:
+            cabeceras = {'Accept-Encoding': codificacion}
+            respuestas_http._cache._datos.clear()
+            inicio = time.process_time()
+            primera = cliente.get(url, headers=cabeceras)
+            frio = (time.process_time() - inicio) * 1000
+            etag = primera.headers.get('ETag')
+            print(f"{'':<58} {codificacion + ' (1ra)':<14} {len(primera.data):>9} {frio:>8.3f}")
+            tibio = _cpu_ms(lambda: cliente.get(url, headers=cabeceras), repeticiones)
+            print(f"{'':<58} {codificacion + ' (caché)':<14} {len(primera.data):>9} {tibio:>8.3f}")
+            if etag:
+                condicional = {**cabeceras, 'If-None-Match': etag}
+                estado = cliente.get(url, headers=condicional).status_code
+                ms = _cpu_ms(lambda: cliente.get(url, headers=condicional), repeticiones)
+                print(f"{'':<58} {str(estado) + ' (ETag)':<14} {0:>9} {ms:>8.3f}")
+
+    print(f"\n[OK] {respuestas_http.estadisticas_respuestas()}")
+
+
+if __name__ == "__main__":
+    import argparse
+    p = argparse.ArgumentParser(description="Bytes y CPU de los endpoints del directorio con y sin compresión/ETag")
+    p.add_argument("--repeticiones", type=int, default=100)
+    args = p.parse_args()
+    main(repeticiones=args.repeticiones)
@@ -2,10 +2,16 @@
 """
 Convierte el CSV de Doctoralia a JSON limpio para importación.
 Limpia HTML, normaliza campos, filtra solo cardiólogos y elimina duplicados.
+Procesa por flujo: las filas pasan por generadores (lectura -> parseo -> filtro -> dedup) y
+se escriben al JSON una por una; para deduplicar solo se guarda una huella de 8 bytes por
+(nombre, dirección), así la memoria no crece con el tamaño del CSV.
+Con --workers N el parseo se reparte en bloques de filas entre N procesos; los resultados se
+consumen en el orden del CSV y la deduplicación sigue siendo global (en el proceso principal).
 
 Uso:
   python scripts/convertir_csv_doctoralia.py [ruta_csv]
   python scripts/convertir_csv_doctoralia.py --solo-direccion  # Solo los que tienen dirección
+  python scripts/convertir_csv_doctoralia.py --workers 4       # Parseo en 4 procesos
 Docker: docker-compose exec backend python scripts/convertir_csv_doctoralia.py
 """
 import csv
@@ -13,16 +19,29 @@ import json
 import re
 import sys
 import os
-import unicodedata
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import islice
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from utils.lectura_incremental import huella
+from utils.texto import plegar
+
+_CAMPOS_EXPORTACION = ("Campo1", "Campo2", "Texto", "Texto1", "Campo3")
+TAMANO_BLOQUE = 2000
+
+_RE_HTML = re.compile(r"<[^>]+>")
+_RE_OPINIONES = re.compile(r"(\d+)\s*opini[oó]n", re.I)
+_RE_PRECIO = re.compile(r"S/[\s\xa0]*(\d+)")
+
 
 def limpiar_texto(s: str) -> str:
     """Quita HTML, espacios extra y normaliza."""
     if not s:
         return ""
-    s = re.sub(r"<[^>]+>", "", s)
+    s = _RE_HTML.sub("", s)
     s = " ".join(s.split())
     return s.strip()
 
@@ -31,7 +50,7 @@ def extraer_num_opiniones(texto: str) -> int | None:
     """Extrae número de opiniones desde Texto."""
     if not texto:
         return None
-    m = re.search(r"(\d+)\s*opini[oó]n", texto, re.I)
+    m = _RE_OPINIONES.search(texto)
     return int(m.group(1)) if m else None
 
 
@@ -39,17 +58,16 @@ def extraer_precio(campo3: str) -> str | None:
     """Extrae precio desde Campo3."""
     if not campo3:
         return None
-    m = re.search(r"S/[\s\xa0]*(\d+)", campo3)
+    m = _RE_PRECIO.search(campo3)
     return f"S/ {m.group(1)}" if m else None
 
 
+@lru_cache(maxsize=4096)
 def es_cardiologo(esp: str) -> bool:
     """Verifica si la especialidad incluye cardiología (incl. Cardiólogo con acento)."""
     if not esp:
         return False
-    norm = unicodedata.normalize("NFD", esp.lower())
-    sin_acentos = "".join(c for c in norm if unicodedata.category(c) != "Mn")
-    return "cardiolog" in sin_acentos or "cardio" in sin_acentos
+    return "cardio" in plegar(esp)
 
 
 def parsear_fila(row: dict) -> dict | None:
@@ -95,7 +113,79 @@ def parsear_fila(row: dict) -> dict | None:
     }
 
 
-def convertir(ruta_csv: str | None = None, ruta_json: str | None = None, solo_con_direccion: bool = False) -> int:
+def leer_filas(ruta_csv: str):
+    """Genera las filas del CSV como dict, sin cargar el archivo."""
+    with open(ruta_csv, "r", encoding="utf-8", newline="") as f:
+        yield from csv.DictReader(f)
+
+
+def _exportable(row: dict) -> dict | None:
+    """Registro en formato compatible con importar_doctoralia (sin _parsed), o None si se descarta."""
+    parsed = parsear_fila(row)
+    return {c: parsed[c] for c in _CAMPOS_EXPORTACION} if parsed else None
+
+
+def _parsear_bloque(filas: list[dict]) -> list[dict | None]:
+    return [_exportable(row) for row in filas]
+
+
+def parsear_filas(filas, workers: int = 1, tamano_bloque: int = TAMANO_BLOQUE):
+    """
+    Genera _exportable(fila) en el orden del CSV. Con workers > 1 envía bloques de tamano_bloque
+    filas a un pool de procesos, con a lo sumo 2 bloques pendientes por proceso.
+    """
+    if workers <= 1:
+        yield from map(_exportable, filas)
+        return
+    filas = iter(filas)
+    bloques = iter(lambda: list(islice(filas, tamano_bloque)), [])
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pendientes = deque()
+        for bloque in bloques:
+            pendientes.append(pool.submit(_parsear_bloque, bloque))
+            if len(pendientes) >= 2 * workers:
+                yield from pendientes.popleft().result()
+        while pendientes:
+            yield from pendientes.popleft().result()
+
+
+def registros_limpios(registros, solo_con_direccion: bool, conteo: dict):
+    """Filtra los registros parseados y descarta duplicados por nombre + dirección."""
+    vistos: set[bytes] = set()
+    for reg in registros:
+        if not reg or (solo_con_direccion and not reg["Texto1"]):
+            conteo["omitidos"] += 1
+            continue
+
+        clave = huella(reg["Campo1"], reg["Texto1"])
+        if clave in vistos:
+            conteo["omitidos"] += 1
+            continue
+        vistos.add(clave)
+        yield reg
+
+
+def escribir_arreglo_json(registros, ruta_json: str) -> tuple[int, int]:
+    """
+    Escribe los registros como arreglo JSON (uno por línea) a medida que llegan.
+    Usa un archivo temporal y lo renombra al final. Retorna (total, con dirección).
+    """
+    total = con_direccion = 0
+    temporal = f"{ruta_json}.tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        f.write("[")
+        for reg in registros:
+            f.write(",\n  " if total else "\n  ")
+            f.write(json.dumps(reg, ensure_ascii=False))
+            total += 1
+            con_direccion += bool(reg.get("Texto1"))
+        f.write("\n]\n" if total else "]\n")
+    os.replace(temporal, ruta_json)
+    return total, con_direccion
+
+
+def convertir(ruta_csv: str | None = None, ruta_json: str | None = None, solo_con_direccion: bool = False,
+              workers: int = 1) -> int:
     """Convierte CSV a JSON limpio."""
     if not ruta_csv:
         backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -119,46 +209,14 @@ def convertir(ruta_csv: str | None = None, ruta_json: str | None = None, solo_co
         dir_csv = os.path.dirname(ruta_csv)
         ruta_json = os.path.join(dir_csv, "doctoralia_limpio.json")
 
-    registros_limpios: list[dict] = []
-    vistos: set[tuple[str, str]] = set()
-    omitidos = 0
-
-    with open(ruta_csv, "r", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            parsed = parsear_fila(row)
-            if not parsed:
-                omitidos += 1
-                continue
-
-            if solo_con_direccion and not parsed["Texto1"]:
-                omitidos += 1
-                continue
-
-            # Evitar duplicados por nombre + dirección
-            key = (parsed["Campo1"], parsed["Texto1"])
-            if key in vistos:
-                omitidos += 1
-                continue
-            vistos.add(key)
-
-            # Guardar formato compatible con importar_doctoralia (sin _parsed para el JSON estándar)
-            reg_export = {
-                "Campo1": parsed["Campo1"],
-                "Campo2": parsed["Campo2"],
-                "Texto": parsed["Texto"],
-                "Texto1": parsed["Texto1"],
-                "Campo3": parsed["Campo3"],
-            }
-            registros_limpios.append(reg_export)
-
-    with open(ruta_json, "w", encoding="utf-8") as f:
-        json.dump(registros_limpios, f, ensure_ascii=False, indent=2)
-
-    con_direccion = sum(1 for r in registros_limpios if r.get("Texto1"))
-    print(f"[OK] Convertido: {len(registros_limpios)} cardiólogos válidos → {ruta_json}")
-    print(f"     Con dirección: {con_direccion} | Omitidos: {omitidos}")
-    return len(registros_limpios)
+    conteo = {"omitidos": 0}
+    parseados = parsear_filas(leer_filas(ruta_csv), workers)
+    registros = registros_limpios(parseados, solo_con_direccion, conteo)
+    total, con_direccion = escribir_arreglo_json(registros, ruta_json)
+
+    print(f"[OK] Convertido: {total} cardiólogos válidos → {ruta_json}")
+    print(f"     Con dirección: {con_direccion} | Omitidos: {conteo['omitidos']}")
+    return total
 
 
 if __name__ == "__main__":
@@ -167,9 +225,11 @@ if __name__ == "__main__":
     p.add_argument("ruta_csv", nargs="?", help="Ruta al CSV")
     p.add_argument("-o", "--output", help="Ruta del JSON de salida")
     p.add_argument("--solo-direccion", action="store_true", help="Solo cardiólogos con dirección")
+    p.add_argument("--workers", type=int, default=1, help="Procesos para parsear (1 = sin pool)")
     args = p.parse_args()
     convertir(
         ruta_csv=args.ruta_csv,
         ruta_json=args.output,
         solo_con_direccion=args.solo_direccion,
+        workers=args.workers,
     )
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Exporta RF y DT de ml_models/ a arreglos .npy mapeables (ml_models/compilado/).
+Con MODELOS_MMAP=true cada worker abre esos arreglos con mmap en lugar de hacer joblib.load
+de los pickles, por lo que todos comparten las mismas páginas de memoria.
+
+El backend también exporta al arrancar si faltan o no corresponden a los pickles actuales;
+este script permite hacerlo en el despliegue (p. ej. tras reentrenar).
+
+Uso:
+  python scripts/exportar_modelos_mmap.py
+  python scripts/exportar_modelos_mmap.py --destino /ruta/compilado
+  Docker: docker-compose exec backend python scripts/exportar_modelos_mmap.py
+"""
+import os
+import sys
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ml.registro_modelos import buscar_directorio_modelos, exportar_compilados
+
+
+def main(destino: str | None = None):
+    warnings.filterwarnings("ignore")
+    models_dir = buscar_directorio_modelos()
+    if not models_dir:
+        print("[X] No se encontró ml_models/random_forest_model.pkl")
+        sys.exit(1)
+    ruta = exportar_compilados(models_dir, destino)
+    total = sum(
+        os.path.getsize(os.path.join(raiz, f))
+        for raiz, _, archivos in os.walk(ruta) for f in archivos
+    )
+    print(f"[OK] Modelos compilados exportados en {ruta} ({total / 1024:.1f} KB)")
+
+
+if __name__ == "__main__":
+    import argparse
+    p = argparse.ArgumentParser(description="Exportar modelos a formato mapeable en memoria")
+    p.add_argument("--destino", help="Directorio de salida (por defecto ml_models/compilado)")
+    args = p.parse_args()
+    main(destino=args.destino)
@@ -1,7 +1,12 @@
 #!/usr/bin/env python3
 """
 Script para importar médicos desde el JSON de Doctoralia.
-Geocodifica direcciones con Nominatim (1 req/seg).
+Lee el JSON por flujo (un registro a la vez), precarga los médicos existentes en un índice
+por huella de (nombre, dirección), envía inserts y updates cada TAMANO_LOTE registros y reporta
+insertados/actualizados/duplicados/sin cambios/omitidos y filas por segundo (duplicados: registros
+repetidos en el archivo que se fusionan en un insert aún pendiente, sin fila propia).
+Si no hay coordenadas del distrito geocodifica con services/geocodificacion.py (Nominatim con
+caché local y límite de tasa: las direcciones ya vistas no vuelven a consultarse).
 
 Uso:
   python scripts/importar_doctoralia.py [ruta_json]
@@ -10,17 +15,23 @@ Uso:
 Por defecto busca: Los 20 Cardiologos más recomendados en Lima - Doctoralia.json
 en el directorio Documents del usuario.
 """
-import re
 import sys
 import os
 import time
-import unicodedata
+from itertools import islice
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from sqlalchemy import or_, text
+from sqlalchemy import insert, select, text, update
 from database.config import SessionLocal
 from database.models import Medico
+from repositories.medico_repo import incrementar_version_directorio
+from scripts.convertir_csv_doctoralia import extraer_num_opiniones, extraer_precio, limpiar_texto
+from services.geocodificacion import obtener_geocodificador
+from utils.distritos_lima import coords_desde_direccion
+from utils.especialidades import etiquetas_especialidad
+from utils.lectura_incremental import huella, iterar_arreglo_json
+from utils.texto import plegar
 
 
 def asegurar_columnas_medicos(db):
@@ -32,6 +43,8 @@ def asegurar_columnas_medicos(db):
         "ALTER TABLE medicos ADD COLUMN IF NOT EXISTS latitud FLOAT",
         "ALTER TABLE medicos ADD COLUMN IF NOT EXISTS longitud FLOAT",
         "ALTER TABLE medicos ADD COLUMN IF NOT EXISTS email VARCHAR(120)",
+        "ALTER TABLE medicos ADD COLUMN IF NOT EXISTS especialidad_tags VARCHAR(100)[]",
+        "CREATE INDEX IF NOT EXISTS idx_medicos_especialidad_tags ON medicos USING GIN (especialidad_tags)",
     ]
     for sql in alter_sql:
         try:
@@ -41,85 +54,21 @@ def asegurar_columnas_medicos(db):
             db.rollback()
 
 
-def limpiar_texto(s: str) -> str:
-    """Quita HTML, espacios extra y normaliza."""
-    if not s:
-        return ""
-    s = re.sub(r"<[^>]+>", "", s)
-    s = " ".join(s.split())
-    return s.strip()
+_geocodificador = None
 
 
-def extraer_num_opiniones(texto: str) -> int | None:
-    """Extrae número de opiniones desde Texto (ej: '302 opinión')."""
-    if not texto:
-        return None
-    m = re.search(r"(\d+)\s*opini[oó]n", texto, re.I)
-    return int(m.group(1)) if m else None
-
-
-def extraer_precio(campo3: str) -> str | None:
-    """Extrae precio desde Campo3 (ej: 'Visita Cardiología S/ 200')."""
-    if not campo3:
-        return None
-    m = re.search(r"S/[\s\xa0]*(\d+)", campo3)
-    return f"S/ {m.group(1)}" if m else None
-
-
-# Coordenadas aproximadas por distrito de Lima (para asignar sin geocodificar)
-COORDS_LIMA: dict[str, tuple[float, float]] = {
-    "jesus maria": (-12.077, -77.051), "jesús maría": (-12.077, -77.051),
-    "lince": (-12.084, -77.032), "miraflores": (-12.121, -77.030),
-    "san isidro": (-12.089, -77.050), "surquillo": (-12.119, -77.029),
-    "san borja": (-12.091, -77.001), "la molina": (-12.071, -76.965),
-    "santiago de surco": (-12.152, -76.990), "surco": (-12.152, -76.990),
-    "magdalena": (-12.095, -77.071), "magdalena del mar": (-12.095, -77.071),
-    "pueblo libre": (-12.072, -77.062), "breña": (-12.056, -77.050),
-    "la victoria": (-12.073, -77.029), "jorge chavez": (-12.056, -77.050),
-    "cercado de lima": (-12.046, -77.042), "lima": (-12.046, -77.042),
-    "callao": (-12.057, -77.118), "bellavista": (-12.068, -77.121),
-    "la perla": (-12.066, -77.111), "carmen de la legua": (-12.051, -77.063),
-    "san miguel": (-12.078, -77.085), "los olivos": (-12.006, -77.073),
-    "comas": (-11.943, -77.061), "independencia": (-12.004, -77.038),
-    "san juan de lurigancho": (-11.985, -77.008), "ate": (-12.052, -76.919),
-    "santa anita": (-12.046, -76.973), "el agustino": (-12.050, -77.001),
-    "la florida": (-12.118, -77.032), "barranco": (-12.145, -77.022),
-    "chorrillos": (-12.173, -77.007), "villa el salvador": (-12.206, -76.981),
-    "san juan de miraflores": (-12.162, -76.987), "villa maria del triunfo": (-12.163, -76.964),
-    "rímac": (-12.044, -77.033), "rimac": (-12.044, -77.033),
-    "san luis": (-12.080, -77.001),
-}
-
-
-def coords_desde_direccion(direccion: str) -> tuple[float | None, float | None]:
-    """Asigna coords por distrito detectado en la dirección (Lima)."""
-    if not direccion:
+def geocodificar(direccion: str) -> tuple[float | None, float | None]:
+    """Geocodifica con el servicio compartido (caché + 1 req/seg solo para direcciones nuevas)."""
+    global _geocodificador
+    if _geocodificador is None:
+        try:
+            _geocodificador = obtener_geocodificador()
+        except ImportError:
+            print("  (geopy no instalado, omitiendo geocodificación)")
+            _geocodificador = False
+    if not _geocodificador:
         return None, None
-    d = direccion.lower().strip()
-    for nombre, (lat, lng) in COORDS_LIMA.items():
-        if nombre in d:
-            return lat, lng
-    return None, None
-
-
-def geocodificar(direccion: str, ciudad: str = "Lima, Peru") -> tuple[float | None, float | None]:
-    """Geocodifica dirección con Nominatim. Respetando 1 req/seg."""
-    try:
-        from geopy.geocoders import Nominatim
-        from geopy.exc import GeocoderTimedOut, GeocoderServiceError
-    except ImportError:
-        print("  (geopy no instalado, omitiendo geocodificación)")
-        return None, None
-
-    locator = Nominatim(user_agent="cardionet-import-v1")
-    query = f"{direccion}, {ciudad}" if direccion else ciudad
-    try:
-        location = locator.geocode(query, timeout=10)
-        if location:
-            return location.latitude, location.longitude
-    except (GeocoderTimedOut, GeocoderServiceError) as e:
-        print(f"  Geocoding error: {e}")
-    return None, None
+    return _geocodificador.geocodificar(direccion)
 
 
 def parsear_registro(registro: dict) -> dict | None:
@@ -129,9 +78,7 @@ def parsear_registro(registro: dict) -> dict | None:
         return None
 
     esp = limpiar_texto(registro.get("Campo2", "")) or "Cardiologo"
-    norm = unicodedata.normalize("NFD", esp.lower())
-    sin_acentos = "".join(c for c in norm if unicodedata.category(c) != "Mn")
-    es_cardiologo = "cardiolog" in sin_acentos or "cardio" in sin_acentos
+    es_cardiologo = "cardio" in plegar(esp)
     especialidad = "CARDIOLOGIA" if es_cardiologo else esp.upper()
     num_opiniones = extraer_num_opiniones(registro.get("Texto", ""))
     direccion = limpiar_texto(registro.get("Texto1", ""))
@@ -153,10 +100,87 @@ def parsear_registro(registro: dict) -> dict | None:
     }
 
 
-def importar(ruta_json: str | None = None, geocodificar_dir: bool = True, limite: int | None = None):
-    """Importa médicos desde el JSON de Doctoralia."""
-    import json
+TAMANO_LOTE = 500
+_CAMPOS_ACTUALIZABLES = ("num_opiniones", "precio_visita", "direccion_completa", "ubicacion_consultorio")
+_COLUMNAS_INDICE = (
+    Medico.id, Medico.nombre, Medico.especialidad, Medico.subespecialidad, Medico.num_opiniones,
+    Medico.precio_visita, Medico.direccion_completa, Medico.ubicacion_consultorio, Medico.latitud, Medico.longitud,
+)
+
+
+_NOMBRES_INDICE = frozenset(c.key for c in _COLUMNAS_INDICE)
+
+
+def cargar_indice(db) -> dict[bytes, dict]:
+    """
+    huella(nombre, dirección) -> fila existente, en una sola consulta. Cada médico entra con su
+    direccion_completa y con su ubicacion_consultorio (antes era un SELECT con OR por registro);
+    los que no tienen ninguna de las dos, con (nombre, None).
+    """
+    indice = {}
+    for fila in db.execute(select(*_COLUMNAS_INDICE).order_by(Medico.id)).mappings():
+        fila = dict(fila)
+        direcciones = {fila["direccion_completa"], fila["ubicacion_consultorio"]} - {None, ""}
+        for direccion in direcciones or {None}:
+            indice.setdefault(huella(fila["nombre"], direccion), fila)
+    return indice
+
+
+def _asignar_coords(fila: dict, direccion: str, geocodificar_dir: bool) -> None:
+    """Completa latitud/longitud si faltan: lookup por distrito y, si no, el geocodificador compartido."""
+    if fila.get("latitud") and fila.get("longitud"):
+        return
+    lat, lng = coords_desde_direccion(direccion)
+    if lat is None and geocodificar_dir and direccion:
+        lat, lng = geocodificar(direccion)
+    if lat is not None and lng is not None:
+        fila["latitud"], fila["longitud"] = lat, lng
+
+
+def _fusionar(existente: dict, parsed: dict) -> dict:
+    """Campos que cambian en un médico existente (misma regla que antes: lo nuevo si viene, si no lo actual)."""
+    nuevos = {c: parsed.get(c) or existente.get(c) for c in _CAMPOS_ACTUALIZABLES}
+    if parsed.get("especialidad"):
+        nuevos["especialidad"] = parsed["especialidad"]
+    cambios = {c: v for c, v in nuevos.items() if v != existente.get(c)}
+    if "especialidad" in cambios:
+        # El UPDATE por lotes no pasa por el listener del ORM: las etiquetas se calculan aquí
+        cambios["especialidad_tags"] = etiquetas_especialidad(cambios["especialidad"], existente.get("subespecialidad"))
+    return cambios
+
+
+def _insertar_lote(db, filas: list[dict]) -> None:
+    """
+    INSERT multi-fila (insertmanyvalues) con RETURNING id. Cada fila queda en el índice solo con
+    las columnas del índice y su id, así un duplicado posterior del archivo se aplica como UPDATE.
+    """
+    columnas = sorted({c for f in filas for c in f})
+    tabla = Medico.__table__
+    ids = db.execute(
+        insert(tabla).returning(tabla.c.id, sort_by_parameter_order=True),
+        [{c: f.get(c) for c in columnas} for f in filas],
+    ).scalars().all()
+    for fila, medico_id in zip(filas, ids):
+        for columna in fila.keys() - _NOMBRES_INDICE:
+            del fila[columna]
+        fila["id"] = medico_id
+
+
+def _actualizar_lotes(db, cambios: dict[int, dict]) -> None:
+    """UPDATE por clave primaria agrupando las filas que cambian las mismas columnas."""
+    grupos: dict[tuple, list[dict]] = {}
+    for medico_id, campos in cambios.items():
+        grupos.setdefault(tuple(sorted(campos)), []).append({"id": medico_id, **campos})
+    for filas in grupos.values():
+        for inicio in range(0, len(filas), TAMANO_LOTE):
+            db.execute(update(Medico), filas[inicio:inicio + TAMANO_LOTE])
+
 
+def importar(ruta_json: str | None = None, geocodificar_dir: bool = True, limite: int | None = None):
+    """
+    Importa médicos desde el JSON de Doctoralia: precarga los existentes en un índice en
+    memoria, decide insert/update/sin cambios por registro leído y aplica los cambios en lotes.
+    """
     if not ruta_json:
         backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
         project_data = os.path.join(os.path.dirname(backend_dir), "data")
@@ -178,73 +202,85 @@ def importar(ruta_json: str | None = None, geocodificar_dir: bool = True, limite
         print(f"[X] Archivo no encontrado: {ruta_json}")
         sys.exit(1)
 
-    with open(ruta_json, "r", encoding="utf-8") as f:
-        data = json.load(f)
-
-    if limite:
-        data = data[:limite]
-    print(f"Procesando {len(data)} registros de {ruta_json}")
-
+    print(f"Procesando registros de {ruta_json}")
     db = SessionLocal()
     asegurar_columnas_medicos(db)
+    inicio = time.perf_counter()
+    leidos = 0
     insertados = 0
     actualizados = 0
+    duplicados = 0
+    sin_cambios = 0
     omitidos = 0
 
     try:
-        for i, reg in enumerate(data):
-            parsed = parsear_registro(reg)
-            if not parsed:
-                omitidos += 1
-                continue
-
-            nombre = parsed["nombre"]
-            direccion = parsed.get("direccion_completa") or parsed.get("ubicacion_consultorio") or ""
-
-            if direccion:
-                existing = db.query(Medico).filter(
-                    Medico.nombre == nombre,
-                    or_(Medico.direccion_completa == direccion, Medico.ubicacion_consultorio == direccion),
-                ).first()
-            else:
-                existing = db.query(Medico).filter(
-                    Medico.nombre == nombre,
-                    Medico.direccion_completa.is_(None),
-                    Medico.ubicacion_consultorio.is_(None),
-                ).first()
-
-            if existing:
-                existing.num_opiniones = parsed.get("num_opiniones") or existing.num_opiniones
-                existing.precio_visita = parsed.get("precio_visita") or existing.precio_visita
-                existing.direccion_completa = parsed.get("direccion_completa") or existing.direccion_completa
-                existing.ubicacion_consultorio = parsed.get("ubicacion_consultorio") or existing.ubicacion_consultorio
-                if parsed.get("especialidad"):
-                    existing.especialidad = parsed["especialidad"]
-                medico = existing
-                actualizados += 1
-            else:
-                medico = Medico(**parsed)
-                db.add(medico)
-                db.flush()
-                insertados += 1
-
-            dir_completa = parsed.get("direccion_completa") or parsed.get("ubicacion_consultorio") or ""
-            if not medico.latitud or not medico.longitud:
-                lat, lng = coords_desde_direccion(dir_completa)
-                if lat is not None and lng is not None:
-                    medico.latitud = lat
-                    medico.longitud = lng
-                elif geocodificar_dir and dir_completa:
-                    lat, lng = geocodificar(dir_completa)
-                    medico.latitud = lat
-                    medico.longitud = lng
-                    time.sleep(1)
-
-            if (i + 1) % 10 == 0:
-                print(f"  Procesados {i + 1}/{len(data)}")
-
+        indice = cargar_indice(db)
+        print(f"  {len(indice)} claves (nombre, dirección) precargadas en {time.perf_counter() - inicio:.2f} s")
+        nuevos: list[dict] = []
+        cambios: dict[int, dict] = {}
+        escribio = False
+
+        with open(ruta_json, "r", encoding="utf-8") as f:
+            registros = iterar_arreglo_json(f)
+            if limite:
+                registros = islice(registros, limite)
+
+            for reg in registros:
+                leidos += 1
+                parsed = parsear_registro(reg)
+                if not parsed:
+                    omitidos += 1
+                    continue
+
+                direccion = parsed.get("direccion_completa") or parsed.get("ubicacion_consultorio") or ""
+                clave = huella(parsed["nombre"], direccion or None)
+                existente = indice.get(clave)
+
+                if existente is None:
+                    fila = dict(parsed)
+                    fila["especialidad_tags"] = etiquetas_especialidad(fila["especialidad"], fila["subespecialidad"])
+                    _asignar_coords(fila, direccion, geocodificar_dir)
+                    nuevos.append(fila)
+                    indice[clave] = fila
+                    insertados += 1
+                else:
+                    campos = _fusionar(existente, parsed)
+                    antes = (existente.get("latitud"), existente.get("longitud"))
+                    existente.update(campos)
+                    _asignar_coords(existente, direccion, geocodificar_dir)
+                    if (existente.get("latitud"), existente.get("longitud")) != antes:
+                        campos["latitud"], campos["longitud"] = existente["latitud"], existente["longitud"]
+                    # Sin id es un duplicado del mismo archivo aún no insertado: se fusiona en el insert
+                    if "id" not in existente:
+                        duplicados += 1
+                    elif campos:
+                        cambios.setdefault(existente["id"], {}).update(campos)
+                        actualizados += 1
+                    else:
+                        sin_cambios += 1
+
+                if len(nuevos) >= TAMANO_LOTE:
+                    _insertar_lote(db, nuevos)
+                    nuevos, escribio = [], True
+                if len(cambios) >= TAMANO_LOTE:
+                    _actualizar_lotes(db, cambios)
+                    cambios, escribio = {}, True
+                if leidos % TAMANO_LOTE == 0:
+                    print(f"  Procesados {leidos}")
+
+        if nuevos:
+            _insertar_lote(db, nuevos)
+        if cambios:
+            _actualizar_lotes(db, cambios)
+        if escribio or nuevos or cambios:
+            incrementar_version_directorio(db)
         db.commit()
-        print(f"[OK] Importacion completada: {insertados} insertados, {actualizados} actualizados, {omitidos} omitidos")
+        segundos = time.perf_counter() - inicio
+        print(f"[OK] Importacion completada: {insertados} insertados, {actualizados} actualizados, "
+              f"{duplicados} duplicados, {sin_cambios} sin cambios, {omitidos} omitidos")
+        print(f"     {leidos} registros en {segundos:.2f} s ({leidos / max(segundos, 1e-9):.0f} filas/s)")
+        if _geocodificador:
+            print(f"     Geocodificación: {_geocodificador.estadisticas()}")
     except Exception as e:
         db.rollback()
         print(f"[ERROR] {e}")
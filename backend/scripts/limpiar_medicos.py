@@ -19,6 +19,7 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from sqlalchemy import bindparam, text
 from database.config import SessionLocal, engine
 from database.models import Medico
+from repositories.medico_repo import incrementar_version_directorio
 
 # Funciona con SQLite func en PostgreSQL: TRIM y COALESCE
 def _direccion_vacia(m):
@@ -66,6 +67,7 @@ def main():
 
         # Borrar
         deleted = db.query(Medico).filter(Medico.id.in_(ids)).delete(synchronize_session=False)
+        incrementar_version_directorio(db)
         db.commit()
         restantes = total - deleted
         print(f"Eliminados {deleted} médicos con poca información.")
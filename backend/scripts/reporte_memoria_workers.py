@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Reporte de memoria por worker según el modo de carga de modelos.
+Levanta N procesos simultáneos que cargan los modelos y hacen una predicción, y reporta
+RSS y PSS de cada uno. PSS reparte las páginas compartidas entre procesos: la suma del PSS
+es la memoria real que consumen los N workers.
+
+Modos:
+  pickle   cada worker hace joblib.load de los pickles (comportamiento por defecto)
+  mmap     cada worker mapea los arreglos compilados (MODELOS_MMAP=true)
+  preload  el proceso padre carga una vez y hace fork (como gunicorn --preload)
+
+Uso:
+  python scripts/reporte_memoria_workers.py
+  python scripts/reporte_memoria_workers.py --workers 4 --modos pickle mmap
+  Docker: docker-compose exec backend python scripts/reporte_memoria_workers.py
+"""
+import multiprocessing
+import os
+import sys
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+MODOS = ("pickle", "mmap", "preload")
+_VECTOR = [63, 1, 3, 145, 233, 1, 0, 150, 0, 2.3, 0, 0, 1]
+
+
+def _worker(modo: str, cola, liberar, precargado: bool):
+    """Carga (si no viene precargado), predice, reporta memoria y espera a que todos reporten."""
+    warnings.filterwarnings("ignore")
+    os.environ["MODELOS_MMAP"] = "true" if modo == "mmap" else "false"
+    from ml import model_loader
+    from utils.memoria import memoria_proceso
+
+    if not precargado:
+        model_loader.cargar_modelos()
+    model_loader.predecir_comparativo(_VECTOR)
+    cola.put(memoria_proceso())
+    liberar.wait()
+
+
+def medir(modo: str, workers: int) -> list[dict]:
+    precargado = modo == "preload"
+    contexto = multiprocessing.get_context("fork" if precargado else "spawn")
+    if precargado:
+        os.environ["MODELOS_MMAP"] = "false"
+        from ml import model_loader
+        model_loader.cargar_modelos()
+
+    cola = contexto.Queue()
+    liberar = contexto.Event()
+    procesos = [contexto.Process(target=_worker, args=(modo, cola, liberar, precargado)) for _ in range(workers)]
+    for p in procesos:
+        p.start()
+    resultados = [cola.get(timeout=120) for _ in procesos]
+    liberar.set()
+    for p in procesos:
+        p.join()
+    return resultados
+
+
+def main(workers: int = 4, modos: list[str] | None = None):
+    warnings.filterwarnings("ignore")
+    from ml.registro_modelos import buscar_directorio_modelos, exportar_compilados
+    models_dir = buscar_directorio_modelos()
+    if not models_dir:
+        print("[X] No se encontró ml_models/random_forest_model.pkl")
+        sys.exit(1)
+
+    modos = modos or list(MODOS)
+    if "mmap" in modos:
+        exportar_compilados(models_dir)
+
+    totales = {}
+    for modo in modos:
+        resultados = medir(modo, workers)
+        print(f"\nModo {modo} ({workers} workers)")
+        for r in resultados:
+            print(f"  pid {r['pid']:>7}: RSS {r.get('rss_kb', r.get('rss_max_kb', 0)) / 1024:8.1f} MB"
+                  f" | PSS {r.get('pss_kb', 0) / 1024:8.1f} MB"
+                  f" | privada {(r.get('privada_limpia_kb', 0) + r.get('privada_sucia_kb', 0)) / 1024:8.1f} MB")
+        totales[modo] = sum(r.get("pss_kb", 0) for r in resultados)
+        print(f"  Total PSS: {totales[modo] / 1024:.1f} MB")
+
+    if "pickle" in totales and totales["pickle"]:
+        print("\nResumen (PSS total vs pickle):")
+        for modo, total in totales.items():
+            ahorro = totales["pickle"] - total
+            print(f"  {modo:<8} {total / 1024:8.1f} MB  ahorro {ahorro / 1024:7.1f} MB ({ahorro / totales['pickle'] * 100:5.1f}%)")
+
+
+if __name__ == "__main__":
+    import argparse
+    p = argparse.ArgumentParser(description="Reporte de memoria por worker según modo de carga de modelos")
+    p.add_argument("--workers", "-w", type=int, default=4, help="Número de workers simulados")
+    p.add_argument("--modos", nargs="+", choices=MODOS, help="Modos a medir (por defecto todos)")
+    args = p.parse_args()
+    main(workers=args.workers, modos=args.modos)
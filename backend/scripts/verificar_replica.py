@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Verifica el enrutamiento de lecturas a la réplica (DB_REPLICA_HOST) y el fallback a la primaria.
+1. Una lectura con leer() se atiende en la réplica y una escritura en la primaria.
+2. Con la réplica inalcanzable, las lecturas pasan a la primaria.
+3. Si una consulta falla a mitad en la réplica, se repite en la primaria.
+4. Con un retraso mayor a DB_REPLICA_MAX_LAG_SEG, las lecturas pasan a la primaria.
+
+Entorno local con dos bases (primaria en 5433, réplica en streaming en 5434):
+  docker compose -f docker-compose.replica.yml up -d
+  DB_HOST=localhost DB_PORT=5433 DB_REPLICA_HOST=localhost DB_REPLICA_PORT=5434 \\
+    python scripts/verificar_replica.py
+
+Uso:
+  python scripts/verificar_replica.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import create_engine, text
+
+import database.config as config
+from database.sesion import cerrar_sesion, leer, obtener_sesion
+
+_SQL_SERVIDOR = text("SELECT current_database(), inet_server_port(), pg_is_in_recovery()")
+
+
+def _servidor(db) -> str:
+    base, puerto, recuperacion = db.execute(_SQL_SERVIDOR).one()
+    return f"{base}@{puerto}{' (réplica)' if recuperacion else ''}"
+
+
+def _forzar_verificacion() -> None:
+    config.estado_replica.verificado_en = 0.0
+
+
+def main():
+    if config.replica_engine is None:
+        print("[X] DB_REPLICA_HOST no está configurado")
+        sys.exit(1)
+
+    app = Flask(__name__)
+    app.teardown_appcontext(cerrar_sesion)
+    primaria = config.engine.url.render_as_string(hide_password=True)
+    replica = config.replica_engine.url.render_as_string(hide_password=True)
+    print(f"Primaria: {primaria}\nRéplica:  {replica}")
+    ok = True
+
+    with app.app_context():
+        lectura, escritura = leer(_servidor), _servidor(obtener_sesion())
+    print(f"\n1. Lectura en {lectura} | escritura en {escritura} | retraso {config.estado_replica.retraso_seg} s")
+    if lectura == escritura:
+        print("   [X] La lectura no se atendió en la réplica")
+        ok = False
+    else:
+        print("   [OK] Lecturas en la réplica, escrituras en la primaria")
+
+    original = config.replica_engine
+    config.replica_engine = create_engine("postgresql://cardionet@127.0.0.1:1/inexistente", pool_pre_ping=False)
+    _forzar_verificacion()
+    with app.app_context():
+        lectura = leer(_servidor)
+    print(f"\n2. Réplica inalcanzable: lectura en {lectura} ({config.estado_replica.ultimo_error})")
+    ok = ok and lectura == escritura
+
+    # La verificación dice que está sana, pero la consulta falla: fallback en la misma petición
+    config.estado_replica.disponible = True
+    config.estado_replica.verificado_en = time.monotonic()
+    fallbacks = config.estado_replica.fallbacks
+    with app.app_context():
+        lectura = leer(_servidor)
+    print(f"3. Falla a mitad de consulta: lectura en {lectura}"
+          f" (fallbacks {fallbacks} -> {config.estado_replica.fallbacks})")
+    ok = ok and lectura == escritura and config.estado_replica.fallbacks == fallbacks + 1
+
+    config.replica_engine = original
+    limite = config.DB_REPLICA_MAX_LAG_SEG
+    config.DB_REPLICA_MAX_LAG_SEG = -1
+    _forzar_verificacion()
+    with app.app_context():
+        lectura = leer(_servidor)
+    print(f"4. Retraso sobre el límite: lectura en {lectura} ({config.estado_replica.ultimo_error})")
+    ok = ok and lectura == escritura
+    config.DB_REPLICA_MAX_LAG_SEG = limite
+
+    print(f"\nEstado: {config.estado_replica.resumen()}")
+    if ok:
+        print("\n[OK] Enrutamiento y fallback verificados")
+    else:
+        print("\n[X] El enrutamiento no se comportó como se esperaba")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    import argparse
+    argparse.ArgumentParser(description="Verifica el enrutamiento a la réplica de lectura").parse_args()
+    main()
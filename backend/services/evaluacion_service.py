@@ -1,15 +1,18 @@
 """Servicio de evaluación de riesgo cardíaco."""
 from datetime import datetime
 
-from database.config import SessionLocal
-from repositories.paciente_repo import obtener_o_crear_paciente, guardar_evaluacion
+from database.sesion import obtener_sesion
+from repositories.paciente_repo import guardar_evaluaciones_lote
+from services.persistencia_diferida import encolar_evaluacion
 from services.perfil_riesgo import determinar_perfil_cardiopata
-from ml.model_loader import predecir_riesgo, modelo_disponible, obtener_feature_importances
+from validators.evaluacion_validator import validar_parametros_modelo
+from ml.model_loader import predecir_riesgo, predecir_riesgo_lote, modelo_disponible, obtener_feature_importances
 
 
 def ejecutar_evaluacion(data: dict) -> dict:
     """
-    Ejecuta la evaluación completa: validación, predicción ML, guardado en BD.
+    Ejecuta la evaluación completa: validación, predicción ML y guardado en BD.
+    Con PERSISTENCIA_DIFERIDA=true el guardado es diferido y 'paciente_id' es None si la evaluación quedó en cola.
     Retorna el resultado en formato para la API.
     """
     if not modelo_disponible():
@@ -46,12 +49,7 @@ def ejecutar_evaluacion(data: dict) -> dict:
     prediccion, probabilidad = predecir_riesgo(parametros)
     perfil_riesgo = determinar_perfil_cardiopata(parametros)
 
-    db = SessionLocal()
-    try:
-        paciente_id = obtener_o_crear_paciente(db, paciente_data)
-        guardar_evaluacion(db, paciente_id, parametros, prediccion)
-    finally:
-        db.close()
+    paciente_id = encolar_evaluacion(paciente_data, parametros, prediccion)
 
     feature_importances = obtener_feature_importances(limite=8)
 
@@ -72,3 +70,44 @@ def ejecutar_evaluacion(data: dict) -> dict:
             'numero_vasos': parametros[11]
         }
     }
+
+
+def ejecutar_evaluacion_lote(filas: list, guardar: bool = True) -> dict:
+    """
+    Evalúa N vectores de parámetros en una sola pasada del modelo.
+    Las filas inválidas se reportan en 'errores' sin detener el resto del lote.
+    Si guardar es True, las evaluaciones válidas se insertan en bloque (paciente_id=None).
+    """
+    if not modelo_disponible():
+        raise RuntimeError('Modelo no cargado')
+
+    validas = []
+    errores = []
+    for indice, fila in enumerate(filas):
+        try:
+            validas.append((indice, validar_parametros_modelo(fila)))
+        except ValueError as e:
+            errores.append({'indice': indice, 'error': str(e)})
+
+    predicciones = predecir_riesgo_lote([parametros for _, parametros in validas])
+
+    resultados = []
+    for (indice, parametros), (prediccion, probabilidad) in zip(validas, predicciones):
+        resultados.append({
+            'indice': indice,
+            'tiene_riesgo': prediccion,
+            'probabilidad_riesgo': probabilidad,
+            'perfil_principal': determinar_perfil_cardiopata(parametros)['principal'],
+        })
+
+    if guardar and validas:
+        db = obtener_sesion()
+        guardar_evaluaciones_lote(db, [(parametros, prediccion) for (_, parametros), (prediccion, _) in zip(validas, predicciones)])
+
+    return {
+        'resultados': resultados,
+        'errores': errores,
+        'total': len(filas),
+        'evaluadas': len(resultados),
+        'guardadas': len(resultados) if guardar else 0,
+    }
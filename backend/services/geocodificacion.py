@@ -0,0 +1,227 @@
+"""
+Geocodificación de direcciones con caché persistente, límite de tasa y consultas concurrentes.
+
+Cada resultado, también "sin resultado", se guarda en un SQLite local (GEOCODIFICACION_CACHE)
+con la dirección normalizada como clave, así una segunda corrida no llama a la red para
+direcciones ya vistas. Los errores de red no se guardan y se reintentan en la próxima corrida.
+Las consultas pendientes se reparten entre GEOCODIFICACION_CONCURRENCIA hilos, y un token
+bucket limita el total a GEOCODIFICACION_TASA peticiones por segundo (Nominatim admite 1).
+El backend se puede cambiar: cualquier objeto con geocodificar(consulta) que retorne (lat, lng)
+o None sirve, por ejemplo BackendFijo para pruebas sin red.
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.texto import plegar
+
+_BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GEOCODIFICACION_CACHE = os.getenv(
+    'GEOCODIFICACION_CACHE', os.path.join(_BACKEND_DIR, 'data_external', 'geocodificacion.sqlite3'))
+GEOCODIFICACION_TASA = float(os.getenv('GEOCODIFICACION_TASA', 1))
+GEOCODIFICACION_CONCURRENCIA = int(os.getenv('GEOCODIFICACION_CONCURRENCIA', 2))
+GEOCODIFICACION_USER_AGENT = os.getenv('GEOCODIFICACION_USER_AGENT', 'cardionet-geocode-v1')
+CIUDAD_POR_DEFECTO = 'Lima, Peru'
+
+_NO_GUARDADA = object()
+_ESPACIOS = re.compile(r'\s+')
+
+
+def normalizar_direccion(direccion: str) -> str:
+    """Minúsculas, sin acentos, espacios simples y sin comas ni puntos sobrantes en los extremos."""
+    return _ESPACIOS.sub(' ', plegar(direccion)).strip(' ,.;')
+
+
+def _limpiar(direccion: str | None) -> str:
+    """Dirección sin espacios ni comas sobrantes en los extremos ("Av. X 123," -> "Av. X 123")."""
+    return (direccion or '').strip(' \t\n,.;')
+
+
+class TokenBucket:
+    """Hasta `capacidad` peticiones seguidas y luego `tasa` por segundo (tasa <= 0: sin límite)."""
+
+    def __init__(self, tasa: float, capacidad: float = 1.0):
+        self.tasa = tasa
+        self.capacidad = max(1.0, capacidad)
+        self._fichas = self.capacidad
+        self._ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def adquirir(self) -> None:
+        if self.tasa <= 0:
+            return
+        while True:
+            with self._lock:
+                ahora = time.monotonic()
+                self._fichas = min(self.capacidad, self._fichas + (ahora - self._ultimo) * self.tasa)
+                self._ultimo = ahora
+                if self._fichas >= 1:
+                    self._fichas -= 1
+                    return
+                espera = (1 - self._fichas) / self.tasa
+            time.sleep(espera)
+
+
+class CacheGeocodificacion:
+    """Dirección normalizada -> (lat, lng) en SQLite; (None, None) registra que no hubo resultado."""
+
+    def __init__(self, ruta: str):
+        if ruta != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+        self._conexion = sqlite3.connect(ruta, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conexion:
+            self._conexion.execute(
+                'CREATE TABLE IF NOT EXISTS geocodificaciones ('
+                ' direccion TEXT PRIMARY KEY, latitud REAL, longitud REAL, creado REAL)'
+            )
+
+    def obtener(self, clave: str):
+        """(lat, lng), (None, None) si se consultó sin resultado, o _NO_GUARDADA."""
+        with self._lock:
+            fila = self._conexion.execute(
+                'SELECT latitud, longitud FROM geocodificaciones WHERE direccion = ?', (clave,)
+            ).fetchone()
+        return _NO_GUARDADA if fila is None else (fila[0], fila[1])
+
+    def guardar(self, clave: str, lat: float | None, lng: float | None) -> None:
+        with self._lock, self._conexion:
+            self._conexion.execute(
+                'INSERT OR REPLACE INTO geocodificaciones VALUES (?, ?, ?, ?)', (clave, lat, lng, time.time())
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conexion.execute('SELECT count(*) FROM geocodificaciones').fetchone()[0]
+
+
+class BackendNominatim:
+    """Nominatim/OpenStreetMap vía geopy; un solo cliente para todas las consultas."""
+
+    def __init__(self, user_agent: str = GEOCODIFICACION_USER_AGENT, timeout: float = 10):
+        from geopy.geocoders import Nominatim  # ImportError si geopy no está instalado
+        self._locator = Nominatim(user_agent=user_agent, timeout=timeout)
+
+    def geocodificar(self, consulta: str) -> tuple[float, float] | None:
+        location = self._locator.geocode(consulta)
+        return (location.latitude, location.longitude) if location else None
+
+
+class BackendFijo:
+    """Backend local sin red: responde desde un dict de consulta normalizada -> (lat, lng)."""
+
+    def __init__(self, coordenadas: dict[str, tuple[float, float]], demora_seg: float = 0.0):
+        self.coordenadas = {normalizar_direccion(k): v for k, v in coordenadas.items()}
+        self.demora_seg = demora_seg
+        self.llamadas = 0
+
+    def geocodificar(self, consulta: str) -> tuple[float, float] | None:
+        self.llamadas += 1
+        if self.demora_seg:
+            time.sleep(self.demora_seg)
+        return self.coordenadas.get(normalizar_direccion(consulta))
+
+
+class Geocodificador:
+    def __init__(self, backend, cache: CacheGeocodificacion, tasa: float = GEOCODIFICACION_TASA,
+                 concurrencia: int = GEOCODIFICACION_CONCURRENCIA, ciudad: str = CIUDAD_POR_DEFECTO):
+        self.backend = backend
+        self.cache = cache
+        self.limite = TokenBucket(tasa)
+        self.concurrencia = max(1, concurrencia)
+        self.ciudad = ciudad
+        self._lock = threading.Lock()
+        self.aciertos_cache = 0
+        self.llamadas = 0
+        self.sin_resultado = 0
+        self.errores = 0
+
+    def _consulta(self, direccion: str) -> str:
+        return f'{direccion}, {self.ciudad}' if self.ciudad else direccion
+
+    def _consultar_backend(self, clave: str, consulta: str) -> tuple[float | None, float | None]:
+        self.limite.adquirir()
+        with self._lock:
+            self.llamadas += 1
+        try:
+            coords = self.backend.geocodificar(consulta)
+        except Exception:
+            # Timeout o error del servicio: no se guarda, se reintenta en la próxima corrida
+            with self._lock:
+                self.errores += 1
+            return None, None
+        lat, lng = coords if coords else (None, None)
+        if coords is None:
+            with self._lock:
+                self.sin_resultado += 1
+        self.cache.guardar(clave, lat, lng)
+        return lat, lng
+
+    def geocodificar(self, direccion: str) -> tuple[float | None, float | None]:
+        """Coordenadas de una dirección: primero la caché, si no el backend (respetando la tasa)."""
+        return self.geocodificar_varios([direccion]).get(direccion, (None, None))
+
+    def geocodificar_varios(self, direcciones) -> dict[str, tuple[float | None, float | None]]:
+        """
+        Dirección -> (lat, lng) para todas las direcciones. Las que comparten clave normalizada se
+        consultan una sola vez; las que no están en caché se reparten entre `concurrencia` hilos.
+        """
+        por_clave: dict[str, list[str]] = {}
+        for direccion in direcciones:
+            base = _limpiar(direccion)
+            if base:
+                por_clave.setdefault(normalizar_direccion(self._consulta(base)), []).append(direccion)
+
+        resultado = {}
+        pendientes = []
+        for clave, originales in por_clave.items():
+            guardada = self.cache.obtener(clave)
+            if guardada is _NO_GUARDADA:
+                pendientes.append((clave, self._consulta(_limpiar(originales[0]))))
+                continue
+            with self._lock:
+                self.aciertos_cache += 1
+            resultado.update(dict.fromkeys(originales, guardada))
+
+        if pendientes:
+            if self.concurrencia == 1 or len(pendientes) == 1:
+                respuestas = [self._consultar_backend(*p) for p in pendientes]
+            else:
+                with ThreadPoolExecutor(max_workers=min(self.concurrencia, len(pendientes))) as pool:
+                    respuestas = list(pool.map(lambda p: self._consultar_backend(*p), pendientes))
+            for (clave, _), coords in zip(pendientes, respuestas):
+                resultado.update(dict.fromkeys(por_clave[clave], coords))
+        return resultado
+
+    def estadisticas(self) -> dict:
+        return {
+            'aciertos_cache': self.aciertos_cache,
+            'llamadas': self.llamadas,
+            'sin_resultado': self.sin_resultado,
+            'errores': self.errores,
+            'entradas_cache': len(self.cache),
+            'tasa_por_seg': self.limite.tasa,
+            'concurrencia': self.concurrencia,
+        }
+
+
+_geocodificador: Geocodificador | None = None
+_geocodificador_lock = threading.Lock()
+
+
+def obtener_geocodificador(backend=None) -> Geocodificador:
+    """
+    Geocodificador compartido del proceso (Nominatim + caché en GEOCODIFICACION_CACHE).
+    Con `backend` se arma uno nuevo sobre la misma caché. ImportError si falta geopy.
+    """
+    global _geocodificador
+    with _geocodificador_lock:
+        if backend is not None:
+            cache = _geocodificador.cache if _geocodificador else CacheGeocodificacion(GEOCODIFICACION_CACHE)
+            _geocodificador = Geocodificador(backend, cache)
+        elif _geocodificador is None:
+            _geocodificador = Geocodificador(BackendNominatim(), CacheGeocodificacion(GEOCODIFICACION_CACHE))
+        return _geocodificador
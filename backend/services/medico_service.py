@@ -1,95 +1,239 @@
 """Servicio de búsqueda y recomendación de médicos."""
-from database.config import SessionLocal
-from repositories.medico_repo import (
-    buscar_por_especialidad,
-    buscar_cardiologos_generales,
+import csv
+import io
+import json
+import math
+import os
+
+from database.config import SessionLocal, engine_lectura
+from database.sesion import obtener_sesion, leer
+from repositories.medico_repo import obtener_por_id, medico_a_dict, incrementar_version_directorio, iterar_medicos
+from repositories.directorio_medicos import (
+    recomendar,
     obtener_todos_cardiologos,
     contar_cardiologos,
-    obtener_por_id,
-    medicos_a_dict,
-    medico_a_dict
+    invalidar_directorio
 )
+from repositories.indice_geo import buscar_cercanos
+from repositories.clusters_mapa import obtener_clusters
+from utils.especialidades import ETIQUETA_CARDIOLOGIA, normalizar_etiqueta
+from utils.paginacion import codificar_cursor, decodificar_cursor
 from utils.security import sanitizar_especialidad
 
 
-def obtener_medicos_recomendados(perfil_riesgo: dict) -> dict:
-    """Obtiene médicos recomendados según el perfil de riesgo del paciente."""
+def _validar_preferencias(preferencias: dict | None) -> dict:
+    """Preferencias opcionales de ubicación y precio. Lanza ValueError si son inválidas."""
+    if preferencias is None:
+        return {}
+    if not isinstance(preferencias, dict):
+        raise ValueError('preferencias debe ser un objeto')
+    validas = {}
+    for campo in ('distrito', 'provincia'):
+        valor = preferencias.get(campo)
+        if valor is None or str(valor).strip() == '':
+            continue
+        if not isinstance(valor, str) or len(valor) > 100:
+            raise ValueError(f'{campo} inválido')
+        validas[campo] = valor.strip()
+    if preferencias.get('precio_max') not in (None, ''):
+        try:
+            precio_max = float(preferencias['precio_max'])
+        except (TypeError, ValueError):
+            raise ValueError('precio_max inválido')
+        if precio_max <= 0:
+            raise ValueError('precio_max debe ser mayor que 0')
+        validas['precio_max'] = precio_max
+    return validas
+
+
+def obtener_medicos_recomendados(perfil_riesgo: dict, preferencias: dict = None) -> dict:
+    """Obtiene los 5 médicos recomendados según el perfil de riesgo y las preferencias opcionales."""
     perfil = perfil_riesgo or {}
     especialidades_raw = perfil.get('especialidades', ['Cardiología General'])
     especialidades_requeridas = [sanitizar_especialidad(e) for e in especialidades_raw[:2]]
+    preferencias_validas = _validar_preferencias(preferencias)
 
-    db = SessionLocal()
-    try:
-        medicos_recomendados = []
-        for especialidad in especialidades_requeridas[:2]:
-            medicos = buscar_por_especialidad(db, especialidad, limite=5)
-            for m in medicos:
-                if m not in medicos_recomendados:
-                    medicos_recomendados.append(m)
-
-        if len(medicos_recomendados) < 3:
-            medicos_generales = buscar_cardiologos_generales(db, limite=5)
-            for m in medicos_generales:
-                if m not in medicos_recomendados and len(medicos_recomendados) < 5:
-                    medicos_recomendados.append(m)
-
-        medicos_recomendados.sort(key=lambda x: x.calificacion or 0, reverse=True)
-        resultado = medicos_a_dict(medicos_recomendados[:5])
+    return {
+        'medicos': recomendar(especialidades_requeridas, limite=5, **preferencias_validas),
+        'perfil_detectado': perfil.get('principal', 'Cardiología General'),
+        'especialidades_recomendadas': especialidades_requeridas,
+        'preferencias_aplicadas': preferencias_validas
+    }
 
-        return {
-            'medicos': resultado,
-            'perfil_detectado': perfil.get('principal', 'Cardiología General'),
-            'especialidades_recomendadas': especialidades_requeridas
-        }
-    finally:
-        db.close()
 
+def _clave_cursor(cursor: str) -> tuple:
+    """(calificacion, id) del último médico de la página anterior."""
+    calificacion, medico_id = decodificar_cursor(cursor, 2)
+    if calificacion is not None and (isinstance(calificacion, bool) or not isinstance(calificacion, (int, float))):
+        raise ValueError('cursor inválido')
+    if isinstance(medico_id, bool) or not isinstance(medico_id, int):
+        raise ValueError('cursor inválido')
+    return calificacion, medico_id
 
-def obtener_todos_medicos(page: int = 1, per_page: int = 10) -> dict:
-    """Obtiene cardiólogos disponibles con paginación."""
-    db = SessionLocal()
-    try:
-        total = contar_cardiologos(db)
-        offset = (page - 1) * per_page
-        medicos = obtener_todos_cardiologos(db, limite=per_page, offset=offset)
-        total_pages = max(1, (total + per_page - 1) // per_page)
+
+def obtener_todos_medicos(page: int = 1, per_page: int = 10, cursor: str = None) -> dict:
+    """
+    Cardiólogos disponibles (desde el snapshot en memoria), paginados por page/per_page o por
+    cursor: con cursor (vacío = primera página) la respuesta trae next_cursor en lugar de page.
+    """
+    total = contar_cardiologos()
+    if cursor is not None:
+        despues_de = _clave_cursor(cursor) if cursor else None
+        medicos = obtener_todos_cardiologos(limite=per_page + 1, despues_de=despues_de)
+    else:
+        medicos = obtener_todos_cardiologos(limite=per_page + 1, offset=(page - 1) * per_page)
+    hay_mas = len(medicos) > per_page
+    medicos = medicos[:per_page]
+    next_cursor = codificar_cursor((medicos[-1]['calificacion'], medicos[-1]['id'])) if hay_mas else None
+
+    if cursor is not None:
         return {
-            'medicos': medicos_a_dict(medicos),
+            'medicos': medicos,
             'total': total,
-            'page': page,
             'per_page': per_page,
-            'total_pages': total_pages
+            'next_cursor': next_cursor
         }
-    finally:
-        db.close()
+    total_pages = max(1, (total + per_page - 1) // per_page)
+    return {
+        'medicos': medicos,
+        'total': total,
+        'page': page,
+        'per_page': per_page,
+        'total_pages': total_pages,
+        'next_cursor': next_cursor
+    }
+
+
+def obtener_medicos_cercanos(lat, lng, radio_km=10, k=10, subespecialidad: str = None) -> dict:
+    """Los k médicos más cercanos a (lat, lng) dentro de radio_km, con su distancia."""
+    try:
+        lat, lng = float(lat), float(lng)
+        radio_km, k = float(radio_km), int(k)
+    except (TypeError, ValueError):
+        raise ValueError('lat, lng, radio_km y k deben ser números')
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        raise ValueError('Coordenadas fuera de rango')
+    if not (0 < radio_km <= 100):
+        raise ValueError('radio_km debe estar entre 0 y 100')
+    if not (1 <= k <= 50):
+        raise ValueError('k debe estar entre 1 y 50')
+    etiqueta = normalizar_etiqueta(subespecialidad) if subespecialidad else ETIQUETA_CARDIOLOGIA
+
+    medicos = buscar_cercanos(lat, lng, k=k, radio_km=radio_km, etiqueta=etiqueta)
+    return {
+        'medicos': medicos,
+        'total': len(medicos),
+        'origen': {'lat': lat, 'lng': lng},
+        'radio_km': radio_km
+    }
+
+
+def obtener_mapa_medicos(bbox: str, zoom) -> dict:
+    """Clusters del mapa para bbox 'oeste,sur,este,norte' (formato de Leaflet toBBoxString)."""
+    try:
+        oeste, sur, este, norte = (float(v) for v in str(bbox).split(','))
+        zoom = int(zoom)
+    except (TypeError, ValueError):
+        raise ValueError('bbox debe ser "oeste,sur,este,norte" y zoom un entero')
+    if not (0 <= zoom <= 22):
+        raise ValueError('zoom debe estar entre 0 y 22')
+    return obtener_clusters(*_ajustar_bbox(oeste, sur, este, norte), zoom)
+
+
+def _ajustar_bbox(oeste: float, sur: float, este: float, norte: float) -> tuple[float, float, float, float]:
+    """
+    Lleva el bbox de Leaflet al rango del mundo: al alejar el zoom o pasar el antimeridiano
+    las longitudes salen de ±180. Si el área visible cruza el antimeridiano se usa el ancho
+    completo (sobran marcadores fuera de pantalla, no faltan).
+    """
+    if not all(map(math.isfinite, (oeste, sur, este, norte))) or sur > norte or oeste > este:
+        raise ValueError('bbox fuera de rango')
+    sur, norte = (min(max(v, -90.0), 90.0) for v in (sur, norte))
+    if este - oeste >= 360:
+        return -180.0, sur, 180.0, norte
+    vueltas = math.floor((oeste + 180.0) / 360.0) * 360.0
+    oeste, este = oeste - vueltas, este - vueltas
+    if este > 180:
+        return -180.0, sur, 180.0, norte
+    return oeste, sur, este, norte
+
+
+EXPORTACION_LOTE = int(os.getenv('EXPORTACION_LOTE', 500))
+FORMATOS_EXPORTACION = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+_COLUMNAS_CSV = ('id', 'nombre', 'especialidad', 'subespecialidad', 'region', 'provincia', 'distrito',
+                 'direccion_completa', 'ubicacion_consultorio', 'telefono', 'email', 'calificacion',
+                 'num_opiniones', 'precio_visita', 'latitud', 'longitud')
+
+
+def exportar_medicos(formato: str = 'ndjson', distrito: str = None, subespecialidad: str = None,
+                     desde_id=0):
+    """
+    Retorna (generador de texto, mimetype) con el directorio completo en NDJSON o CSV, en
+    orden de id. Las filas salen del cursor del servidor por lotes de EXPORTACION_LOTE, así
+    que la memoria es constante. Para reanudar, desde_id = último id recibido.
+    """
+    if formato not in FORMATOS_EXPORTACION:
+        raise ValueError('format debe ser ndjson o csv')
+    try:
+        desde_id = int(desde_id or 0)
+    except (TypeError, ValueError):
+        raise ValueError('desde_id debe ser un número')
+    if desde_id < 0:
+        raise ValueError('desde_id debe ser mayor o igual a 0')
+    for nombre, valor in (('distrito', distrito), ('subespecialidad', subespecialidad)):
+        if valor is not None and len(valor) > 200:
+            raise ValueError(f'{nombre} muy largo')
+
+    def generar():
+        db = SessionLocal(bind=engine_lectura())
+        try:
+            filas = iterar_medicos(db, distrito=distrito, etiqueta=subespecialidad, desde_id=desde_id,
+                                   tamano_lote=EXPORTACION_LOTE)
+            buffer = io.StringIO()
+            escritor = csv.writer(buffer) if formato == 'csv' else None
+            if escritor:
+                escritor.writerow(_COLUMNAS_CSV)
+            for lote in filas.partitions():
+                for fila in lote:
+                    medico = medico_a_dict(fila)
+                    if escritor:
+                        escritor.writerow([medico[c] for c in _COLUMNAS_CSV])
+                    else:
+                        buffer.write(json.dumps(medico, ensure_ascii=False))
+                        buffer.write('\n')
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            resto = buffer.getvalue()
+            if resto:
+                yield resto
+        finally:
+            db.close()
+
+    return generar(), FORMATOS_EXPORTACION[formato]
 
 
 def obtener_perfil_medico(medico_id: int) -> dict:
     """Obtiene el perfil de un médico por ID."""
-    db = SessionLocal()
-    try:
-        medico = obtener_por_id(db, medico_id)
-        if not medico:
-            raise ValueError('Médico no encontrado')
-        return medico_a_dict(medico)
-    finally:
-        db.close()
+    medico = leer(obtener_por_id, medico_id)
+    if not medico:
+        raise ValueError('Médico no encontrado')
+    return medico_a_dict(medico)
 
 
 def actualizar_perfil_medico(medico_id: int, datos: dict) -> dict:
     """Actualiza el perfil del médico (datos del consultorio)."""
-    db = SessionLocal()
-    try:
-        medico = obtener_por_id(db, medico_id)
-        if not medico:
-            raise ValueError('Médico no encontrado')
-
-        campos_permitidos = ['telefono', 'ubicacion_consultorio', 'provincia', 'distrito', 'direccion_completa', 'precio_visita', 'email']
-        for k in campos_permitidos:
-            if k in datos and datos[k] is not None:
-                setattr(medico, k, datos[k])
-        db.commit()
-        db.refresh(medico)
-        return medico_a_dict(medico)
-    finally:
-        db.close()
+    db = obtener_sesion()
+    medico = obtener_por_id(db, medico_id)
+    if not medico:
+        raise ValueError('Médico no encontrado')
+
+    campos_permitidos = ['telefono', 'ubicacion_consultorio', 'provincia', 'distrito', 'direccion_completa', 'precio_visita', 'email']
+    for k in campos_permitidos:
+        if k in datos and datos[k] is not None:
+            setattr(medico, k, datos[k])
+    incrementar_version_directorio(db)
+    db.commit()
+    invalidar_directorio()
+    db.refresh(medico)
+    return medico_a_dict(medico)
@@ -0,0 +1,276 @@
+"""
+Persistencia diferida (write-behind) de evaluaciones.
+
+Las evaluaciones se encolan en una cola acotada y un hilo de fondo las escribe por lotes
+(una consulta de pacientes, un INSERT multi-fila de evaluaciones y un commit por lote),
+fuera del camino de la respuesta. La cola se vacía al cerrar el proceso.
+
+Política cuando la cola está llena (PERSISTENCIA_POLITICA):
+  sincrono   la petición escribe su evaluación directamente (por defecto; no se pierde nada)
+  bloquear   espera hasta PERSISTENCIA_BLOQUEO_SEG por espacio y, si no hay, escribe directamente
+  descartar  descarta la evaluación y la cuenta en 'descartadas'
+
+Si la base no responde (OperationalError, DisconnectionError, timeout del pool u otro error que
+no sea de datos) el lote se reintenta con espera exponencial (PERSISTENCIA_REINTENTO_SEG, hasta
+PERSISTENCIA_REINTENTO_MAX_SEG) sin perder nada. Solo se descartan, una por una, las evaluaciones
+con datos inválidos (IntegrityError, DataError); se cuentan en 'rechazadas' y se registran con logging.
+
+Desactivada por defecto (PERSISTENCIA_DIFERIDA=false): así /api/evaluacion responde el paciente_id.
+Activada, el paciente_id es null cuando la evaluación quedó en cola.
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+
+from sqlalchemy.exc import DataError, IntegrityError
+
+from database.config import SessionLocal
+from repositories.paciente_repo import guardar_evaluaciones_con_pacientes
+
+POLITICAS = ('sincrono', 'bloquear', 'descartar')
+# paciente_repo convierte IntegrityError en ValueError con un mensaje para el cliente
+_ERRORES_DE_DATOS = (IntegrityError, DataError, ValueError)
+_FIN = object()
+
+logger = logging.getLogger(__name__)
+
+
+class ColaPersistencia:
+    """Cola acotada de evaluaciones pendientes con un hilo escritor por proceso."""
+
+    def __init__(self, escribir_lote, capacidad: int = 1000, max_lote: int = 200,
+                 politica: str = 'sincrono', bloqueo_seg: float = 2.0, habilitada: bool = True,
+                 reintento_seg: float = 0.5, reintento_max_seg: float = 30.0):
+        if politica not in POLITICAS:
+            raise ValueError(f'Política de persistencia desconocida: {politica}')
+        self.escribir_lote = escribir_lote
+        self.capacidad = max(1, int(capacidad))
+        self.max_lote = max(1, int(max_lote))
+        self.politica = politica
+        self.bloqueo_seg = float(bloqueo_seg)
+        self.habilitada = habilitada
+        self.reintento_seg = max(0.01, float(reintento_seg))
+        self.reintento_max_seg = max(self.reintento_seg, float(reintento_max_seg))
+        self._cola = queue.Queue(maxsize=self.capacidad)
+        self._hilo = None
+        self._pid = None
+        self._detenida = False
+        self._lock = threading.Lock()
+        self._vacia = threading.Condition(self._lock)
+        self._en_vuelo = 0
+        self.encoladas = 0
+        self.escritas = 0
+        self.lotes = 0
+        self.sincronas = 0
+        self.descartadas = 0
+        self.rechazadas = 0
+        self.reintentos = 0
+        self.ultimo_error = None
+
+    def encolar(self, paciente_data: dict | None, parametros: list, prediccion: int) -> int | None:
+        """
+        Registra una evaluación para guardarla en segundo plano.
+        Retorna el paciente_id solo si la evaluación se escribió de inmediato (modo síncrono);
+        si quedó en cola retorna None.
+        """
+        item = (paciente_data, parametros, prediccion)
+        if not self.habilitada or self._detenida:
+            return self._escribir_directo(item)
+
+        self._asegurar_hilo()
+        with self._lock:
+            self._en_vuelo += 1
+        try:
+            if self.politica == 'bloquear':
+                self._cola.put(item, timeout=self.bloqueo_seg)
+            else:
+                self._cola.put_nowait(item)
+        except queue.Full:
+            self._terminar(1)
+            if self.politica == 'descartar':
+                with self._lock:
+                    self.descartadas += 1
+                return None
+            return self._escribir_directo(item)
+        with self._lock:
+            self.encoladas += 1
+        return None
+
+    def _escribir_directo(self, item: tuple) -> int | None:
+        with self._lock:
+            self.sincronas += 1
+        return self.escribir_lote([item])[0]
+
+    def _asegurar_hilo(self) -> None:
+        """Inicia el escritor en el proceso actual (tras un fork el hilo del padre no existe)."""
+        if self._hilo is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._hilo is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._hilo = threading.Thread(target=self._trabajar, name='cardionet-persistencia', daemon=True)
+            self._hilo.start()
+
+    def _trabajar(self) -> None:
+        fin = False
+        while not fin:
+            item = self._cola.get()
+            if item is _FIN:
+                break
+            lote = [item]
+            while len(lote) < self.max_lote:
+                try:
+                    siguiente = self._cola.get_nowait()
+                except queue.Empty:
+                    break
+                if siguiente is _FIN:
+                    fin = True
+                    break
+                lote.append(siguiente)
+            self._escribir(lote)
+
+    def _escribir(self, lote: list[tuple]) -> None:
+        """
+        Escribe el lote; si un dato inválido lo hace fallar, sigue item por item y descarta solo
+        los inválidos. Con la base caída reintenta lo pendiente con espera exponencial.
+        """
+        pendientes = lote
+        escritas = 0
+        espera = self.reintento_seg
+        try:
+            while pendientes:
+                try:
+                    self.escribir_lote(pendientes)
+                    escritas += len(pendientes)
+                    break
+                except _ERRORES_DE_DATOS:
+                    pendientes, escritas_item = self._escribir_por_item(pendientes)
+                    escritas += escritas_item
+                    if not pendientes:
+                        break
+                except Exception as e:
+                    self._registrar_reintento(e, len(pendientes), espera)
+                time.sleep(espera)
+                espera = min(espera * 2, self.reintento_max_seg)
+        finally:
+            with self._lock:
+                self.escritas += escritas
+                self.lotes += 1
+            self._terminar(len(lote))
+
+    def _escribir_por_item(self, items: list[tuple]) -> tuple[list[tuple], int]:
+        """Escribe cada item por separado. Retorna (items a reintentar por error transitorio, escritas)."""
+        escritas = 0
+        for i, item in enumerate(items):
+            try:
+                self.escribir_lote([item])
+                escritas += 1
+            except _ERRORES_DE_DATOS as e:
+                # Solo el tipo: el texto del error puede incluir parámetros con datos del paciente
+                logger.error('Evaluación descartada por datos inválidos (%s)', type(e).__name__)
+                with self._lock:
+                    self.rechazadas += 1
+                    self.ultimo_error = type(e).__name__
+            except Exception as e:
+                self._registrar_reintento(e, len(items) - i, self.reintento_seg)
+                return items[i:], escritas
+        return [], escritas
+
+    def _registrar_reintento(self, e: Exception, cantidad: int, espera: float) -> None:
+        logger.warning('No se pudieron guardar %d evaluaciones (%s); reintento en %.1f s',
+                       cantidad, type(e).__name__, espera)
+        with self._lock:
+            self.reintentos += 1
+            self.ultimo_error = type(e).__name__
+
+    def _terminar(self, cantidad: int) -> None:
+        with self._lock:
+            self._en_vuelo -= cantidad
+            if self._en_vuelo <= 0:
+                self._vacia.notify_all()
+
+    def vaciar(self, timeout: float = 10) -> bool:
+        """Espera a que se escriban todas las evaluaciones encoladas. False si se agota el tiempo."""
+        limite = time.monotonic() + timeout
+        with self._lock:
+            while self._en_vuelo > 0:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    return False
+                self._vacia.wait(restante)
+        return True
+
+    def detener(self, timeout: float = 10) -> bool:
+        """Deja de aceptar trabajo en segundo plano y escribe lo pendiente (se invoca al cerrar)."""
+        self._detenida = True
+        if self._hilo is None or self._pid != os.getpid() or not self._hilo.is_alive():
+            return True
+        completo = self.vaciar(timeout)
+        try:
+            self._cola.put(_FIN, timeout=1)
+        except queue.Full:
+            pass
+        self._hilo.join(timeout=1)
+        if not completo:
+            logger.error('Cierre con %d evaluaciones sin guardar', self._en_vuelo)
+        return completo
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            return {
+                'habilitada': self.habilitada,
+                'politica': self.politica,
+                'profundidad': self._cola.qsize(),
+                'capacidad': self.capacidad,
+                'en_vuelo': self._en_vuelo,
+                'encoladas': self.encoladas,
+                'escritas': self.escritas,
+                'lotes': self.lotes,
+                'sincronas': self.sincronas,
+                'descartadas': self.descartadas,
+                'rechazadas': self.rechazadas,
+                'reintentos': self.reintentos,
+                'ultimo_error': self.ultimo_error,
+            }
+
+
+def _escribir_lote(items: list[tuple]) -> list[int | None]:
+    db = SessionLocal()
+    try:
+        return guardar_evaluaciones_con_pacientes(db, items)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def crear_desde_entorno() -> ColaPersistencia:
+    """PERSISTENCIA_DIFERIDA, PERSISTENCIA_COLA_MAX, PERSISTENCIA_LOTE_MAX, PERSISTENCIA_POLITICA, PERSISTENCIA_REINTENTO_*."""
+    return ColaPersistencia(
+        _escribir_lote,
+        capacidad=int(os.getenv('PERSISTENCIA_COLA_MAX', 1000)),
+        max_lote=int(os.getenv('PERSISTENCIA_LOTE_MAX', 200)),
+        politica=os.getenv('PERSISTENCIA_POLITICA', 'sincrono').lower(),
+        bloqueo_seg=float(os.getenv('PERSISTENCIA_BLOQUEO_SEG', 2)),
+        habilitada=os.getenv('PERSISTENCIA_DIFERIDA', 'false').lower() in ('true', '1', 'yes'),
+        reintento_seg=float(os.getenv('PERSISTENCIA_REINTENTO_SEG', 0.5)),
+        reintento_max_seg=float(os.getenv('PERSISTENCIA_REINTENTO_MAX_SEG', 30)),
+    )
+
+
+_cola = crear_desde_entorno()
+atexit.register(_cola.detener, float(os.getenv('PERSISTENCIA_CIERRE_SEG', 10)))
+
+
+def encolar_evaluacion(paciente_data: dict | None, parametros: list, prediccion: int) -> int | None:
+    """Guarda la evaluación en segundo plano. Retorna el paciente_id si se escribió de inmediato."""
+    return _cola.encolar(paciente_data, parametros, prediccion)
+
+
+def estadisticas_persistencia() -> dict:
+    return _cola.estadisticas()
@@ -0,0 +1,94 @@
+"""
+Configuración común de las pruebas (ejecutar desde backend/: python -m pytest).
+
+database/config.py arma la URL de conexión al importarse, así que se fijan variables DB_*
+de relleno: ninguna prueba abre esa conexión. Las pruebas que necesitan PostgreSQL usan
+TEST_DATABASE_URL y se omiten si no está definida.
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+for _variable, _valor in (('DB_HOST', 'localhost'), ('DB_PORT', '5432'), ('DB_NAME', 'cardionet_test'),
+                          ('DB_USER', 'cardionet'), ('DB_PASSWORD', 'cardionet')):
+    os.environ.setdefault(_variable, _valor)
+
+
+@pytest.fixture
+def sesion_postgres():
+    """
+    Sesión sobre TEST_DATABASE_URL dentro de una transacción que se deshace al terminar: los
+    commit() del código probado solo liberan savepoints.
+    """
+    url = os.getenv('TEST_DATABASE_URL')
+    if not url:
+        pytest.skip('TEST_DATABASE_URL no definida')
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+    from database.models import Base
+
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    conexion = engine.connect()
+    transaccion = conexion.begin()
+    sesion = Session(bind=conexion, join_transaction_mode='create_savepoint')
+    try:
+        yield sesion
+    finally:
+        sesion.close()
+        transaccion.rollback()
+        conexion.close()
+        engine.dispose()
+
+
+class DirectorioEnMemoria:
+    """Tabla medicos y directorio_version en memoria; registra si cada lectura fue a la primaria."""
+
+    def __init__(self, medicos: list):
+        self.version = 1
+        self.medicos = medicos
+        self.lecturas = []
+
+    def con_sesion(self, funcion, primaria: bool = False):
+        self.lecturas.append(primaria)
+        return funcion(None)
+
+
+@pytest.fixture
+def directorio_en_memoria(monkeypatch):
+    """Snapshot del directorio construido desde DirectorioEnMemoria en lugar de la base."""
+    from database.models import Medico
+    from repositories import directorio_medicos
+
+    base = DirectorioEnMemoria([
+        Medico(id=1, nombre='Dra. Ana Torres', especialidad='Cardiología', calificacion=4.9, distrito='Lince'),
+        Medico(id=2, nombre='Dr. Luis Paz', especialidad='Cardiólogo', calificacion=4.2, distrito='Surco'),
+        Medico(id=3, nombre='Dr. Raúl Díaz', especialidad='Pediatría', calificacion=4.5),
+    ])
+    monkeypatch.setattr(directorio_medicos, '_con_sesion', base.con_sesion)
+    monkeypatch.setattr(directorio_medicos, 'obtener_version_directorio', lambda db: base.version)
+    # Mismo orden que obtener_directorio: calificación desc, sin calificación al final, id
+    monkeypatch.setattr(directorio_medicos, 'obtener_directorio', lambda db: sorted(
+        base.medicos, key=lambda m: directorio_medicos._clave_orden(m.calificacion, m.id)))
+    monkeypatch.setattr(directorio_medicos, '_snapshot', directorio_medicos._Snapshot())
+    monkeypatch.setattr(directorio_medicos, 'DIRECTORIO_VERIFICAR_SEG', 0)
+    return base
+
+
+@pytest.fixture(scope='session')
+def cliente_api():
+    """Cliente de prueba con los blueprints de médicos y salud (sin límite de peticiones)."""
+    from flask import Flask
+    from flask_limiter import Limiter
+    from routes.health_bp import health_bp
+    from routes.medicos_bp import init_medicos_bp, medicos_bp
+
+    app = Flask(__name__)
+    app.config['RATELIMIT_ENABLED'] = False
+    init_medicos_bp(Limiter(key_func=lambda: '127.0.0.1', app=app))
+    app.register_blueprint(medicos_bp, url_prefix='/api/medicos')
+    app.register_blueprint(health_bp, url_prefix='/api')
+    return app.test_client()
@@ -0,0 +1,47 @@
+"""BosqueCompilado debe dar exactamente las mismas probabilidades que sklearn."""
+import numpy as np
+import pytest
+from sklearn.datasets import make_classification
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.tree import DecisionTreeClassifier
+
+from ml.arboles_compilados import BosqueCompilado
+
+
+@pytest.fixture(scope='module')
+def datos():
+    X, y = make_classification(n_samples=600, n_features=13, n_informative=8, random_state=7)
+    # Valores repetidos y enteros como los parámetros clínicos: muchas filas caen justo en un umbral
+    X[:, :4] = np.round(X[:, :4] * 3)
+    return X[:400], y[:400], X[400:]
+
+
+@pytest.fixture(scope='module', params=['random_forest', 'arbol'])
+def modelo(request, datos):
+    X, y, _ = datos
+    if request.param == 'random_forest':
+        return RandomForestClassifier(n_estimators=25, max_depth=8, random_state=0).fit(X, y)
+    return DecisionTreeClassifier(max_depth=10, random_state=0).fit(X, y)
+
+
+def test_predict_proba_igual_a_sklearn(modelo, datos):
+    _, _, X_prueba = datos
+    compilado = BosqueCompilado.desde_sklearn(modelo)
+    np.testing.assert_array_equal(compilado.predict_proba(X_prueba), modelo.predict_proba(X_prueba))
+    clases, _ = compilado.predecir(X_prueba)
+    np.testing.assert_array_equal(clases, modelo.predict(X_prueba))
+
+
+def test_guardar_y_cargar_con_mmap(modelo, datos, tmp_path):
+    _, _, X_prueba = datos
+    BosqueCompilado.desde_sklearn(modelo).guardar(str(tmp_path))
+    cargado = BosqueCompilado.cargar(str(tmp_path), mmap_mode='r')
+    assert cargado.n_features == modelo.n_features_in_
+    assert isinstance(cargado.valor.base, np.memmap)
+    np.testing.assert_array_equal(cargado.predict_proba(X_prueba), modelo.predict_proba(X_prueba))
+
+
+def test_rechaza_cantidad_de_parametros_distinta(modelo, datos):
+    _, _, X_prueba = datos
+    with pytest.raises(ValueError):
+        BosqueCompilado.desde_sklearn(modelo).predict_proba(X_prueba[:, :5])
@@ -0,0 +1,124 @@
+"""Agrupador de predicciones: lotes con líder/seguidores, promoción y reintento fila por fila."""
+import threading
+import time
+
+import numpy as np
+import pytest
+from sklearn.datasets import make_classification
+from sklearn.ensemble import RandomForestClassifier
+
+from ml import model_loader
+from ml.arboles_compilados import BosqueCompilado
+from ml.cache_predicciones import CachePredicciones
+from ml.coalescedor import CoalescedorPredicciones, crear_desde_entorno
+from ml.registro_modelos import PaqueteModelos, RegistroModelos
+
+
+def _en_paralelo(funcion, entradas: list) -> list:
+    """Llama funcion(entrada) desde un hilo por entrada, todos a la vez. Retorna resultado o excepción."""
+    salidas = [None] * len(entradas)
+    barrera = threading.Barrier(len(entradas))
+
+    def trabajar(i):
+        barrera.wait()
+        try:
+            salidas[i] = funcion(entradas[i])
+        except Exception as e:
+            salidas[i] = e
+
+    hilos = [threading.Thread(target=trabajar, args=(i,)) for i in range(len(entradas))]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join(timeout=10)
+    assert not any(hilo.is_alive() for hilo in hilos), 'un llamador quedó esperando'
+    return salidas
+
+
+class _FuncionLote:
+    """Duplica cada valor; falla el lote completo si contiene un negativo."""
+
+    def __init__(self, demora_seg: float = 0.0):
+        self.demora_seg = demora_seg
+        self.lotes = []
+        self._lock = threading.Lock()
+
+    def __call__(self, filas):
+        with self._lock:
+            self.lotes.append(len(filas))
+        time.sleep(self.demora_seg)
+        if any(fila[0] < 0 for fila in filas):
+            raise ValueError('fila inválida')
+        return [fila[0] * 2 for fila in filas]
+
+
+def test_llamadas_concurrentes_se_evaluan_en_un_lote():
+    funcion = _FuncionLote()
+    coalescedor = CoalescedorPredicciones(funcion, ventana_ms=100, max_lote=32)
+    salidas = _en_paralelo(coalescedor.predecir, [[i] for i in range(8)])
+    assert salidas == [i * 2 for i in range(8)]
+    assert sum(funcion.lotes) == 8
+    assert len(funcion.lotes) < 8
+    estadisticas = coalescedor.estadisticas()
+    assert estadisticas['solicitudes'] == 8 and estadisticas['pendientes'] == 0
+
+
+def test_lote_lleno_promueve_al_siguiente_lider():
+    funcion = _FuncionLote(demora_seg=0.02)
+    coalescedor = CoalescedorPredicciones(funcion, ventana_ms=50, max_lote=3)
+    salidas = _en_paralelo(coalescedor.predecir, [[i] for i in range(10)])
+    assert salidas == [i * 2 for i in range(10)]
+    assert max(funcion.lotes) <= 3
+    assert sum(funcion.lotes) == 10
+    assert coalescedor.estadisticas()['pendientes'] == 0
+
+
+def test_fallo_del_lote_solo_falla_la_fila_invalida():
+    funcion = _FuncionLote()
+    coalescedor = CoalescedorPredicciones(funcion, ventana_ms=100, max_lote=32)
+    entradas = [[i] for i in range(6)] + [[-1]]
+    salidas = _en_paralelo(coalescedor.predecir, entradas)
+    assert salidas[:6] == [i * 2 for i in range(6)]
+    assert isinstance(salidas[6], ValueError)
+    assert coalescedor.estadisticas()['reintentos_fila_por_fila'] >= 1
+
+
+def test_sin_ventana_no_agrupa():
+    funcion = _FuncionLote()
+    coalescedor = CoalescedorPredicciones(funcion, ventana_ms=0)
+    assert not coalescedor.habilitado
+    assert _en_paralelo(coalescedor.predecir, [[i] for i in range(4)]) == [0, 2, 4, 6]
+    assert funcion.lotes == [1, 1, 1, 1]
+
+
+@pytest.fixture
+def modelo_cargado(monkeypatch):
+    """Registro con un Random Forest pequeño y sin caché de predicciones."""
+    X, y = make_classification(n_samples=300, n_features=13, random_state=3)
+    rf = RandomForestClassifier(n_estimators=15, max_depth=6, random_state=0).fit(X, y)
+    registro = RegistroModelos()
+    registro._publicar(PaqueteModelos(version=1, rf=rf, motor_rf=BosqueCompilado.desde_sklearn(rf)))
+    monkeypatch.setattr(model_loader, '_registro', registro)
+    monkeypatch.setattr(model_loader, '_cache', CachePredicciones(tamano=0))
+    return np.round(X[:24], 3).tolist()
+
+
+def test_predecir_riesgo_agrupado_igual_que_sin_agrupar(modelo_cargado, monkeypatch):
+    monkeypatch.setattr(model_loader, '_coalescedor', CoalescedorPredicciones(model_loader.predecir_riesgo_lote, 0))
+    esperado = [model_loader.predecir_riesgo(parametros) for parametros in modelo_cargado]
+
+    monkeypatch.setenv('PREDICCION_LOTE_VENTANA_MS', '50')
+    monkeypatch.setenv('PREDICCION_LOTE_MAX', '8')
+    coalescedor = crear_desde_entorno(model_loader.predecir_riesgo_lote)
+    monkeypatch.setattr(model_loader, '_coalescedor', coalescedor)
+    assert _en_paralelo(model_loader.predecir_riesgo, modelo_cargado) == esperado
+    assert coalescedor.estadisticas()['lotes'] < len(modelo_cargado)
+
+
+def test_predecir_riesgo_fila_invalida_no_falla_al_resto(modelo_cargado, monkeypatch):
+    monkeypatch.setenv('PREDICCION_LOTE_VENTANA_MS', '100')
+    monkeypatch.setattr(model_loader, '_coalescedor', crear_desde_entorno(model_loader.predecir_riesgo_lote))
+    esperado = model_loader.predecir_riesgo_lote(modelo_cargado[:6])
+    salidas = _en_paralelo(model_loader.predecir_riesgo, modelo_cargado[:6] + [[1.0] * 12])
+    assert salidas[:6] == esperado
+    assert isinstance(salidas[6], ValueError)
@@ -0,0 +1,82 @@
+"""Snapshot del directorio: verificación de versión, TTL, invalidación y ETag (clave)."""
+import pytest
+from sqlalchemy import select
+
+from database.models import Medico, Usuario
+from repositories import directorio_medicos
+from repositories.medico_repo import obtener_version_directorio
+from services import auth_service
+
+
+@pytest.fixture
+def base(directorio_en_memoria):
+    return directorio_en_memoria
+
+
+def test_construye_una_vez_mientras_la_version_no_cambia(base):
+    primero = directorio_medicos.obtener_snapshot()
+    assert [m['id'] for m in primero.cardiologos] == [1, 2]
+    assert directorio_medicos.obtener_snapshot() is primero
+    assert directorio_medicos.estadisticas_directorio()['reconstrucciones'] == 1
+
+
+def test_no_verifica_antes_de_directorio_verificar_seg(base, monkeypatch):
+    monkeypatch.setattr(directorio_medicos, 'DIRECTORIO_VERIFICAR_SEG', 60)
+    directorio_medicos.obtener_snapshot()
+    lecturas = len(base.lecturas)
+    base.version = 2
+    directorio_medicos.obtener_snapshot()
+    assert len(base.lecturas) == lecturas
+
+
+def test_version_nueva_reconstruye_y_cambia_la_clave(base):
+    clave = directorio_medicos.version_directorio()
+    base.medicos[1].calificacion = 5.0
+    base.version = 2
+    directorio = directorio_medicos.obtener_snapshot()
+    assert [m['id'] for m in directorio.cardiologos] == [2, 1]
+    assert directorio_medicos.version_directorio() != clave
+
+
+def test_cambio_manual_sin_version_se_ve_al_vencer_el_ttl(base, monkeypatch):
+    clave = directorio_medicos.version_directorio()
+    base.medicos[0].email = 'ana@example.com'
+    assert directorio_medicos.version_directorio() == clave
+    monkeypatch.setattr(directorio_medicos, 'DIRECTORIO_TTL_SEG', -1)
+    nueva = directorio_medicos.version_directorio()
+    # Misma versión, otro contenido: el ETag no puede repetirse
+    assert nueva.split('.')[0] == clave.split('.')[0]
+    assert nueva != clave
+    assert directorio_medicos.obtener_snapshot().por_id[1]['email'] == 'ana@example.com'
+
+
+def test_invalidar_reconstruye_desde_la_primaria(base):
+    directorio_medicos.obtener_snapshot()
+    base.lecturas.clear()
+    base.medicos[0].telefono = '999000111'
+    directorio_medicos.invalidar_directorio()
+    directorio = directorio_medicos.obtener_snapshot()
+    assert base.lecturas and all(base.lecturas)
+    assert directorio.por_id[1]['telefono'] == '999000111'
+    base.lecturas.clear()
+    directorio_medicos.obtener_snapshot()
+    assert base.lecturas == [False]
+
+
+@pytest.mark.parametrize('email_previo, cambia_version', [(None, True), ('consultorio@example.com', False)])
+def test_registrar_medico_actualiza_el_directorio(sesion_postgres, monkeypatch, email_previo, cambia_version):
+    invalidaciones = []
+    monkeypatch.setattr(auth_service, 'obtener_sesion', lambda: sesion_postgres)
+    monkeypatch.setattr(auth_service, 'invalidar_directorio', lambda: invalidaciones.append(True))
+    medico = Medico(nombre='Dra. Prueba Registro', especialidad='Cardiología', email=email_previo)
+    sesion_postgres.add(medico)
+    sesion_postgres.commit()
+    version = obtener_version_directorio(sesion_postgres)
+
+    auth_service.registrar_medico('prueba.registro@example.com', 'clave-segura-123', medico.id)
+
+    sesion_postgres.expire_all()
+    assert sesion_postgres.get(Medico, medico.id).email == (email_previo or 'prueba.registro@example.com')
+    assert sesion_postgres.scalar(select(Usuario.medico_id).where(Usuario.email == 'prueba.registro@example.com')) == medico.id
+    assert (obtener_version_directorio(sesion_postgres) > version) == cambia_version
+    assert bool(invalidaciones) == cambia_version
@@ -0,0 +1,101 @@
+"""Búsqueda por anillos de celdas de indice_geo contra un orden haversine por fuerza bruta."""
+import random
+
+import pytest
+
+from database.models import Medico
+from repositories import directorio_medicos, indice_geo
+from repositories.indice_geo import GEO_CELDA_GRADOS, IndiceGeo, buscar_cercanos, distancia_km
+from utils.especialidades import etiquetas_especialidad
+
+ESPECIALIDADES = ['Cardiología', 'Cardiólogo', 'Pediatría']
+
+
+def _cerca_de_borde(azar: random.Random, valor: float, celda: float) -> float:
+    """Lleva el valor a un borde de celda, a veces justo de un lado y a veces del otro."""
+    borde = round(valor / celda) * celda
+    return borde + azar.choice([-1, 1]) * azar.uniform(0, 1e-6)
+
+
+def _puntos(azar: random.Random, n: int, lat0: float, lng0: float, extension: float, celda: float) -> list[tuple]:
+    puntos = []
+    for _ in range(n):
+        lat = lat0 + azar.uniform(-extension, extension)
+        lng = lng0 + azar.uniform(-extension, extension)
+        if azar.random() < 0.4:
+            lat = _cerca_de_borde(azar, lat, celda)
+        if azar.random() < 0.4:
+            lng = _cerca_de_borde(azar, lng, celda)
+        puntos.append((lat, lng))
+    return puntos
+
+
+def _fuerza_bruta(medicos: list, lat: float, lng: float, k: int, radio_km: float) -> list[tuple]:
+    distancias = sorted(
+        (distancia_km(lat, lng, m.latitud, m.longitud), m.id)
+        for m in medicos
+        if m.latitud is not None and 'cardiologia' in m.especialidad_tags
+    )
+    return [(d, medico_id) for d, medico_id in distancias if d <= radio_km][:k]
+
+
+def _directorio(azar: random.Random, lat0: float, lng0: float, extension: float, celda: float) -> list:
+    medicos = []
+    for i, (lat, lng) in enumerate(_puntos(azar, 300, lat0, lng0, extension, celda), start=1):
+        sin_coordenadas = azar.random() < 0.05
+        medicos.append(Medico(
+            id=i, nombre=f'Dr. {i}', especialidad=azar.choice(ESPECIALIDADES), calificacion=4.0,
+            latitud=None if sin_coordenadas else lat, longitud=None if sin_coordenadas else lng,
+        ))
+    for medico in medicos:
+        medico.especialidad_tags = etiquetas_especialidad(medico.especialidad, None)
+    return medicos
+
+
+@pytest.fixture
+def indice(monkeypatch):
+    nuevo = IndiceGeo()
+    monkeypatch.setattr(indice_geo, '_indice', nuevo)
+    return nuevo
+
+
+@pytest.mark.parametrize('lat0, lng0, celda', [
+    (-12.05, -77.04, GEO_CELDA_GRADOS),     # Lima
+    (-12.05, -77.04, 0.01),                 # celdas chicas: muchos anillos
+    (62.0, 25.0, GEO_CELDA_GRADOS),         # latitud alta: celdas estrechas en longitud
+])
+def test_coincide_con_fuerza_bruta(directorio_en_memoria, indice, monkeypatch, lat0, lng0, celda):
+    monkeypatch.setattr(indice_geo, 'GEO_CELDA_GRADOS', celda)
+    azar = random.Random(f'{lat0}{lng0}{celda}')
+    directorio_en_memoria.medicos = _directorio(azar, lat0, lng0, 0.4, celda)
+    indice.sincronizar(directorio_medicos.obtener_snapshot())
+    assert indice.estadisticas()['con_coordenadas'] == sum(m.latitud is not None for m in directorio_en_memoria.medicos)
+
+    for lat, lng in _puntos(azar, 150, lat0, lng0, 0.5, celda):
+        k = azar.choice([1, 3, 10, 50])
+        radio_km = azar.choice([0.5, 3.0, 15.0, 100.0])
+        esperado = _fuerza_bruta(directorio_en_memoria.medicos, lat, lng, k, radio_km)
+        obtenido = indice.cercanos(lat, lng, k, radio_km, 'cardiologia')
+        assert [medico_id for _, medico_id in obtenido] == [medico_id for _, medico_id in esperado]
+        assert [d for d, _ in obtenido] == pytest.approx([d for d, _ in esperado])
+
+
+def test_sincronizacion_incremental_sigue_coincidiendo(directorio_en_memoria, indice):
+    azar = random.Random(7)
+    directorio_en_memoria.medicos = _directorio(azar, -12.05, -77.04, 0.3, GEO_CELDA_GRADOS)
+    buscar_cercanos(-12.05, -77.04, 1, 1.0, 'cardiologia')
+
+    # Se mueven unos médicos entre celdas, otros pierden coordenadas, y se da de baja uno
+    for medico in azar.sample(directorio_en_memoria.medicos, 30):
+        medico.latitud = _cerca_de_borde(azar, -12.05 + azar.uniform(-0.3, 0.3), GEO_CELDA_GRADOS)
+        medico.longitud = -77.04 + azar.uniform(-0.3, 0.3)
+    for medico in azar.sample(directorio_en_memoria.medicos, 5):
+        medico.latitud = medico.longitud = None
+    directorio_en_memoria.medicos.pop()
+    directorio_en_memoria.version += 1
+
+    for lat, lng in _puntos(azar, 50, -12.05, -77.04, 0.35, GEO_CELDA_GRADOS):
+        resultado = buscar_cercanos(lat, lng, 10, 20.0, 'cardiologia')
+        esperado = _fuerza_bruta(directorio_en_memoria.medicos, lat, lng, 10, 20.0)
+        assert [m['id'] for m in resultado] == [medico_id for _, medico_id in esperado]
+    assert indice.sincronizaciones == 2
@@ -0,0 +1,26 @@
+"""Importancia de variables con el arranque rápido (feature_names.pkl aún pendiente)."""
+import numpy as np
+
+from ml import model_loader
+from ml.registro_modelos import PaqueteModelos, RegistroModelos
+
+IMPORTANCIAS = np.array([0.1, 0.5, 0.4])
+
+
+def _publicar(monkeypatch, **campos) -> None:
+    registro = RegistroModelos()
+    registro._publicar(PaqueteModelos(version=1, importancias=IMPORTANCIAS, **campos))
+    monkeypatch.setattr(model_loader, '_registro', registro)
+
+
+def test_sin_feature_names_retorna_lista_vacia(monkeypatch):
+    _publicar(monkeypatch, pendientes=('feature_names',))
+    assert model_loader.obtener_feature_importances() == []
+
+
+def test_con_feature_names_usa_etiquetas_en_espanol(monkeypatch):
+    _publicar(monkeypatch, feature_names=['age', 'chol', 'Otra'])
+    assert model_loader.obtener_feature_importances(limite=2) == [
+        {'nombre': 'Colesterol', 'importancia': 0.5},
+        {'nombre': 'Otra', 'importancia': 0.4},
+    ]
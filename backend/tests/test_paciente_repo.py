@@ -0,0 +1,75 @@
+"""Upsert de pacientes por DNI con la evaluación en la misma sentencia (requiere PostgreSQL)."""
+from datetime import date
+
+import pytest
+from sqlalchemy import select
+
+from database.models import Evaluacion, Paciente
+from repositories.paciente_repo import guardar_evaluacion_paciente, guardar_evaluaciones_con_pacientes
+
+PARAMETROS = [63, 1, 3, 145, 233.0, 1, 0, 150, 0, 2.3, 0, 0, 1]
+
+
+def _datos(dni: str, nombre: str, historia: str) -> dict:
+    return {
+        'apellidos_nombre': nombre, 'historia_clinica': historia, 'dni': dni,
+        'fecha_nacimiento': date(1960, 5, 1), 'telefono': '999888777', 'direccion': 'Av. Arequipa 100',
+        'provincia': 'Lima', 'ciudad': 'Lima', 'distrito': 'Lince',
+    }
+
+
+@pytest.fixture
+def existente(sesion_postgres) -> Paciente:
+    paciente = Paciente(**_datos('40000001', 'Paciente Original', 'HC-0001'))
+    sesion_postgres.add(paciente)
+    sesion_postgres.commit()
+    return paciente
+
+
+def _evaluaciones(db, paciente_id: int) -> list[Evaluacion]:
+    return db.scalars(select(Evaluacion).where(Evaluacion.paciente_id == paciente_id)).all()
+
+
+def test_paciente_existente_no_se_modifica(sesion_postgres, existente):
+    datos = _datos('40000001', 'Nombre Distinto', 'HC-0001')
+    datos['telefono'] = '111111111'
+    paciente_id = guardar_evaluacion_paciente(sesion_postgres, datos, PARAMETROS, 1)
+
+    assert paciente_id == existente.id
+    sesion_postgres.expire_all()
+    fila = sesion_postgres.get(Paciente, existente.id)
+    assert (fila.apellidos_nombre, fila.telefono) == ('Paciente Original', '999888777')
+    evaluaciones = _evaluaciones(sesion_postgres, existente.id)
+    assert len(evaluaciones) == 1
+    assert evaluaciones[0].resultado_prediccion == 1 and evaluaciones[0].colesterol == 233.0
+
+
+def test_paciente_nuevo_se_crea_y_se_vincula(sesion_postgres):
+    paciente_id = guardar_evaluacion_paciente(sesion_postgres, _datos('40000002', 'Nuevo', 'HC-0002'), PARAMETROS, 0)
+    paciente = sesion_postgres.get(Paciente, paciente_id)
+    assert paciente.dni == '40000002'
+    assert len(_evaluaciones(sesion_postgres, paciente_id)) == 1
+
+
+def test_lote_con_existente_nuevo_y_anonimo(sesion_postgres, existente):
+    items = [
+        (_datos('40000001', 'Otro Nombre', 'HC-0001'), PARAMETROS, 1),
+        (_datos('40000003', 'Nuevo', 'HC-0003'), PARAMETROS, 0),
+        (None, PARAMETROS, 0),
+        (_datos('40000001', 'Otro Más', 'HC-0001'), PARAMETROS, 0),
+    ]
+    ids = guardar_evaluaciones_con_pacientes(sesion_postgres, items)
+
+    assert ids[0] == ids[3] == existente.id
+    assert ids[1] not in (None, existente.id)
+    assert ids[2] is None
+    sesion_postgres.expire_all()
+    assert sesion_postgres.get(Paciente, existente.id).apellidos_nombre == 'Paciente Original'
+    assert len(_evaluaciones(sesion_postgres, existente.id)) == 2
+    assert len(_evaluaciones(sesion_postgres, ids[1])) == 1
+
+
+def test_historia_clinica_de_otro_dni_es_error_de_datos(sesion_postgres, existente):
+    with pytest.raises(ValueError, match='historia clínica'):
+        guardar_evaluacion_paciente(sesion_postgres, _datos('40000009', 'Otro', 'HC-0001'), PARAMETROS, 0)
+    assert len(_evaluaciones(sesion_postgres, existente.id)) == 0
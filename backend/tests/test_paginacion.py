@@ -0,0 +1,94 @@
+"""Paginación por cursor de /api/medicos/todos."""
+import base64
+import json
+
+import pytest
+
+from database.models import Medico
+from services.medico_service import obtener_todos_medicos
+from utils.paginacion import codificar_cursor, decodificar_cursor
+
+
+@pytest.fixture
+def cardiologos(directorio_en_memoria):
+    """Nueve cardiólogos con empates de calificación y dos sin calificación."""
+    calificaciones = [4.8, 4.5, 4.5, 4.5, 4.0, None, 3.9, None, 4.8]
+    directorio_en_memoria.medicos = [
+        Medico(id=10 + i, nombre=f'Dr. Cardiólogo {i}', especialidad='Cardiología', calificacion=c)
+        for i, c in enumerate(calificaciones)
+    ] + [Medico(id=99, nombre='Dra. Pediatra', especialidad='Pediatría', calificacion=5.0)]
+    return directorio_en_memoria
+
+
+def _recorrer(per_page: int) -> list[dict]:
+    paginas = []
+    cursor = ''
+    while cursor is not None:
+        pagina = obtener_todos_medicos(per_page=per_page, cursor=cursor)
+        paginas.append(pagina)
+        cursor = pagina['next_cursor']
+        assert len(paginas) < 50
+    return paginas
+
+
+def _cursor_crudo(valor) -> str:
+    return base64.urlsafe_b64encode(json.dumps(valor).encode()).decode().rstrip('=')
+
+
+@pytest.mark.parametrize('clave', [(4.5, 12), (None, 7), (5, 1)])
+def test_cursor_ida_y_vuelta(clave):
+    cursor = codificar_cursor(clave)
+    assert '=' not in cursor
+    assert decodificar_cursor(cursor, 2) == clave
+
+
+@pytest.mark.parametrize('per_page', [1, 2, 3, 4, 9, 50])
+def test_recorrido_con_cursor_igual_al_orden_completo(cardiologos, per_page):
+    paginas = _recorrer(per_page)
+    ids = [m['id'] for pagina in paginas for m in pagina['medicos']]
+    esperado = [m['id'] for m in obtener_todos_medicos(per_page=1000)['medicos']]
+    assert ids == esperado
+    assert ids == [10, 18, 11, 12, 13, 14, 16, 15, 17]
+    # Sin página final vacía, aunque el total sea múltiplo de per_page
+    assert all(pagina['medicos'] for pagina in paginas)
+    assert paginas[-1]['next_cursor'] is None
+    assert all(pagina['total'] == 9 for pagina in paginas)
+
+
+def test_cursor_coincide_con_page(cardiologos):
+    segunda_por_cursor = obtener_todos_medicos(per_page=3, cursor=obtener_todos_medicos(per_page=3, cursor='')['next_cursor'])
+    assert segunda_por_cursor['medicos'] == obtener_todos_medicos(page=2, per_page=3)['medicos']
+    assert obtener_todos_medicos(page=3, per_page=3)['next_cursor'] is None
+    assert obtener_todos_medicos(page=4, per_page=3)['medicos'] == []
+
+
+def test_cursor_no_repite_tras_un_alta(cardiologos):
+    primera = obtener_todos_medicos(per_page=3, cursor='')
+    # Un médico nuevo por delante del cursor no desplaza la página siguiente
+    cardiologos.medicos.append(Medico(id=50, nombre='Dr. Nuevo', especialidad='Cardiología', calificacion=4.9))
+    cardiologos.version += 1
+    segunda = obtener_todos_medicos(per_page=3, cursor=primera['next_cursor'])
+    assert [m['id'] for m in segunda['medicos']] == [12, 13, 14]
+
+
+@pytest.mark.parametrize('cursor', [
+    'no-es-base64!!', _cursor_crudo([4.5]), _cursor_crudo([4.5, 12, 1]), _cursor_crudo({'id': 12}),
+    _cursor_crudo(['4.5', 12]), _cursor_crudo([4.5, '12']), _cursor_crudo([4.5, True]),
+    _cursor_crudo([True, 12]), _cursor_crudo([4.5, 12.0]), 'W3siYSI6MX0', '%%%',
+])
+def test_cursor_alterado_responde_400(cardiologos, cliente_api, cursor):
+    respuesta = cliente_api.get('/api/medicos/todos', query_string={'cursor': cursor, 'per_page': 3})
+    assert respuesta.status_code == 400
+    assert respuesta.get_json() == {'error': 'cursor inválido'}
+
+
+def test_ultima_pagina_por_la_api(cardiologos, cliente_api):
+    cursor = ''
+    ids = []
+    while cursor is not None:
+        respuesta = cliente_api.get('/api/medicos/todos', query_string={'cursor': cursor, 'per_page': 4})
+        assert respuesta.status_code == 200
+        datos = respuesta.get_json()
+        ids += [m['id'] for m in datos['medicos']]
+        cursor = datos['next_cursor']
+    assert ids == [10, 18, 11, 12, 13, 14, 16, 15, 17]
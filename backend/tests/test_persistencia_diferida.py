@@ -0,0 +1,150 @@
+"""Cola de persistencia diferida: políticas con la cola llena, reintentos, datos inválidos y cierre."""
+import threading
+import time
+
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from services.persistencia_diferida import ColaPersistencia
+
+
+class _Escritor:
+    """
+    Sustituye a guardar_evaluaciones_con_pacientes: registra lo escrito y retorna un id por item.
+    Con `bloqueado` sin activar, el hilo escritor espera (así la cola se llena a voluntad).
+    """
+
+    def __init__(self, fallos_conexion: int = 0, invalidos=()):
+        self.escritos = []
+        self.llamadas = 0
+        self.fallos_conexion = fallos_conexion
+        self.invalidos = set(invalidos)
+        self.liberado = threading.Event()
+        self.liberado.set()
+        self._lock = threading.Lock()
+
+    def __call__(self, items):
+        if threading.current_thread().name == 'cardionet-persistencia':
+            assert self.liberado.wait(5)
+        with self._lock:
+            self.llamadas += 1
+            if self.fallos_conexion:
+                self.fallos_conexion -= 1
+                raise OperationalError('INSERT', {}, Exception('conexión rechazada'))
+            if any(item[2] in self.invalidos for item in items):
+                raise IntegrityError('INSERT', {}, Exception('violación de restricción'))
+            self.escritos.extend(item[2] for item in items)
+            return [100 + item[2] for item in items]
+
+
+def _cola(escritor, **opciones) -> ColaPersistencia:
+    opciones.setdefault('reintento_seg', 0.01)
+    return ColaPersistencia(escritor, **opciones)
+
+
+def _item(n: int) -> tuple:
+    # (paciente_data, parametros, prediccion): la "predicción" identifica el item en las pruebas
+    return ({'dni': f'{n:08d}'}, [0] * 13, n)
+
+
+def _llenar(cola: ColaPersistencia, escritor: _Escritor, capacidad: int) -> None:
+    """Bloquea al escritor con un item tomado y deja la cola con `capacidad` items."""
+    escritor.liberado.clear()
+    cola.encolar(*_item(0))
+    limite = time.monotonic() + 2
+    while cola.estadisticas()['profundidad'] and time.monotonic() < limite:
+        time.sleep(0.005)
+    for n in range(1, capacidad + 1):
+        assert cola.encolar(*_item(n)) is None
+
+
+def test_deshabilitada_escribe_en_la_peticion():
+    escritor = _Escritor()
+    cola = _cola(escritor, habilitada=False)
+    assert cola.encolar(*_item(7)) == 107
+    assert escritor.escritos == [7]
+
+
+def test_encola_y_escribe_en_segundo_plano():
+    escritor = _Escritor()
+    cola = _cola(escritor)
+    assert all(cola.encolar(*_item(n)) is None for n in range(20))
+    assert cola.vaciar(5)
+    assert sorted(escritor.escritos) == list(range(20))
+    estadisticas = cola.estadisticas()
+    assert estadisticas['escritas'] == 20 and estadisticas['en_vuelo'] == 0
+
+
+def test_cola_llena_sincrono_escribe_en_la_peticion():
+    escritor = _Escritor()
+    cola = _cola(escritor, capacidad=2, politica='sincrono')
+    _llenar(cola, escritor, 2)
+    assert cola.encolar(*_item(9)) == 109
+    assert escritor.escritos == [9]
+    escritor.liberado.set()
+    assert cola.vaciar(5)
+    assert sorted(escritor.escritos) == [0, 1, 2, 9]
+    assert cola.estadisticas()['sincronas'] == 1
+
+
+def test_cola_llena_bloquear_espera_y_luego_escribe():
+    escritor = _Escritor()
+    cola = _cola(escritor, capacidad=1, politica='bloquear', bloqueo_seg=0.1)
+    _llenar(cola, escritor, 1)
+    inicio = time.monotonic()
+    assert cola.encolar(*_item(9)) == 109
+    assert time.monotonic() - inicio >= 0.1
+    escritor.liberado.set()
+    assert cola.vaciar(5)
+    assert sorted(escritor.escritos) == [0, 1, 9]
+
+
+def test_cola_llena_descartar_no_escribe():
+    escritor = _Escritor()
+    cola = _cola(escritor, capacidad=1, politica='descartar')
+    _llenar(cola, escritor, 1)
+    assert cola.encolar(*_item(9)) is None
+    escritor.liberado.set()
+    assert cola.vaciar(5)
+    assert sorted(escritor.escritos) == [0, 1]
+    assert cola.estadisticas()['descartadas'] == 1
+
+
+def test_base_caida_reintenta_sin_perder_evaluaciones():
+    escritor = _Escritor(fallos_conexion=3)
+    cola = _cola(escritor, reintento_max_seg=0.05)
+    for n in range(5):
+        cola.encolar(*_item(n))
+    assert cola.vaciar(5)
+    assert sorted(escritor.escritos) == list(range(5))
+    estadisticas = cola.estadisticas()
+    assert estadisticas['reintentos'] == 3
+    assert estadisticas['rechazadas'] == 0
+    assert estadisticas['ultimo_error'] == 'OperationalError'
+
+
+def test_dato_invalido_solo_descarta_esa_evaluacion():
+    escritor = _Escritor(invalidos={3})
+    cola = _cola(escritor)
+    escritor.liberado.clear()
+    for n in range(6):
+        cola.encolar(*_item(n))
+    escritor.liberado.set()
+    assert cola.vaciar(5)
+    assert sorted(escritor.escritos) == [0, 1, 2, 4, 5]
+    estadisticas = cola.estadisticas()
+    assert estadisticas['rechazadas'] == 1
+    assert estadisticas['escritas'] == 5
+    assert estadisticas['reintentos'] == 0
+
+
+def test_detener_escribe_lo_pendiente():
+    escritor = _Escritor()
+    cola = _cola(escritor)
+    escritor.liberado.clear()
+    for n in range(10):
+        cola.encolar(*_item(n))
+    threading.Timer(0.05, escritor.liberado.set).start()
+    assert cola.detener(5)
+    assert sorted(escritor.escritos) == list(range(10))
+    # Ya detenida: las evaluaciones nuevas se escriben en la petición
+    assert cola.encolar(*_item(10)) == 110
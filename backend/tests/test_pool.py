@@ -0,0 +1,31 @@
+"""PoolMedido depende de QueuePool._do_get: esta prueba falla si una versión nueva de SQLAlchemy lo cambia."""
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as TimeoutPool
+
+from database import config
+from database.config import PoolMedido, _MetricasPool
+
+
+def test_cada_checkout_se_mide(monkeypatch):
+    metricas = _MetricasPool()
+    monkeypatch.setattr(config, 'metricas_pool', metricas)
+    engine = create_engine('sqlite://', poolclass=PoolMedido, pool_size=1, max_overflow=0)
+    for _ in range(3):
+        with engine.connect() as conexion:
+            assert conexion.execute(text('SELECT 1')).scalar() == 1
+    engine.dispose()
+    resumen = metricas.resumen()
+    assert resumen['checkouts'] == 3
+    assert resumen['timeouts'] == 0
+
+
+def test_pool_agotado_cuenta_timeout(monkeypatch):
+    metricas = _MetricasPool()
+    monkeypatch.setattr(config, 'metricas_pool', metricas)
+    engine = create_engine('sqlite://', poolclass=PoolMedido, pool_size=1, max_overflow=0, pool_timeout=0.01)
+    with engine.connect():
+        with pytest.raises(TimeoutPool):
+            engine.connect()
+    engine.dispose()
+    assert metricas.resumen()['timeouts'] == 1
@@ -0,0 +1,110 @@
+"""ETag, 304 y compresión de respuesta_versionada."""
+import gzip
+
+import pytest
+from flask import Flask, jsonify
+
+from utils import respuestas_http
+from utils.respuestas_http import COMPRESION_MIN_BYTES, respuesta_versionada
+
+GZIP = {'Accept-Encoding': 'gzip'}
+
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setattr(respuestas_http, '_cache', respuestas_http._CacheRespuestas(16))
+    estado = {'version': 1, 'llamadas': 0}
+    app = Flask(__name__)
+
+    def contar(cuerpo):
+        estado['llamadas'] += 1
+        return jsonify(cuerpo)
+
+    @app.route('/grande')
+    @respuesta_versionada(lambda: estado['version'])
+    def grande():
+        return contar({'datos': ['cardiologia'] * COMPRESION_MIN_BYTES})
+
+    @app.route('/chica')
+    @respuesta_versionada(lambda: estado['version'])
+    def chica():
+        return contar({'status': 'ok'})
+
+    @app.route('/privada')
+    @respuesta_versionada(lambda: estado['version'], publica=False, clave=lambda: 'usuario-7')
+    def privada():
+        return contar({'perfil': 'corto'})
+
+    app.estado = estado
+    return app
+
+
+def test_cuerpo_grande_se_comprime_y_el_etag_lo_indica(app):
+    respuesta = app.test_client().get('/grande', headers=GZIP)
+    assert respuesta.headers['Content-Encoding'] == 'gzip'
+    assert respuesta.headers['ETag'].endswith('-gzip"')
+    assert 'Accept-Encoding' in respuesta.headers['Vary']
+    assert len(gzip.decompress(respuesta.data)) > COMPRESION_MIN_BYTES
+
+
+@pytest.mark.parametrize('ruta', ['/chica', '/privada'])
+def test_cuerpo_chico_no_se_comprime_ni_lleva_sufijo_gzip(app, ruta):
+    respuesta = app.test_client().get(ruta, headers=GZIP)
+    assert 'Content-Encoding' not in respuesta.headers
+    assert respuesta.headers['ETag'].endswith('-identity"')
+    assert respuesta.get_json()
+
+
+@pytest.mark.parametrize('ruta', ['/grande', '/chica', '/privada'])
+def test_if_none_match_vigente_responde_304(app, ruta):
+    cliente = app.test_client()
+    primera = cliente.get(ruta, headers=GZIP)
+    segunda = cliente.get(ruta, headers={**GZIP, 'If-None-Match': primera.headers['ETag']})
+    assert segunda.status_code == 304
+    assert segunda.data == b''
+    assert segunda.headers['ETag'] == primera.headers['ETag']
+    assert 'Accept-Encoding' in segunda.headers['Vary']
+
+
+def test_304_comprimido_sin_ejecutar_la_vista(app):
+    cliente = app.test_client()
+    etag = cliente.get('/grande', headers=GZIP).headers['ETag']
+    app.estado['llamadas'] = 0
+    respuestas_http._cache._datos.clear()
+    assert cliente.get('/grande', headers={**GZIP, 'If-None-Match': etag}).status_code == 304
+    assert app.estado['llamadas'] == 0
+
+
+def test_etag_distinto_por_codificacion_y_por_version(app):
+    cliente = app.test_client()
+    comprimida = cliente.get('/grande', headers=GZIP)
+    sin_comprimir = cliente.get('/grande', headers={'Accept-Encoding': 'identity'})
+    assert 'Content-Encoding' not in sin_comprimir.headers
+    assert sin_comprimir.headers['ETag'] != comprimida.headers['ETag']
+    # Un ETag gzip no valida la representación sin comprimir
+    cruzada = cliente.get('/grande', headers={'Accept-Encoding': 'identity',
+                                               'If-None-Match': comprimida.headers['ETag']})
+    assert cruzada.status_code == 200
+
+    app.estado['version'] = 2
+    nueva = cliente.get('/grande', headers={**GZIP, 'If-None-Match': comprimida.headers['ETag']})
+    assert nueva.status_code == 200
+    assert nueva.headers['ETag'] != comprimida.headers['ETag']
+
+
+def test_respuesta_privada_varia_por_authorization(app):
+    respuesta = app.test_client().get('/privada', headers=GZIP)
+    assert 'Authorization' in respuesta.headers['Vary']
+    assert respuesta.headers['Cache-Control'] == 'private, no-cache'
+
+
+def test_endpoints_del_directorio(directorio_en_memoria, cliente_api):
+    primera = cliente_api.get('/api/medicos/todos', headers=GZIP)
+    assert primera.status_code == 200
+    assert 'Accept-Encoding' in primera.headers['Vary']
+    condicional = {**GZIP, 'If-None-Match': primera.headers['ETag']}
+    assert cliente_api.get('/api/medicos/todos', headers=condicional).status_code == 304
+
+    directorio_en_memoria.medicos[0].telefono = '999000222'
+    directorio_en_memoria.version += 1
+    assert cliente_api.get('/api/medicos/todos', headers=condicional).status_code == 200
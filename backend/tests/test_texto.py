@@ -0,0 +1,38 @@
+"""Plegado de tildes compartido por etiquetas, nomenclátor y geocodificación."""
+import unicodedata
+
+import pytest
+
+from services.geocodificacion import normalizar_direccion
+from utils.distritos_lima import distrito_en_direccion
+from utils.especialidades import etiquetas_especialidad, normalizar_etiqueta
+from utils.texto import plegar
+
+
+def _nfd_sin_marcas(texto: str) -> str:
+    return ''.join(c for c in unicodedata.normalize('NFD', texto.lower()) if unicodedata.category(c) != 'Mn')
+
+
+@pytest.mark.parametrize('texto', ['Jesús María', 'BREÑA', 'Cardiología Pediátrica', 'Rímac', 'pingüino'])
+def test_plegar_equivale_a_nfd_sin_marcas(texto):
+    assert plegar(texto) == _nfd_sin_marcas(texto)
+
+
+def test_etiquetas_y_direcciones_pliegan_igual():
+    assert normalizar_etiqueta('  Cardiología   Isquémica ') == 'cardiologia isquemica'
+    assert etiquetas_especialidad('Cardióloga', 'Ecocardiografía; Arritmias') == [
+        'arritmias', 'cardiologa', 'cardiologia', 'ecocardiografia']
+    assert normalizar_direccion('Av. Jesús  María 12, ') == plegar('Av. Jesús María 12')
+
+
+@pytest.mark.parametrize('direccion, distrito', [
+    ('El Polo 789, Surco', 'surco'),
+    ('Av. Tomás Marsano 1, Santiago de Surco', 'santiago de surco'),
+    ('Jr. Huallaga 5, Cercado de Lima', 'cercado de lima'),
+    ('Av. Javier Prado 1, San Isidro, Lima', 'san isidro'),
+    ('Av. Colonial 5, Callao', 'callao'),
+    ('Calle Zapatero 5, Lince', 'lince'),
+    ('Sin distrito conocido', None),
+])
+def test_distrito_mas_a_la_derecha(direccion, distrito):
+    assert distrito_en_direccion(direccion) == distrito
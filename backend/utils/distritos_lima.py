@@ -0,0 +1,133 @@
+"""
+Nomenclátor de distritos y zonas de Lima / Callao con coordenadas aproximadas.
+
+Los nombres, en minúsculas y sin tildes (las variantes con tilde se pliegan a la misma forma),
+se compilan en un autómata Aho-Corasick: una dirección se recorre una sola vez, sin importar
+cuántos distritos haya. Solo cuentan coincidencias de palabra completa ("ate" no coincide dentro
+de "Zapatero"). Entre coincidencias que se solapan gana la más larga ("cercado de lima" antes
+que "lima", "santiago de surco" antes que "surco"); entre las demás, la que aparece más a la
+derecha, porque en las direcciones el distrito va al final ("El Polo 789, Surco" -> surco).
+"lima" y "callao" también son provincias ("..., San Isidro, Lima"): solo se usan si no hay otra.
+"""
+from collections import deque
+from functools import lru_cache
+
+from utils.texto import plegar
+
+DISTRITOS_LIMA: dict[str, tuple[float, float]] = {
+    "jesús maría": (-12.077, -77.051), "lince": (-12.084, -77.032),
+    "miraflores": (-12.121, -77.030), "san isidro": (-12.089, -77.050),
+    "surquillo": (-12.119, -77.029), "san borja": (-12.091, -77.001),
+    "la molina": (-12.071, -76.965), "santiago de surco": (-12.152, -76.990),
+    "surco": (-12.152, -76.990), "magdalena": (-12.095, -77.071),
+    "magdalena del mar": (-12.095, -77.071), "pueblo libre": (-12.072, -77.062),
+    "breña": (-12.056, -77.050), "la victoria": (-12.073, -77.029),
+    "jorge chávez": (-12.056, -77.050), "cercado de lima": (-12.046, -77.042),
+    "lima": (-12.046, -77.042), "callao": (-12.057, -77.118),
+    "bellavista": (-12.068, -77.121), "la perla": (-12.066, -77.111),
+    "carmen de la legua": (-12.051, -77.063), "san miguel": (-12.078, -77.085),
+    "los olivos": (-12.006, -77.073), "comas": (-11.943, -77.061),
+    "independencia": (-12.004, -77.038), "san juan de lurigancho": (-11.985, -77.008),
+    "ate": (-12.052, -76.919), "santa anita": (-12.046, -76.973),
+    "el agustino": (-12.050, -77.001), "la florida": (-12.118, -77.032),
+    "barranco": (-12.145, -77.022), "chorrillos": (-12.173, -77.007),
+    "villa el salvador": (-12.206, -76.981), "san juan de miraflores": (-12.162, -76.987),
+    "villa maría del triunfo": (-12.163, -76.964), "rímac": (-12.044, -77.033),
+    "san luis": (-12.080, -77.001), "limatambo": (-12.090, -77.042),
+    "monterrico": (-12.086, -76.976), "el polo": (-12.090, -76.975),
+    "barrios altos": (-12.045, -77.025), "lurigancho": (-11.985, -77.008),
+    "chaclacayo": (-11.987, -76.768),
+}
+
+_GENERICOS = frozenset({"lima", "callao"})
+
+
+def _elegir(coincidencias: list[tuple[int, int, str]]) -> str | None:
+    """(inicio, fin, patrón) -> patrón ganador según las reglas del módulo."""
+    def tapada(m) -> bool:
+        return any(o[1] - o[0] > m[1] - m[0] and o[0] <= m[1] and m[0] <= o[1] for o in coincidencias)
+
+    validas = [m for m in coincidencias if not tapada(m)]
+    candidatas = [m for m in validas if m[2] not in _GENERICOS] or validas
+    return max(candidatas)[2] if candidatas else None
+
+
+class Nomenclator:
+    """Autómata Aho-Corasick (transiciones completas) sobre los nombres plegados."""
+
+    def __init__(self, lugares: dict[str, tuple[float, float]]):
+        # Cada estado: transiciones, y (largo, nombre) de los patrones que terminan en él, del más largo al más corto
+        self._transiciones: list[dict[str, int]] = [{}]
+        self._salidas: list[tuple] = [()]
+        self.lugares: dict[str, tuple[float, float]] = {}
+        for nombre, coords in lugares.items():
+            patron = plegar(nombre)
+            if patron in self.lugares:
+                continue
+            self.lugares[patron] = coords
+            estado = 0
+            for c in patron:
+                siguiente = self._transiciones[estado].get(c)
+                if siguiente is None:
+                    siguiente = len(self._transiciones)
+                    self._transiciones.append({})
+                    self._salidas.append(())
+                    self._transiciones[estado][c] = siguiente
+                estado = siguiente
+            self._salidas[estado] = ((len(patron), patron),)
+        self._compilar()
+
+    def _compilar(self) -> None:
+        """Enlaces de falla por BFS; cada estado hereda las salidas y transiciones de su falla."""
+        hijos = [dict(t) for t in self._transiciones]
+        falla = [0] * len(hijos)
+        cola = deque(hijos[0].values())
+        while cola:
+            estado = cola.popleft()
+            for c, hijo in hijos[estado].items():
+                falla[hijo] = self._transiciones[falla[estado]].get(c, 0)
+                self._salidas[hijo] = tuple(sorted(self._salidas[hijo] + self._salidas[falla[hijo]], reverse=True))
+                cola.append(hijo)
+            # Transiciones que faltan: las del estado de falla (ya completo, está más cerca de la raíz)
+            for c, destino in self._transiciones[falla[estado]].items():
+                self._transiciones[estado].setdefault(c, destino)
+
+    def buscar(self, texto: str) -> str | None:
+        """Nombre plegado del lugar detectado en el texto, o None."""
+        if not texto:
+            return None
+        texto = plegar(texto)
+        transiciones, salidas = self._transiciones, self._salidas
+        coincidencias = []
+        estado = 0
+        for fin, c in enumerate(texto):
+            estado = transiciones[estado].get(c, 0)
+            if not salidas[estado]:
+                continue
+            if fin + 1 < len(texto) and texto[fin + 1].isalnum():
+                continue
+            # Del más largo al más corto: los más cortos que terminan aquí quedan tapados por él
+            for largo, patron in salidas[estado]:
+                inicio = fin - largo + 1
+                if inicio == 0 or not texto[inicio - 1].isalnum():
+                    coincidencias.append((inicio, fin, patron))
+                    break
+        return _elegir(coincidencias)
+
+    def coordenadas(self, texto: str) -> tuple[float | None, float | None]:
+        patron = self.buscar(texto)
+        return self.lugares[patron] if patron else (None, None)
+
+
+_nomenclator = Nomenclator(DISTRITOS_LIMA)
+
+
+def distrito_en_direccion(direccion: str) -> str | None:
+    """Distrito o zona detectado en la dirección, en minúsculas y sin tildes."""
+    return _nomenclator.buscar(direccion)
+
+
+@lru_cache(maxsize=8192)
+def coords_desde_direccion(direccion: str) -> tuple[float | None, float | None]:
+    """Coordenadas aproximadas del distrito detectado en la dirección (Lima / Callao)."""
+    return _nomenclator.coordenadas(direccion)
@@ -0,0 +1,34 @@
+"""Etiquetas normalizadas de especialidad (minúsculas, sin tildes) para búsquedas indexables."""
+import re
+
+from utils.texto import plegar
+
+# Etiqueta que marca a todo médico cuya especialidad contiene CARDIOLOG (cardiología, cardiólogo, ...)
+ETIQUETA_CARDIOLOGIA = 'cardiologia'
+
+_SEPARADORES = re.compile(r'\s*[,;/]\s*')
+
+
+def normalizar_etiqueta(texto: str | None) -> str:
+    """'Cardiología  Isquémica' -> 'cardiologia isquemica'."""
+    if not texto:
+        return ''
+    return ' '.join(plegar(texto).split())
+
+
+def etiquetas_especialidad(especialidad: str | None, subespecialidad: str | None) -> list[str]:
+    """
+    Etiquetas de un médico: la especialidad, cada subespecialidad separada por coma, punto y coma
+    o barra, y 'cardiologia' si la especialidad es de cardiología. Sin duplicados y ordenadas.
+    """
+    etiquetas = set()
+    especialidad_norm = normalizar_etiqueta(especialidad)
+    if especialidad_norm:
+        etiquetas.add(especialidad_norm)
+        if 'cardiolog' in especialidad_norm:
+            etiquetas.add(ETIQUETA_CARDIOLOGIA)
+    for parte in _SEPARADORES.split(subespecialidad or ''):
+        parte_norm = normalizar_etiqueta(parte)
+        if parte_norm:
+            etiquetas.add(parte_norm)
+    return sorted(etiquetas)
@@ -0,0 +1,88 @@
+"""
+Lectura por flujo de archivos grandes (volcados de scraping) con memoria acotada.
+
+iterar_arreglo_json recorre un arreglo JSON elemento por elemento leyendo bloques de
+tamano_bloque caracteres: en memoria solo queda el bloque actual y el elemento que se decodifica.
+huella resume una clave (nombre, dirección, ...) en 8 bytes para deduplicar con un set compacto.
+"""
+import hashlib
+import json
+
+_ESPACIOS = ' \t\n\r'
+_FIN_DE_VALOR = _ESPACIOS + ',]}'
+_SEPARADOR = '\x1f'
+
+
+def huella(*campos) -> bytes:
+    """Resumen de 8 bytes de los campos (None y '' cuentan igual)."""
+    texto = _SEPARADOR.join('' if c is None else str(c) for c in campos)
+    return hashlib.blake2b(texto.encode('utf-8'), digest_size=8).digest()
+
+
+class _Lector:
+    def __init__(self, archivo, tamano_bloque: int):
+        self.archivo = archivo
+        self.tamano_bloque = tamano_bloque
+        self.buffer = ''
+        self.pos = 0
+        self.fin = False
+
+    def leer_mas(self) -> bool:
+        """Descarta lo ya consumido y agrega un bloque. False al final del archivo."""
+        if self.fin:
+            return False
+        bloque = self.archivo.read(self.tamano_bloque)
+        if not bloque:
+            self.fin = True
+            return False
+        self.buffer = self.buffer[self.pos:] + bloque
+        self.pos = 0
+        return True
+
+    def caracter(self) -> str:
+        """Siguiente carácter que no es espacio, sin consumirlo ('' al final del archivo)."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _ESPACIOS:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.leer_mas():
+                return ''
+
+    def valor(self, decodificador: json.JSONDecoder):
+        self.caracter()
+        while True:
+            try:
+                valor, fin = decodificador.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                # Elemento incompleto: falta el resto en el próximo bloque
+                if not self.leer_mas():
+                    raise
+                continue
+            # Un número cortado por el bloque ("12" de "123", "-1" de "-1.5") también decodifica:
+            # solo se acepta si lo que sigue delimita el valor
+            delimitado = fin < len(self.buffer) and self.buffer[fin] in _FIN_DE_VALOR
+            if not delimitado and self.leer_mas():
+                continue
+            self.pos = fin
+            return valor
+
+
+def iterar_arreglo_json(archivo, tamano_bloque: int = 1 << 16):
+    """Genera los elementos de un arreglo JSON de nivel superior leído de archivo (modo texto)."""
+    lector = _Lector(archivo, tamano_bloque)
+    decodificador = json.JSONDecoder()
+    if lector.caracter() != '[':
+        raise ValueError('Se esperaba un arreglo JSON')
+    lector.pos += 1
+    if lector.caracter() == ']':
+        return
+    while True:
+        yield lector.valor(decodificador)
+        siguiente = lector.caracter()
+        if siguiente == ',':
+            lector.pos += 1
+        elif siguiente == ']':
+            return
+        else:
+            raise ValueError(f'JSON inválido: se esperaba "," o "]" y se encontró {siguiente!r}')
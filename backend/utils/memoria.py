@@ -0,0 +1,30 @@
+"""Medición de memoria del proceso actual (por worker)."""
+import os
+import resource
+
+
+def memoria_proceso() -> dict:
+    """
+    Retorna RSS, PSS y memoria compartida/privada en KB del proceso actual.
+    PSS reparte cada página compartida entre los procesos que la usan: sumar el PSS de
+    todos los workers da la memoria real consumida. Fuera de Linux solo se reporta el RSS máximo.
+    """
+    campos = {
+        'Rss': 'rss_kb',
+        'Pss': 'pss_kb',
+        'Shared_Clean': 'compartida_limpia_kb',
+        'Shared_Dirty': 'compartida_sucia_kb',
+        'Private_Clean': 'privada_limpia_kb',
+        'Private_Dirty': 'privada_sucia_kb',
+    }
+    resultado = {'pid': os.getpid()}
+    try:
+        with open('/proc/self/smaps_rollup', encoding='utf-8') as f:
+            for linea in f:
+                partes = linea.split()
+                clave = partes[0].rstrip(':') if partes else ''
+                if clave in campos:
+                    resultado[campos[clave]] = int(partes[1])
+    except OSError:
+        resultado['rss_max_kb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return resultado
@@ -0,0 +1,21 @@
+"""Cursores opacos para paginación por clave (keyset)."""
+import base64
+import json
+
+
+def codificar_cursor(clave: tuple) -> str:
+    """(4.5, 120) -> 'WzQuNSwxMjBd' (base64 url-safe de la clave en JSON, sin relleno)."""
+    crudo = json.dumps(list(clave), separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(crudo).decode().rstrip('=')
+
+
+def decodificar_cursor(cursor: str, campos: int) -> tuple:
+    """Inversa de codificar_cursor. Lanza ValueError si el cursor no es válido."""
+    try:
+        crudo = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        clave = json.loads(crudo)
+    except (ValueError, TypeError):
+        raise ValueError('cursor inválido')
+    if not isinstance(clave, list) or len(clave) != campos:
+        raise ValueError('cursor inválido')
+    return tuple(clave)
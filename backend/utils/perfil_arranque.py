@@ -0,0 +1,52 @@
+"""Perfilado del arranque: tiempo por etapa (importaciones, BD, blueprints, carga de modelos)."""
+import threading
+import time
+from contextlib import contextmanager
+
+_inicio = time.perf_counter()
+_ultima_marca = _inicio
+_etapas: list[dict] = []
+_lock = threading.Lock()
+
+
+def _registrar(nombre: str, milisegundos: float) -> None:
+    with _lock:
+        _etapas.append({
+            'etapa': nombre,
+            'ms': round(milisegundos, 1),
+            'desde_inicio_ms': round((time.perf_counter() - _inicio) * 1000, 1),
+            'hilo': threading.current_thread().name,
+        })
+
+
+def marcar(nombre: str) -> None:
+    """Registra el tiempo transcurrido desde la marca anterior (o desde que se importó este módulo)."""
+    global _ultima_marca
+    ahora = time.perf_counter()
+    _registrar(nombre, (ahora - _ultima_marca) * 1000)
+    _ultima_marca = ahora
+
+
+@contextmanager
+def etapa(nombre: str):
+    """Mide un bloque. Usable también desde hilos de carga en segundo plano."""
+    global _ultima_marca
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        _registrar(nombre, (time.perf_counter() - inicio) * 1000)
+        if threading.current_thread() is threading.main_thread():
+            _ultima_marca = time.perf_counter()
+
+
+def resumen() -> list[dict]:
+    with _lock:
+        return list(_etapas)
+
+
+def formatear() -> str:
+    lineas = ['[ARRANQUE] Tiempo por etapa:']
+    for e in resumen():
+        lineas.append(f"  {e['etapa']:<40} {e['ms']:>9.1f} ms  (t={e['desde_inicio_ms']:.0f} ms, {e['hilo']})")
+    return '\n'.join(lineas)
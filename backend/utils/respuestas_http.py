@@ -0,0 +1,171 @@
+"""
+Respuestas con ETag fuerte y compresión (gzip/brotli) para endpoints de solo lectura.
+
+El ETag se arma con la versión de los datos (p. ej. directorio_version), la URL y la
+codificación aplicada al cuerpo ('identity' si era menor que COMPRESION_MIN_BYTES aunque el
+cliente acepte gzip). Si un ETag comprimido coincide con If-None-Match se responde 304 sin
+ejecutar la vista: solo se envió si el cuerpo superaba el mínimo, y para la misma versión no
+cambia. Las respuestas públicas ya comprimidas se guardan por ETag base + codificación negociada
+(RESPUESTAS_CACHE_TAMANO entradas): mientras la versión no cambie, se sirven sin volver a
+serializar ni comprimir. brotli es opcional (paquete Brotli); sin él se negocia gzip.
+"""
+import gzip
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+from flask import Response, make_response, request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESION_MIN_BYTES = int(os.getenv('COMPRESION_MIN_BYTES', 1024))
+COMPRESION_NIVEL_GZIP = int(os.getenv('COMPRESION_NIVEL_GZIP', 6))
+COMPRESION_CALIDAD_BROTLI = int(os.getenv('COMPRESION_CALIDAD_BROTLI', 5))
+RESPUESTAS_CACHE_TAMANO = int(os.getenv('RESPUESTAS_CACHE_TAMANO', 128))
+
+
+class _CacheRespuestas:
+    """LRU de ETag negociado -> (cuerpo, mimetype, codificación aplicada) para respuestas públicas."""
+
+    def __init__(self, tamano: int):
+        self.tamano = tamano
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.no_modificados = 0
+        self.bytes_originales = 0
+        self.bytes_enviados = 0
+
+    def obtener(self, etag: str):
+        with self._lock:
+            valor = self._datos.get(etag)
+            if valor is None:
+                self.fallos += 1
+                return None
+            self._datos.move_to_end(etag)
+            self.aciertos += 1
+            return valor
+
+    def guardar(self, etag: str, valor: tuple) -> None:
+        if self.tamano <= 0:
+            return
+        with self._lock:
+            self._datos[etag] = valor
+            self._datos.move_to_end(etag)
+            while len(self._datos) > self.tamano:
+                self._datos.popitem(last=False)
+
+    def estadisticas(self) -> dict:
+        return {
+            'entradas': len(self._datos),
+            'tamano_max': self.tamano,
+            'aciertos': self.aciertos,
+            'fallos': self.fallos,
+            'no_modificados_304': self.no_modificados,
+            'bytes_sin_comprimir': self.bytes_originales,
+            'bytes_comprimidos': self.bytes_enviados,
+            'brotli_disponible': brotli is not None,
+        }
+
+
+_cache = _CacheRespuestas(RESPUESTAS_CACHE_TAMANO)
+
+
+def negociar_codificacion() -> str:
+    """'br', 'gzip' o 'identity' según Accept-Encoding (brotli solo si está instalado)."""
+    aceptadas = request.accept_encodings
+    if brotli is not None and aceptadas.quality('br') > 0:
+        return 'br'
+    if aceptadas.quality('gzip') > 0:
+        return 'gzip'
+    return 'identity'
+
+
+def comprimir(cuerpo: bytes, codificacion: str) -> tuple[bytes, str]:
+    """Retorna (cuerpo, codificación aplicada); por debajo de COMPRESION_MIN_BYTES no comprime."""
+    if codificacion == 'identity' or len(cuerpo) < COMPRESION_MIN_BYTES:
+        return cuerpo, 'identity'
+    if codificacion == 'br':
+        return brotli.compress(cuerpo, quality=COMPRESION_CALIDAD_BROTLI), 'br'
+    return gzip.compress(cuerpo, compresslevel=COMPRESION_NIVEL_GZIP, mtime=0), 'gzip'
+
+
+def _etag_base(version, extra: str) -> str:
+    url = hashlib.blake2b(f'{request.full_path}|{extra}'.encode(), digest_size=8).hexdigest()
+    return f'v{version}-{url}'
+
+
+def _cabeceras(respuesta: Response, etag: str, publica: bool) -> Response:
+    respuesta.set_etag(etag)
+    respuesta.headers['Cache-Control'] = 'no-cache' if publica else 'private, no-cache'
+    respuesta.vary.add('Accept-Encoding')
+    if not publica:
+        respuesta.vary.add('Authorization')
+    return respuesta
+
+
+def _no_modificado(etag: str, publica: bool) -> Response:
+    _cache.no_modificados += 1
+    return _cabeceras(Response(status=304), etag, publica)
+
+
+def _armar(cuerpo: bytes, mimetype: str, codificacion: str) -> Response:
+    respuesta = Response(cuerpo, mimetype=mimetype)
+    if codificacion != 'identity':
+        respuesta.headers['Content-Encoding'] = codificacion
+    return respuesta
+
+
+def respuesta_versionada(version, publica: bool = True, clave=None):
+    """
+    Decorador para vistas GET cuya respuesta depende solo de la URL y de version().
+    clave() agrega datos del usuario al ETag en respuestas privadas (que no se guardan en caché).
+    """
+    def decorador(vista):
+        @wraps(vista)
+        def envoltura(*args, **kwargs):
+            codificacion = negociar_codificacion()
+            try:
+                base = _etag_base(version(), clave() if clave else '')
+            except Exception:
+                # Sin versión (p. ej. base caída) la vista responde y maneja el error como siempre
+                return vista(*args, **kwargs)
+            negociado = f'{base}-{codificacion}'
+            if request.if_none_match.contains(negociado):
+                return _no_modificado(negociado, publica)
+            guardada = _cache.obtener(negociado) if publica else None
+            if guardada is not None:
+                etag = f'{base}-{guardada[2]}'
+                if request.if_none_match.contains(etag):
+                    return _no_modificado(etag, publica)
+                return _cabeceras(_armar(*guardada), etag, publica)
+
+            respuesta = make_response(vista(*args, **kwargs))
+            if respuesta.status_code != 200 or respuesta.is_streamed or 'Content-Encoding' in respuesta.headers:
+                return respuesta
+            original = respuesta.get_data()
+            cuerpo, aplicada = comprimir(original, codificacion)
+            _cache.bytes_originales += len(original)
+            _cache.bytes_enviados += len(cuerpo)
+            if publica:
+                _cache.guardar(negociado, (cuerpo, respuesta.mimetype, aplicada))
+            etag = f'{base}-{aplicada}'
+            # Cuerpo chico: el cliente tiene el ETag 'identity' y solo ahora se sabe que no cambió
+            if request.if_none_match.contains(etag):
+                return _no_modificado(etag, publica)
+            respuesta.set_data(cuerpo)
+            if aplicada != 'identity':
+                respuesta.headers['Content-Encoding'] = aplicada
+            return _cabeceras(respuesta, etag, publica)
+        return envoltura
+    return decorador
+
+
+def estadisticas_respuestas() -> dict:
+    return _cache.estadisticas()
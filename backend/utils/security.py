@@ -1,4 +1,5 @@
 """Utilidades de seguridad y configuración."""
+import hmac
 import os
 
 ESPECIALIDADES_VALIDAS = frozenset([
@@ -24,3 +25,12 @@ def sanitizar_especialidad(especialidad: str) -> str:
         return 'Cardiología General'
     esp = especialidad.strip()
     return esp if esp in ESPECIALIDADES_VALIDAS else 'Cardiología General'
+
+
+def token_admin_valido(token: str | None) -> bool:
+    """Compara el token recibido con ADMIN_TOKEN. Sin ADMIN_TOKEN configurado, las rutas de administración quedan deshabilitadas."""
+    esperado = os.getenv('ADMIN_TOKEN', '').strip()
+    if not esperado or not token:
+        return False
+    # En bytes: compare_digest con str lanza TypeError si hay caracteres no ASCII (cabeceras latin-1)
+    return hmac.compare_digest(token.strip().encode(), esperado.encode())
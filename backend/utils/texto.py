@@ -0,0 +1,16 @@
+"""Plegado de texto (minúsculas, sin tildes) compartido por scripts de importación y servicios."""
+import unicodedata
+
+# Letras latinas con diacríticos -> letra base y marcas combinantes sueltas -> nada. Equivale a
+# NFD + quitar la categoría Mn, pero en una sola pasada de str.translate
+_SIN_TILDES = {
+    cp: unicodedata.normalize('NFD', chr(cp))[0]
+    for cp in range(0xC0, 0x250)
+    if len(unicodedata.normalize('NFD', chr(cp))) > 1
+}
+_SIN_TILDES.update(dict.fromkeys(range(0x300, 0x370)))
+
+
+def plegar(texto: str) -> str:
+    """'Jesús María' -> 'jesus maria'; 'BREÑA' -> 'brena'."""
+    return texto.lower().translate(_SIN_TILDES)
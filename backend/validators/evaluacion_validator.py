@@ -63,3 +63,54 @@ def validar_datos_evaluacion(data: dict) -> None:
         datetime.strptime(str(data.get('fecha_nacimiento')), '%Y-%m-%d')
     except (TypeError, ValueError):
         raise ValueError('Formato de fecha inválido (use YYYY-MM-DD)')
+
+
+# Máximo de filas aceptadas por /api/evaluacion/lote
+MAX_FILAS_LOTE = 1000
+
+# Posiciones de los 13 parámetros del modelo que se almacenan como Float (el resto como Integer)
+_POSICIONES_FLOAT = (4, 9)
+
+# Rangos válidos por posición: (nombre, mínimo, máximo)
+_RANGOS_PARAMETROS = {
+    0: ('Edad', 1, 120),
+    3: ('Presión arterial', 50, 250),
+    4: ('Colesterol', 0, 600),
+    7: ('Frecuencia cardíaca', 40, 250),
+    9: ('Depresión ST', -5, 10),
+}
+
+
+def validar_parametros_modelo(parametros) -> list:
+    """
+    Valida y normaliza un vector de 13 parámetros del modelo.
+    Retorna la lista con los tipos usados al guardar la evaluación. Lanza ValueError si hay errores.
+    """
+    if not isinstance(parametros, list) or len(parametros) != 13:
+        raise ValueError('parametros debe ser una lista de 13 números')
+
+    normalizados = []
+    for i, valor in enumerate(parametros):
+        if valor is None or isinstance(valor, bool):
+            raise ValueError(f'Parámetro inválido en posición {i}')
+        try:
+            normalizados.append(float(valor) if i in _POSICIONES_FLOAT else int(valor))
+        except (TypeError, ValueError):
+            raise ValueError(f'Parámetro inválido en posición {i}')
+
+    for i, (nombre, minimo, maximo) in _RANGOS_PARAMETROS.items():
+        if normalizados[i] < minimo or normalizados[i] > maximo:
+            raise ValueError(f'{nombre} fuera de rango válido')
+    return normalizados
+
+
+def validar_lote(data: dict) -> list:
+    """Valida la estructura del lote. Retorna la lista de filas sin validar individualmente."""
+    if not data or not isinstance(data, dict):
+        raise ValueError('Datos inválidos')
+    filas = data.get('parametros')
+    if not isinstance(filas, list) or not filas:
+        raise ValueError('Se requiere parametros (lista de vectores de 13 valores)')
+    if len(filas) > MAX_FILAS_LOTE:
+        raise ValueError(f'Máximo {MAX_FILAS_LOTE} filas por lote')
+    return filas
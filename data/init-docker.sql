@@ -160,3 +160,20 @@ BEGIN
     ALTER TABLE evaluaciones ALTER COLUMN paciente_id DROP NOT NULL;
   END IF;
 END $$;
+
+-- Versión del directorio de médicos: los workers reconstruyen su snapshot en memoria cuando cambia
+CREATE TABLE IF NOT EXISTS directorio_version (
+    id INTEGER PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    actualizado_en TIMESTAMPTZ DEFAULT now()
+);
+INSERT INTO directorio_version (id, version) VALUES (1, 0) ON CONFLICT (id) DO NOTHING;
+
+-- Etiquetas de especialidad normalizadas (sin tildes, minúsculas) con índice GIN.
+-- El backend completa al arrancar las filas sin etiquetas (las semillas de arriba; database/migraciones.py).
+-- Para recalcularlas todas: python scripts/backfill_etiquetas_medicos.py
+ALTER TABLE medicos ADD COLUMN IF NOT EXISTS especialidad_tags VARCHAR(100)[];
+CREATE INDEX IF NOT EXISTS idx_medicos_especialidad_tags ON medicos USING GIN (especialidad_tags);
+
+-- Orden del directorio y paginación por cursor (calificación desc, nulos al final, id)
+CREATE INDEX IF NOT EXISTS idx_medicos_calificacion_id ON medicos (calificacion DESC NULLS LAST, id);
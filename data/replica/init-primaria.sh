@@ -0,0 +1,10 @@
+#!/bin/sh
+# Inicialización de la primaria del entorno de prueba con réplica (docker-compose.replica.yml):
+# crea el usuario de replicación y permite conexiones de replicación desde la red de Docker.
+set -e
+
+psql -v ON_ERROR_STOP=1 -U "$POSTGRES_USER" -d "$POSTGRES_DB" <<SQL
+CREATE ROLE replicador WITH REPLICATION LOGIN PASSWORD '${REPLICA_PASSWORD}';
+SQL
+
+echo "host replication replicador all scram-sha-256" >> "$PGDATA/pg_hba.conf"
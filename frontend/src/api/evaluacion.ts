@@ -31,7 +31,7 @@ export interface EvaluacionResultado {
   tiene_riesgo: number;
   probabilidad_riesgo: number;
   mensaje: string;
-  paciente_id: number;
+  paciente_id: number | null;
   perfil_riesgo: {
     especialidades: string[];
     principal: string;
@@ -52,6 +52,8 @@ export interface EvaluacionComparativo {
   decision_tree: ModeloComparativo | null;
   svm: ModeloComparativo | null;
   metricas_modelos: Record<string, { accuracy: number; precision: number; recall: number; f1: number }>;
+  tiempos_ms?: Record<string, number>;
+  modelos_pendientes?: string[];
 }
 
 export async function evaluar(data: EvaluacionInput) {
@@ -22,6 +22,34 @@ export interface RecomendadosRes {
   medicos: Medico[];
   perfil_detectado: string;
   especialidades_recomendadas: string[];
+  preferencias_aplicadas: PreferenciasMedico;
+}
+
+export interface PreferenciasMedico {
+  distrito?: string;
+  provincia?: string;
+  precio_max?: number;
+}
+
+export interface CercanosRes {
+  medicos: (Medico & { distancia_km: number })[];
+  total: number;
+  origen: { lat: number; lng: number };
+  radio_km: number;
+}
+
+export interface ClusterMapa {
+  lat: number;
+  lng: number;
+  cantidad: number;
+  destacado: { id: number; nombre: string; calificacion?: number };
+}
+
+export interface MapaRes {
+  zoom: number;
+  clusters: ClusterMapa[];
+  medicos: Medico[];
+  total: number;
 }
 
 export interface TodosRes {
@@ -30,12 +58,23 @@ export interface TodosRes {
   page: number;
   per_page: number;
   total_pages: number;
+  next_cursor: string | null;
+}
+
+export interface TodosCursorRes {
+  medicos: Medico[];
+  total: number;
+  per_page: number;
+  next_cursor: string | null;
 }
 
-export async function getRecomendados(perfilRiesgo: { especialidades?: string[]; principal?: string }) {
+export async function getRecomendados(
+  perfilRiesgo: { especialidades?: string[]; principal?: string },
+  preferencias?: PreferenciasMedico
+) {
   return apiFetch<RecomendadosRes & { error?: string }>('/medicos/recomendados', {
     method: 'POST',
-    body: JSON.stringify({ perfil_riesgo: perfilRiesgo }),
+    body: JSON.stringify({ perfil_riesgo: perfilRiesgo, preferencias }),
   });
 }
 
@@ -45,6 +84,23 @@ export async function getTodos(page = 1, perPage = 10) {
   );
 }
 
+export async function getCercanos(lat: number, lng: number, radioKm = 10, k = 10, subespecialidad?: string) {
+  const params = new URLSearchParams({ lat: String(lat), lng: String(lng), radio_km: String(radioKm), k: String(k) });
+  if (subespecialidad) params.set('subespecialidad', subespecialidad);
+  return apiFetch<CercanosRes & { error?: string }>(`/medicos/cercanos?${params}`);
+}
+
+export async function getMapa(bbox: string, zoom: number) {
+  const params = new URLSearchParams({ bbox, zoom: String(zoom) });
+  return apiFetch<MapaRes & { error?: string }>(`/medicos/mapa?${params}`);
+}
+
+/** Paginación por cursor: '' pide la primera página; seguir con next_cursor hasta que sea null. */
+export async function getTodosCursor(cursor = '', perPage = 10) {
+  const params = new URLSearchParams({ cursor, per_page: String(perPage) });
+  return apiFetch<TodosCursorRes & { error?: string }>(`/medicos/todos?${params}`);
+}
+
 export async function getPerfil() {
   return apiFetch<Medico & { error?: string }>('/medicos/perfil');
 }
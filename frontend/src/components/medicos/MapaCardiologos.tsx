@@ -1,7 +1,8 @@
 import { useEffect, useRef, useMemo } from 'react';
 import L from 'leaflet';
 import 'leaflet/dist/leaflet.css';
-import type { Medico } from '../../api/medicos';
+import * as medicosApi from '../../api/medicos';
+import type { Medico, ClusterMapa } from '../../api/medicos';
 
 // Fix icon por defecto de Leaflet
 // eslint-disable-next-line @typescript-eslint/no-explicit-any
@@ -15,14 +16,30 @@ L.Icon.Default.mergeOptions({
 const CENTRO_LIMA: [number, number] = [-12.0464, -77.0428];
 
 interface Props {
-  medicos: Medico[];
+  /** Sin esta lista, el mapa pide al servidor los clusters del área visible (/medicos/mapa). */
+  medicos?: Medico[];
   medicoSeleccionadoId?: number;
+  medicoSeleccionado?: Medico;
   onMedicoSeleccionado?: (medico: Medico) => void;
 }
 
+function popupMedico(m: Medico): string {
+  return `<strong>${m.nombre}</strong><br/>${m.direccion_completa || m.ubicacion_consultorio || m.distrito || ''}${m.precio_visita ? `<br/><span class="text-primary">Precio: ${m.precio_visita}</span>` : ''}`;
+}
+
+function iconoCluster(cantidad: number): L.DivIcon {
+  const size = cantidad < 10 ? 34 : cantidad < 100 ? 40 : 48;
+  return L.divIcon({
+    html: `<div style="width:${size}px;height:${size}px;line-height:${size}px;border-radius:50%;background:var(--primary-color);color:#fff;font-weight:600;text-align:center;border:3px solid rgba(255,255,255,.8);box-shadow:0 1px 4px rgba(0,0,0,.3)">${cantidad}</div>`,
+    className: '',
+    iconSize: [size, size],
+  });
+}
+
 export function MapaCardiologos({
   medicos,
   medicoSeleccionadoId,
+  medicoSeleccionado: medicoSeleccionadoProp,
   onMedicoSeleccionado,
 }: Props) {
   const containerRef = useRef<HTMLDivElement>(null);
@@ -30,16 +47,19 @@ export function MapaCardiologos({
   const markersRef = useRef<L.Marker[]>([]);
   const onSelectRef = useRef(onMedicoSeleccionado);
   onSelectRef.current = onMedicoSeleccionado;
+  const desdeServidor = medicos === undefined;
 
   const medicosConCoords = useMemo(
-    () => medicos.filter((m) => m.latitud != null && m.longitud != null),
+    () => (medicos ?? []).filter((m) => m.latitud != null && m.longitud != null),
     [medicos]
   );
-  const medicoSeleccionado = medicos.find((m) => m.id === medicoSeleccionadoId);
+  const medicoSeleccionado = medicoSeleccionadoProp ?? medicos?.find((m) => m.id === medicoSeleccionadoId);
 
   useEffect(() => {
     if (!containerRef.current) return;
-    const map = L.map(containerRef.current).setView(CENTRO_LIMA, 12);
+    // worldCopyJump: al cruzar el antimeridiano la vista vuelve a la copia principal del mundo,
+    // donde se dibujan los marcadores (el servidor responde con longitudes en ±180)
+    const map = L.map(containerRef.current, { worldCopyJump: true }).setView(CENTRO_LIMA, 12);
     L.tileLayer('https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png', {
       attribution: '&copy; <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a>',
     }).addTo(map);
@@ -55,29 +75,67 @@ export function MapaCardiologos({
     };
   }, []);
 
-  useEffect(() => {
+  const limpiarMarcadores = () => {
     markersRef.current.forEach((m) => m.remove());
     markersRef.current = [];
+  };
+
+  const agregarMedico = (map: L.Map, m: Medico): L.LatLngTuple => {
+    const latLng: L.LatLngTuple = [m.latitud!, m.longitud!];
+    const marker = L.marker(latLng).addTo(map).bindPopup(popupMedico(m));
+    marker.on('click', () => onSelectRef.current?.(m));
+    markersRef.current.push(marker);
+    return latLng;
+  };
+
+  const agregarCluster = (map: L.Map, c: ClusterMapa) => {
+    const marker = L.marker([c.lat, c.lng], { icon: iconoCluster(c.cantidad) })
+      .addTo(map)
+      .bindTooltip(`${c.cantidad} cardiólogos · destacado: ${c.destacado.nombre}`);
+    marker.on('click', () => map.flyTo([c.lat, c.lng], Math.min(map.getZoom() + 2, 18)));
+    markersRef.current.push(marker);
+  };
+
+  // Modo servidor: clusters precalculados del área visible, se piden en cada movimiento
+  useEffect(() => {
+    const map = mapRef.current;
+    if (!map || !desdeServidor) return;
+    let peticion = 0;
+    const cargar = () => {
+      const actual = ++peticion;
+      medicosApi.getMapa(map.getBounds().toBBoxString(), map.getZoom())
+        .then(({ ok, data }) => {
+          if (actual !== peticion) return;
+          limpiarMarcadores();
+          if (!ok || !data.clusters) return;
+          data.clusters.forEach((c) => agregarCluster(map, c));
+          data.medicos.forEach((m) => agregarMedico(map, m));
+        })
+        .catch(() => { /* se reintenta en el próximo movimiento */ });
+    };
+    map.on('moveend', cargar);
+    cargar();
+    return () => {
+      peticion++;
+      map.off('moveend', cargar);
+      limpiarMarcadores();
+    };
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [desdeServidor]);
+
+  useEffect(() => {
     const map = mapRef.current;
-    if (!map) return;
+    if (!map || desdeServidor) return;
+    limpiarMarcadores();
     const bounds = L.latLngBounds([] as L.LatLngTuple[]);
-    medicosConCoords.forEach((m) => {
-      const latLng: L.LatLngTuple = [m.latitud!, m.longitud!];
-      const marker = L.marker(latLng)
-        .addTo(map)
-        .bindPopup(
-          `<strong>${m.nombre}</strong><br/>${m.direccion_completa || m.ubicacion_consultorio || m.distrito || ''}${m.precio_visita ? `<br/><span class="text-primary">Precio: ${m.precio_visita}</span>` : ''}`
-        );
-      marker.on('click', () => onSelectRef.current?.(m));
-      markersRef.current.push(marker);
-      bounds.extend(latLng);
-    });
+    medicosConCoords.forEach((m) => bounds.extend(agregarMedico(map, m)));
     if (medicosConCoords.length === 1) {
       map.setView([medicosConCoords[0].latitud!, medicosConCoords[0].longitud!], 12);
     } else if (medicosConCoords.length > 1) {
       map.fitBounds(bounds, { padding: [40, 40], maxZoom: 14 });
     }
-  }, [medicosConCoords]);
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [medicosConCoords, desdeServidor]);
 
   useEffect(() => {
     if (medicoSeleccionado?.latitud != null && medicoSeleccionado?.longitud != null && mapRef.current) {